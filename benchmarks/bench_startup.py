@@ -0,0 +1,77 @@
+"""
+Measure the import time of src.main and the end-to-end time of typical
+extractor invocations, each in a fresh interpreter.
+
+    python -m benchmarks.bench_startup --classes 200 --repeat 5
+
+The invocations run against synthetic versions in a temporary directory
+laid out like the repository (data-model/ontology/*/skg-o.ttl), with and
+without the prebuilt shapes index.
+"""
+
+import argparse
+import os
+import re
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.synthetic import write_ontology
+
+REPO = Path(__file__).resolve().parent.parent
+
+IMPORT_TIME_RE = re.compile(r'import time:\s+\d+ \|\s+(\d+) \| src\.main$', re.MULTILINE)
+
+def import_time(env) -> float:
+    """
+    Cumulative import time of src.main in seconds, from python -X importtime.
+    """
+    result = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import src.main'],
+                            env=env, capture_output=True, text=True, check=True)
+    return int(IMPORT_TIME_RE.search(result.stderr).group(1)) / 1e6
+
+def run_time(args, cwd, env, repeat: int) -> float:
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        subprocess.run([sys.executable, '-m', 'src.main'] + args, cwd=cwd, env=env,
+                       stdout=subprocess.DEVNULL, check=True)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the extractor startup')
+    parser.add_argument('--classes', type=int, default=200)
+    parser.add_argument('--properties', type=int, default=10)
+    parser.add_argument('--repeat', type=int, default=5, help='Runs per invocation; the best one is reported')
+    args = parser.parse_args()
+
+    env = dict(os.environ, PYTHONPATH=str(REPO))
+    workdir = Path(tempfile.mkdtemp(prefix="skg-startup-"))
+    try:
+        for version in ("1.0.0", "current"):
+            path = workdir / "data-model" / "ontology" / version / "skg-o.ttl"
+            path.parent.mkdir(parents=True)
+            write_ontology(path, args.classes, args.properties)
+
+        print(f"{'import src.main':<36} {import_time(env):8.3f} s")
+        invocations = [
+            ("--help", ['--help']),
+            ("--list-versions", ['--list-versions']),
+            ("--version 1.0.0, extraction", ['--version', '1.0.0', '--no-cache', '--no-index', 'out.ttl']),
+        ]
+        for label, argv in invocations:
+            print(f"{label:<36} {run_time(argv, workdir, env, args.repeat):8.3f} s")
+        subprocess.run([sys.executable, '-m', 'src.main', '--build-index'], cwd=workdir, env=env,
+                       stdout=subprocess.DEVNULL, check=True)
+        indexed = run_time(['--version', '1.0.0', 'out.ttl'], workdir, env, args.repeat)
+        print(f"{'--version 1.0.0, prebuilt index':<36} {indexed:8.3f} s")
+    finally:
+        shutil.rmtree(workdir)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Compare the compiled validator against pyshacl on synthetic data.
+
+    python -m benchmarks.bench_validator --entities 5000 --chunk-size 1000 --repeat 3
+
+The data is validated in chunks of whole entities, as the validate command
+does. --untargeted adds entities of a class without shapes, using the same
+properties, to measure mixed dumps.
+"""
+
+import argparse
+import time
+
+from rdflib import BNode, Graph, Literal, Namespace, URIRef
+from rdflib.namespace import RDF, XSD
+
+from src.compiler import compile_shapes
+from src.emit import emit_graph
+from src.ir import build_ir
+
+EX = Namespace("http://example.org/")
+
+NAMESPACES = [
+    ('ex', str(EX)),
+    ('xsd', str(XSD)),
+    ('rdfs', "http://www.w3.org/2000/01/rdf-schema#"),
+]
+
+DESCRIPTION = """The properties that can be used with this class are:
+
+- ex:title -[1]-> rdfs:Literal
+- ex:code -[0..1]-> xsd:string
+- ex:year -[0..1]-> xsd:integer
+- ex:keyword -[0..N]-> rdfs:Literal
+- ex:author -[1..N]-> ex:Agent
+"""
+
+def synthetic_data(entities: int, start: int = 0, untargeted: int = 0) -> Graph:
+    """
+    entities ex:Work entities, each followed by untargeted ex:Note entities.
+    """
+    g = Graph()
+    for i in range(start, start + entities):
+        work = EX[f"work{i}"]
+        g.add((work, RDF.type, EX.Work))
+        g.add((work, EX.title, Literal(f"Work {i}")))
+        g.add((work, EX.code, Literal(f"C{i}")))
+        g.add((work, EX.year, Literal(1900 + i % 100)))
+        for k in range(3):
+            g.add((work, EX.keyword, Literal(f"keyword {k}")))
+        author = BNode()
+        g.add((work, EX.author, author))
+        g.add((author, RDF.type, EX.Agent))
+        if i % 10 == 0:
+            # A few violations, so that both engines build reports
+            g.add((work, EX.title, Literal(f"Second title {i}")))
+        for n in range(untargeted):
+            note = EX[f"note{i}-{n}"]
+            g.add((note, RDF.type, EX.Note))
+            g.add((note, EX.title, Literal(f"Note {n}")))
+            g.add((note, EX.author, Literal("Not an agent")))
+    return g
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the compiled validator against pyshacl')
+    parser.add_argument('--entities', type=int, default=5000)
+    parser.add_argument('--chunk-size', type=int, default=1000)
+    parser.add_argument('--untargeted', type=int, default=0, help='Untargeted entities per targeted one')
+    parser.add_argument('--repeat', type=int, default=3, help='Runs per engine; the best one is reported')
+    args = parser.parse_args()
+
+    shapes = emit_graph(build_ir([(str(EX.Work), DESCRIPTION)], NAMESPACES))
+    chunks = [synthetic_data(min(args.chunk_size, args.entities - start), start, args.untargeted)
+              for start in range(0, args.entities, args.chunk_size)]
+    print(f"{args.entities} entities, {sum(len(c) for c in chunks)} triples, {len(chunks)} chunks")
+
+    compiled = compile_shapes(shapes)
+
+    def native_run():
+        conforms, count = True, 0
+        for chunk in chunks:
+            chunk_conforms, violations = compiled.validate(chunk)
+            conforms, count = conforms and chunk_conforms, count + len(violations)
+        return conforms, count
+
+    def pyshacl_run():
+        from pyshacl import validate
+
+        conforms, count = True, 0
+        for chunk in chunks:
+            chunk_conforms, results, _ = validate(data_graph=chunk, shacl_graph=shapes, debug=False)
+            conforms = conforms and chunk_conforms
+            count += len(list(results.subjects(RDF.type, URIRef("http://www.w3.org/ns/shacl#ValidationResult"))))
+        return conforms, count
+
+    timings = {}
+    for name, run in (('native', native_run), ('pyshacl', pyshacl_run)):
+        best = None
+        for _ in range(args.repeat):
+            start = time.perf_counter()
+            conforms, count = run()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        timings[name] = best
+        print(f"{name:<8} {best:8.3f} s  conforms={conforms} violations={count}")
+    native, reference = timings['native'], timings['pyshacl']
+    print(f"speed-up x{reference / native:.1f}")
+
+if __name__ == "__main__":
+    main()
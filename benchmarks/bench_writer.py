@@ -0,0 +1,60 @@
+"""
+Compare the streaming writers against Graph.serialize on a synthetic ontology.
+
+    python -m benchmarks.bench_writer --classes 2000 --properties 20
+"""
+
+import argparse
+import time
+import tracemalloc
+
+from benchmarks.synthetic import NAMESPACES, synthetic_descriptions
+from src.emit import emit_graph
+from src.ir import build_ir
+from src.writer import write_shapes
+
+class CountingSink:
+    """
+    A write-only text handle that only counts bytes, standing in for a file.
+    """
+
+    def __init__(self):
+        self.size = 0
+
+    def write(self, text):
+        self.size += len(text.encode("utf-8"))
+
+def measure(label, func):
+    start = time.perf_counter()
+    size = func()
+    elapsed = time.perf_counter() - start
+    # Memory is traced in a separate run, as tracing distorts timings
+    tracemalloc.start()
+    func()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    print(f"{label:<22} {elapsed:8.3f} s  peak {peak / 2**20:8.1f} MiB  {size / 2**20:8.1f} MiB written")
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark the SHACL output backends')
+    parser.add_argument('--classes', type=int, default=2000)
+    parser.add_argument('--properties', type=int, default=20)
+    args = parser.parse_args()
+
+    ir = build_ir(synthetic_descriptions(args.classes, args.properties), NAMESPACES)
+    print(f"{args.classes} classes x {args.properties} properties")
+
+    def graph_serialize(format):
+        return len(emit_graph(ir).serialize(format=format, encoding="utf-8"))
+
+    def stream(format):
+        out = CountingSink()
+        write_shapes(ir.shapes, ir.namespaces, out, format)
+        return out.size
+
+    for format in ('turtle', 'nt'):
+        measure(f"Graph.serialize {format}", lambda: graph_serialize(format))
+        measure(f"stream {format}", lambda: stream(format))
+
+if __name__ == "__main__":
+    main()
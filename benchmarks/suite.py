@@ -0,0 +1,174 @@
+"""
+Benchmark the extraction and validation phases on synthetic ontologies.
+
+    python -m benchmarks.suite --classes 10,1000,10000 --properties 20
+    python -m benchmarks.suite --save             # record a local baseline
+    python -m benchmarks.suite --compare          # fail on regressions
+
+Each phase is timed on its own, keeping the best of --repeat runs, then run
+once more under tracemalloc for its peak memory, as tracing distorts
+timings:
+
+    parse      load_ontology
+    extract    the description tokenizer (extract_ir)
+    emit       building the shapes Graph (emit_graph)
+    serialize  Graph.serialize to Turtle
+    stream     the streaming Turtle writer
+    validate   validate_files on matching JSON-LD, in a single process
+
+Results are keyed by ontology size. --compare exits with status 1 when a
+phase is slower, or uses more memory, than the baseline by more than
+--tolerance.
+"""
+
+import argparse
+import json
+import os
+import platform
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Tuple
+
+from benchmarks.synthetic import write_jsonld, write_ontology
+from src.emit import emit_graph
+from src.loader import load_ontology
+from src.main import extract_ir
+from src.validate import JSONLinesReport, validate_files
+from src.writer import write_shapes
+
+DEFAULT_BASELINE = Path(".benchmarks") / "baseline.json"
+
+DEFAULT_TOLERANCE = 0.25
+
+# Phases faster or smaller than this are too noisy to flag
+MIN_SECONDS = 0.05
+MIN_PEAK_MIB = 1.0
+
+Measurement = Dict[str, float]
+
+def measure(func: Callable[[], Any], memory: bool = True, repeat: int = 1) -> Tuple[Any, Measurement]:
+    """
+    Time func, keeping the best of repeat runs, then trace its peak memory.
+    """
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    measurement = {"seconds": best}
+    if memory:
+        tracemalloc.start()
+        try:
+            func()
+            measurement["peak_mib"] = tracemalloc.get_traced_memory()[1] / 2**20
+        finally:
+            tracemalloc.stop()
+    return result, measurement
+
+def run_size(workdir: Path, classes: int, properties: int, entities: int,
+             memory: bool = True, repeat: int = 1) -> Dict[str, Measurement]:
+    ontology = workdir / f"ontology-{classes}x{properties}.ttl"
+    data = workdir / f"data-{classes}x{properties}.json"
+    write_ontology(ontology, classes, properties)
+    write_jsonld(data, entities, classes, properties, invalid_every=10)
+
+    phases: Dict[str, Measurement] = {}
+    g, phases["parse"] = measure(lambda: load_ontology(ontology), memory, repeat)
+    ir, phases["extract"] = measure(lambda: extract_ir(g), memory, repeat)
+    shapes, phases["emit"] = measure(lambda: emit_graph(ir), memory, repeat)
+    _, phases["serialize"] = measure(lambda: shapes.serialize(format='turtle'), memory, repeat)
+
+    def stream():
+        with open(os.devnull, 'w', encoding='utf-8') as out:
+            return write_shapes(ir.shapes, ir.namespaces, out)
+    _, phases["stream"] = measure(stream, memory, repeat)
+
+    def validate():
+        with open(os.devnull, 'w', encoding='utf-8') as out:
+            return validate_files([str(data)], shapes, JSONLinesReport(out), workers=1)
+    summary, phases["validate"] = measure(validate, memory, repeat)
+    if summary["conforms"] or summary["items"] != entities:
+        raise RuntimeError(f"Unexpected validation summary: {summary}")
+    return phases
+
+def compare(results: Dict[str, Dict[str, Measurement]], baseline: Dict[str, Dict[str, Measurement]],
+            tolerance: float) -> List[str]:
+    """
+    Return a description of every phase that regressed against baseline.
+    """
+    regressions = []
+    for size, phases in results.items():
+        for phase, measurement in phases.items():
+            reference = baseline.get(size, {}).get(phase)
+            if reference is None:
+                continue
+            for metric, floor in (("seconds", MIN_SECONDS), ("peak_mib", MIN_PEAK_MIB)):
+                if metric not in measurement or metric not in reference:
+                    continue
+                current, previous = measurement[metric], reference[metric]
+                if max(current, previous) >= floor and current > previous * (1 + tolerance):
+                    regressions.append(f"{size} {phase}: {metric} {previous:.3f} -> {current:.3f}")
+    return regressions
+
+def print_table(results: Dict[str, Dict[str, Measurement]]) -> None:
+    print(f"{'size':<14} {'phase':<10} {'seconds':>9} {'peak MiB':>9}")
+    for size, phases in results.items():
+        for phase, m in phases.items():
+            peak = f"{m['peak_mib']:9.1f}" if "peak_mib" in m else f"{'-':>9}"
+            print(f"{size:<14} {phase:<10} {m['seconds']:9.3f} {peak}")
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark extraction and validation on synthetic ontologies')
+    parser.add_argument('--classes', default="10,100,1000",
+                        help='Comma-separated ontology sizes, in classes (default: 10,100,1000)')
+    parser.add_argument('--properties', type=int, default=10, help='Properties per class (default: 10)')
+    parser.add_argument('--entities', type=int, default=2000, help='JSON-LD entities validated (default: 2000)')
+    parser.add_argument('--repeat', type=int, default=3, help='Timed runs per phase; the best one is kept (default: 3)')
+    parser.add_argument('--no-memory', action='store_true', help='Only measure time')
+    parser.add_argument('--save', nargs='?', const=str(DEFAULT_BASELINE),
+                        help=f'Store the results as baseline (default: {DEFAULT_BASELINE})')
+    parser.add_argument('--compare', nargs='?', const=str(DEFAULT_BASELINE),
+                        help=f'Compare with a stored baseline (default: {DEFAULT_BASELINE})')
+    parser.add_argument('--tolerance', type=float, default=DEFAULT_TOLERANCE,
+                        help=f'Allowed relative slowdown before reporting a regression (default: {DEFAULT_TOLERANCE})')
+    args = parser.parse_args()
+
+    sizes = [int(c) for c in args.classes.split(",") if c.strip()]
+    workdir = Path(tempfile.mkdtemp(prefix="skg-bench-"))
+    results: Dict[str, Dict[str, Measurement]] = {}
+    try:
+        for classes in sizes:
+            results[f"{classes}x{args.properties}"] = run_size(workdir, classes, args.properties,
+                                                               args.entities, memory=not args.no_memory,
+                                                               repeat=args.repeat)
+    finally:
+        shutil.rmtree(workdir)
+    print_table(results)
+
+    if args.save:
+        path = Path(args.save)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({"python": platform.python_version(), "entities": args.entities,
+                       "results": results}, f, indent=2)
+        print(f"Baseline saved to {path}")
+
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        if baseline.get("entities") != args.entities:
+            print(f"Warning: the baseline validated {baseline.get('entities')} entities", file=sys.stderr)
+        regressions = compare(results, baseline["results"], args.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION {regression}", file=sys.stderr)
+        if regressions:
+            sys.exit(1)
+        print("No regressions")
+
+if __name__ == "__main__":
+    main()
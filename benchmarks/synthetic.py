@@ -0,0 +1,98 @@
+"""
+Synthetic SKG-IF-style ontologies and matching JSON-LD data.
+
+Every class gets a dc:description listing its properties in the
+'prefix:property -[min..max]-> target' style of the SKG-IF ontology, with a
+deterministic mix of cardinalities and of literal, datatype and class
+targets, so the generated shapes exercise every constraint the extractor
+produces. The data generator writes entities for these classes, with an
+optional share of invalid ones.
+"""
+
+import json
+import os
+from typing import Iterator, List, Tuple, Union
+
+EX = "http://example.org/"
+
+NAMESPACES = [
+    ('ex', EX),
+    ('xsd', "http://www.w3.org/2001/XMLSchema#"),
+    ('rdfs', "http://www.w3.org/2000/01/rdf-schema#"),
+]
+
+TARGETS = ["xsd:string", "rdfs:Literal", "class", "xsd:integer"]
+CARDINALITIES = ["1", "0..1", "0..N", "1..*"]
+
+HEADER = "The properties that can be used with this class are:\n\n"
+
+def property_spec(cls: int, prop: int, classes: int) -> Tuple[str, str, str]:
+    """
+    (property name, cardinality, target) of property prop of class cls.
+    Class targets point to another generated class.
+    """
+    target = TARGETS[(cls + prop) % len(TARGETS)]
+    if target == "class":
+        target = f"ex:Class{(cls + prop + 1) % classes}"
+    return f"ex:prop{prop}", CARDINALITIES[prop % len(CARDINALITIES)], target
+
+def synthetic_descriptions(classes: int, properties: int) -> Iterator[Tuple[str, str]]:
+    """
+    Yield (class IRI, description) pairs, as described_classes does.
+    """
+    for c in range(classes):
+        lines = ["- {} -[{}]-> {}".format(*property_spec(c, p, classes)) for p in range(properties)]
+        yield f"{EX}Class{c}", HEADER + "\n".join(lines)
+
+def write_ontology(path: Union[str, os.PathLike], classes: int, properties: int) -> None:
+    """
+    Write a Turtle ontology declaring classes owl:Classes with their
+    descriptions, plus an rdfs:label per class that the extractor ignores.
+    """
+    with open(path, 'w', encoding='utf-8') as f:
+        for prefix, namespace in NAMESPACES + [('owl', "http://www.w3.org/2002/07/owl#"),
+                                               ('dc', "http://purl.org/dc/elements/1.1/")]:
+            f.write(f"@prefix {prefix}: <{namespace}> .\n")
+        for c, (_, description) in enumerate(synthetic_descriptions(classes, properties)):
+            f.write(f'\nex:Class{c} a owl:Class ;\n    rdfs:label "Class {c}" ;\n'
+                    f'    dc:description """{description}\n""" .\n')
+
+def _values(entity: int, cardinality: str, target: str) -> List:
+    count = 1 if cardinality in ("1", "0..1") else 2
+    if cardinality == "0..1" and entity % 2:
+        count = 0
+    if target == "xsd:integer":
+        return [{"@value": entity + n, "@type": "xsd:integer"} for n in range(count)]
+    if target.startswith("ex:"):
+        return [{"@id": f"ex:{target[3:].lower()}-{entity}-{n}"} for n in range(count)]
+    return [f"value {entity}.{n}" for n in range(count)]
+
+def synthetic_entity(entity: int, classes: int, properties: int, invalid: bool = False) -> dict:
+    """
+    A JSON-LD entity of class entity % classes. An invalid entity misses the
+    values of its first property, whose cardinality is exactly one.
+    """
+    cls = entity % classes
+    item = {"@id": f"ex:entity{entity}", "@type": f"ex:Class{cls}"}
+    for p in range(properties):
+        name, cardinality, target = property_spec(cls, p, classes)
+        values = _values(entity, cardinality, target)
+        if invalid and p == 0:
+            values = []
+        if values:
+            item[name] = values
+    return item
+
+def write_jsonld(path: Union[str, os.PathLike], entities: int, classes: int, properties: int,
+                 invalid_every: int = 0) -> None:
+    """
+    Write a JSON-LD document whose @graph holds entities entities, one per
+    line. Every invalid_every-th entity is invalid.
+    """
+    context = {prefix: namespace for prefix, namespace in NAMESPACES}
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write('{"@context": ' + json.dumps(context) + ',\n"@graph": [\n')
+        for e in range(entities):
+            invalid = bool(invalid_every) and e % invalid_every == 0
+            f.write(("" if e == 0 else ",\n") + json.dumps(synthetic_entity(e, classes, properties, invalid)))
+        f.write("\n]}\n")
@@ -3,4 +3,8 @@ SKG-IF SHACL Extractor
 A Python tool to automatically generate SHACL shapes from OWL ontologies
 """
 
-__version__ = "0.1.0" 
\ No newline at end of file
+__version__ = "0.1.0" 
+
+# Bump whenever a change of the extractor changes the shapes it produces from
+# the same ontology, so prebuilt indexes and cached shapes are rebuilt
+SHAPES_VERSION = 1
@@ -0,0 +1,54 @@
+"""
+Atomic replacement of files.
+
+atomic_write writes to a temporary file in the directory of the target and
+renames it over the target once the content is complete, so readers, and
+parallel jobs sharing a directory, never observe a partial file and an
+interrupted write leaves the previous content in place.
+"""
+
+import os
+import shutil
+import tempfile
+from contextlib import contextmanager
+from pathlib import Path
+from typing import IO, Iterator, Optional, Union
+
+TMP_PREFIX = ".tmp-"
+
+# The umask cannot be read without setting it, which is not safe once other
+# threads may be creating files
+_UMASK = os.umask(0)
+os.umask(_UMASK)
+
+@contextmanager
+def atomic_write(path: Union[str, os.PathLike], mode: str = 'w', encoding: Optional[str] = 'utf-8',
+                 newline: Optional[str] = None) -> Iterator[IO]:
+    """
+    Open a temporary file to be written in place of path, in text mode or,
+    with mode 'wb', in binary mode. The file replaces path when the block
+    exits, with the permissions of the file it replaces or, for a new file,
+    the default ones. If the block raises, the temporary file is removed and
+    path is left as it was. A symbolic link is kept, and the file it points
+    to is replaced.
+    """
+    # Write through symbolic links rather than replacing them
+    path = Path(os.path.realpath(path))
+    path.parent.mkdir(parents=True, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(dir=path.parent, prefix=TMP_PREFIX)
+    try:
+        binary = 'b' in mode
+        with os.fdopen(fd, mode, encoding=None if binary else encoding, newline=None if binary else newline) as f:
+            yield f
+        # mkstemp creates files readable by their owner only
+        try:
+            shutil.copymode(path, tmp)
+        except FileNotFoundError:
+            os.chmod(tmp, 0o666 & ~_UMASK)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except FileNotFoundError:
+            pass
+        raise
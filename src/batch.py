@@ -0,0 +1,140 @@
+"""
+Batch extraction of the shapes of several ontology versions in parallel.
+"""
+
+import json
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Dict, List, Optional, Union
+
+from src.atomic import atomic_write
+from src.bundle import BUNDLE_FORMATS
+from src.cache import ShapesCache, default_cache_dir
+from src.main import (ONTOLOGY_BASE_PATH, bundle_shacl_shapes, get_ontology_path, load_or_create_shapes,
+                      serialize_shapes, stream_shacl_shapes)
+
+VERSION_PLACEHOLDER = "{version}"
+
+STATE_FILE = "batch-state.json"
+
+def _version_key(version: str):
+    return [int(part) if part.isdigit() else part for part in re.split(r'(\d+)', version)]
+
+def list_versions(base_path: Union[str, os.PathLike, None] = None) -> List[str]:
+    """
+    Return every version directory under base_path holding a skg-o.ttl.
+    """
+    base_path = Path(base_path or ONTOLOGY_BASE_PATH)
+    if not base_path.is_dir():
+        return []
+    versions = [p.name for p in base_path.iterdir() if (p / "skg-o.ttl").is_file()]
+    return sorted(versions, key=_version_key)
+
+def resolve_versions(spec: str) -> List[str]:
+    """
+    Expand a --version value: 'all' or a comma-separated list of versions.
+    """
+    if spec == "all":
+        versions = list_versions()
+        if not versions:
+            raise ValueError(f"No ontology versions found under {ONTOLOGY_BASE_PATH}")
+        return versions
+    versions = [v.strip() for v in spec.split(",") if v.strip()]
+    for version in versions:
+        get_ontology_path(version)
+    return versions
+
+def is_batch(spec: Optional[str]) -> bool:
+    return spec is not None and (spec == "all" or "," in spec)
+
+def output_path_for(template: str, version: str) -> str:
+    if VERSION_PLACEHOLDER not in template:
+        raise ValueError(f"The output path must contain {VERSION_PLACEHOLDER} in batch mode")
+    return template.replace(VERSION_PLACEHOLDER, version)
+
+class BatchState:
+    """
+    Remembers, for every output file, the cache key of the input it was
+    generated from, so unchanged versions can be skipped on the next run.
+    """
+
+    def __init__(self, path: Union[str, os.PathLike]):
+        self.path = Path(path)
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.outputs: Dict[str, str] = json.load(f)
+        except (FileNotFoundError, ValueError):
+            self.outputs = {}
+
+    def is_current(self, output_path: str, key: str) -> bool:
+        return Path(output_path).exists() and self.outputs.get(str(Path(output_path).resolve())) == key
+
+    def record(self, output_path: str, key: str) -> None:
+        self.outputs[str(Path(output_path).resolve())] = key
+
+    def save(self) -> None:
+        with atomic_write(self.path) as f:
+            json.dump(self.outputs, f, indent=2, sort_keys=True)
+
+def extract_version(input_path: str, output_path: str, cache_dir: Optional[str],
+                    format: str = 'turtle', stream: bool = False, stable_ids: bool = False) -> None:
+    """
+    Extract the shapes of one ontology file. Runs inside a worker process.
+    """
+    Path(output_path).parent.mkdir(parents=True, exist_ok=True)
+    if format in BUNDLE_FORMATS:
+        bundle_shacl_shapes(input_path, output_path, format)
+        return
+    if stream:
+        stream_shacl_shapes(input_path, output_path, format, stable_ids=stable_ids)
+        return
+    cache = ShapesCache(cache_dir) if cache_dir else None
+    shacl_graph = load_or_create_shapes(input_path, cache, stable_ids=stable_ids)
+    serialize_shapes(shacl_graph, output_path, format, stable_ids)
+
+def run_batch(versions: List[str], output_template: str, cache_dir: Optional[str] = None,
+              use_cache: bool = True, workers: Optional[int] = None,
+              format: str = 'turtle', stream: bool = False, stable_ids: bool = False) -> Dict[str, str]:
+    """
+    Extract the shapes of every version into output_template, one file per
+    version, in a process pool sized to the available cores.
+    Returns the status of each version: 'extracted' or 'unchanged'.
+    Without the cache nothing is remembered and every version is extracted.
+    """
+    cache_dir = str(cache_dir or default_cache_dir()) if use_cache else None
+    state = BatchState(Path(cache_dir) / STATE_FILE) if cache_dir else None
+    keys = ShapesCache(cache_dir) if cache_dir else None
+
+    status: Dict[str, str] = {}
+    jobs = {}
+    for version in versions:
+        input_path = get_ontology_path(version)
+        output_path = output_path_for(output_template, version)
+        key = f"{keys.key_for(input_path, stable_ids=stable_ids)}:{format}" if keys else None
+        if state is not None and state.is_current(output_path, key):
+            status[version] = "unchanged"
+        else:
+            jobs[version] = (input_path, output_path, key)
+
+    if len(jobs) == 1:
+        (version, (input_path, output_path, _)), = jobs.items()
+        extract_version(input_path, output_path, cache_dir, format, stream, stable_ids)
+    elif jobs:
+        max_workers = min(len(jobs), workers or os.cpu_count() or 1)
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            futures = [executor.submit(extract_version, input_path, output_path, cache_dir,
+                                       format, stream, stable_ids)
+                       for input_path, output_path, _ in jobs.values()]
+            for future in futures:
+                future.result()
+
+    for version, (_, output_path, key) in jobs.items():
+        status[version] = "extracted"
+        if state is not None:
+            state.record(output_path, key)
+    if state is not None and jobs:
+        state.save()
+
+    return {version: status[version] for version in versions}
@@ -0,0 +1,254 @@
+"""
+Compact, machine-oriented bundles of extracted shapes.
+
+A bundle holds the same information as the shape IR, so consumers can read
+the target classes, paths, cardinalities and datatypes without an RDF
+parser, and emit_graph(read_bundle(path)) gives back the SHACL graph. It
+comes in two variants with the same layout:
+
+'bundle-json' is a JSON object:
+
+    {"format": "skg-if-shapes-bundle", "version": 1, "extractor": "0.1.0",
+     "strings": [string, ...],
+     "namespaces": [[prefix, namespace], ...],
+     "shapes": [[iri, target class, first property, property count], ...],
+     "properties": [[path, min count, max count, kind, target], ...]}
+
+Every IRI and prefix is an index into the interned "strings" table. The
+properties of a shape are the "properties" slice starting at its first
+property. Kinds are 0 (sh:nodeKind sh:Literal), 1 (sh:datatype target) and
+2 (sh:or of sh:class target and sh:nodeKind sh:BlankNodeOrIRI). Absent
+counts and targets are null.
+
+'bundle' is a little-endian binary file laid out for mmap, every section
+aligned to 4 bytes:
+
+    header       4s H H I I I I I I   magic b"SKGB", version, flags (0),
+                                      extractor (string index), strings,
+                                      namespaces, shapes, properties,
+                                      string data size
+    offsets      (strings + 1) x I    offsets of the strings in string data
+    namespaces   namespaces x (I I)   prefix, namespace
+    shapes       shapes x (I I I I)   iri, target class, first property,
+                                      property count
+    properties   properties x (I i i B 3x I)
+                                      path, min count, max count, kind,
+                                      target; absent counts are -1 and
+                                      absent targets 0xFFFFFFFF
+    string data  UTF-8
+
+BinaryBundle reads single shapes and strings straight from the buffer,
+decoding nothing else.
+"""
+
+import json
+import mmap
+import os
+import struct
+from typing import Any, Dict, Iterator, List, Optional, Tuple, Union
+
+from src import __version__
+from src.ir import CLASS, DATATYPE, LITERAL, NodeShape, PropertyShape, ShapeIR
+
+BUNDLE_FORMATS = ('bundle', 'bundle-json')
+
+BUNDLE_NAME = "skg-if-shapes-bundle"
+BUNDLE_VERSION = 1
+MAGIC = b"SKGB"
+
+KINDS = (LITERAL, DATATYPE, CLASS)
+KIND_CODES = {kind: code for code, kind in enumerate(KINDS)}
+
+HEADER = struct.Struct('<4sHHIIIIII')
+OFFSET = struct.Struct('<I')
+NAMESPACE = struct.Struct('<II')
+SHAPE = struct.Struct('<IIII')
+PROPERTY = struct.Struct('<IiiB3xI')
+NONE = 0xFFFFFFFF
+
+class StringTable:
+    """
+    Interns strings, numbering them in order of first use.
+    """
+
+    def __init__(self):
+        self.strings: List[str] = []
+        self._index: Dict[str, int] = {}
+
+    def __call__(self, string: Optional[str]) -> Optional[int]:
+        if string is None:
+            return None
+        index = self._index.get(string)
+        if index is None:
+            index = self._index[string] = len(self.strings)
+            self.strings.append(string)
+        return index
+
+def bundle_tables(ir: ShapeIR) -> Dict[str, Any]:
+    """
+    The content of the bundle of ir, in the layout of 'bundle-json'.
+    """
+    intern = StringTable()
+    extractor = intern(__version__)
+    namespaces = [[intern(prefix), intern(str(namespace))] for prefix, namespace in ir.namespaces]
+    shapes, properties = [], []
+    for shape in ir.shapes:
+        shapes.append([intern(shape.iri), intern(shape.target_class), len(properties), len(shape.properties)])
+        for prop in shape.properties:
+            properties.append([intern(prop.path), prop.min_count, prop.max_count,
+                               KIND_CODES[prop.kind], intern(prop.target)])
+    return {
+        "format": BUNDLE_NAME,
+        "version": BUNDLE_VERSION,
+        "extractor": extractor,
+        "strings": intern.strings,
+        "namespaces": namespaces,
+        "shapes": shapes,
+        "properties": properties,
+    }
+
+def encode_binary(tables: Dict[str, Any]) -> bytes:
+    encoded = [s.encode('utf-8') for s in tables["strings"]]
+    offsets = [0]
+    for data in encoded:
+        offsets.append(offsets[-1] + len(data))
+    parts = [HEADER.pack(MAGIC, BUNDLE_VERSION, 0, tables["extractor"], len(encoded),
+                         len(tables["namespaces"]), len(tables["shapes"]), len(tables["properties"]),
+                         offsets[-1])]
+    parts.append(struct.pack(f'<{len(offsets)}I', *offsets))
+    parts.extend(NAMESPACE.pack(*ns) for ns in tables["namespaces"])
+    parts.extend(SHAPE.pack(*shape) for shape in tables["shapes"])
+    for path, min_count, max_count, kind, target in tables["properties"]:
+        parts.append(PROPERTY.pack(path, -1 if min_count is None else min_count,
+                                   -1 if max_count is None else max_count, kind,
+                                   NONE if target is None else target))
+    parts.extend(encoded)
+    return b''.join(parts)
+
+def write_bundle(ir: ShapeIR, path: Union[str, os.PathLike], format: str = 'bundle') -> int:
+    """
+    Write the bundle of ir to path in 'bundle' or 'bundle-json' and return
+    the number of shapes.
+    """
+    tables = bundle_tables(ir)
+    if format == 'bundle':
+        with open(path, 'wb') as f:
+            f.write(encode_binary(tables))
+    elif format == 'bundle-json':
+        with open(path, 'w', encoding='utf-8', newline='\n') as f:
+            json.dump(tables, f, ensure_ascii=False, separators=(',', ':'))
+    else:
+        raise ValueError(f"Unsupported bundle format: {format}")
+    return len(ir.shapes)
+
+class BinaryBundle:
+    """
+    Random access to a binary bundle held in a buffer (bytes or an mmap).
+    """
+
+    def __init__(self, buffer):
+        self.buffer = buffer
+        if len(buffer) < HEADER.size:
+            raise ValueError("Not a shapes bundle: truncated header")
+        (magic, version, _, self._extractor, self.string_count, self.namespace_count,
+         self.shape_count, self.property_count, data_size) = HEADER.unpack_from(buffer, 0)
+        if magic != MAGIC:
+            raise ValueError("Not a shapes bundle")
+        if version != BUNDLE_VERSION:
+            raise ValueError(f"Unsupported shapes bundle version: {version}")
+        self._offsets = HEADER.size
+        self._namespaces = self._offsets + OFFSET.size * (self.string_count + 1)
+        self._shapes = self._namespaces + NAMESPACE.size * self.namespace_count
+        self._properties = self._shapes + SHAPE.size * self.shape_count
+        self._strings = self._properties + PROPERTY.size * self.property_count
+        if len(buffer) < self._strings + data_size:
+            raise ValueError("Not a shapes bundle: truncated data")
+
+    def __len__(self):
+        return self.shape_count
+
+    @property
+    def extractor(self) -> str:
+        return self.string(self._extractor)
+
+    def string(self, index: int) -> str:
+        start, end = struct.unpack_from('<2I', self.buffer, self._offsets + OFFSET.size * index)
+        return bytes(self.buffer[self._strings + start:self._strings + end]).decode('utf-8')
+
+    def namespaces(self) -> List[Tuple[str, str]]:
+        namespaces = []
+        for n in range(self.namespace_count):
+            prefix, namespace = NAMESPACE.unpack_from(self.buffer, self._namespaces + NAMESPACE.size * n)
+            namespaces.append((self.string(prefix), self.string(namespace)))
+        return namespaces
+
+    def property(self, index: int) -> PropertyShape:
+        path, min_count, max_count, kind, target = PROPERTY.unpack_from(
+            self.buffer, self._properties + PROPERTY.size * index)
+        return PropertyShape(self.string(path), None if min_count < 0 else min_count,
+                             None if max_count < 0 else max_count, KINDS[kind],
+                             None if target == NONE else self.string(target))
+
+    def shape(self, index: int) -> NodeShape:
+        iri, target_class, first, count = SHAPE.unpack_from(self.buffer, self._shapes + SHAPE.size * index)
+        return NodeShape(self.string(iri), self.string(target_class),
+                         [self.property(first + i) for i in range(count)])
+
+    def strings(self) -> List[str]:
+        """
+        The whole string table, decoded at once.
+        """
+        offsets = struct.unpack_from(f'<{self.string_count + 1}I', self.buffer, self._offsets)
+        data = bytes(self.buffer[self._strings:self._strings + offsets[-1]])
+        return [data[start:end].decode('utf-8') for start, end in zip(offsets, offsets[1:])]
+
+    def shapes(self) -> Iterator[NodeShape]:
+        """
+        Every shape, in order, decoding the string table once.
+        """
+        strings = self.strings()
+        view = memoryview(self.buffer)
+        try:
+            properties = [
+                PropertyShape(strings[path], None if min_count < 0 else min_count,
+                              None if max_count < 0 else max_count, KINDS[kind],
+                              None if target == NONE else strings[target])
+                for path, min_count, max_count, kind, target
+                in PROPERTY.iter_unpack(view[self._properties:self._strings])]
+            shapes = SHAPE.iter_unpack(view[self._shapes:self._properties])
+            for iri, target_class, first, count in shapes:
+                yield NodeShape(strings[iri], strings[target_class], properties[first:first + count])
+        finally:
+            view.release()
+
+def ir_from_tables(tables: Dict[str, Any]) -> ShapeIR:
+    if tables.get("format") != BUNDLE_NAME:
+        raise ValueError("Not a shapes bundle")
+    if tables.get("version") != BUNDLE_VERSION:
+        raise ValueError(f"Unsupported shapes bundle version: {tables.get('version')}")
+    strings = tables["strings"]
+    string = lambda index: None if index is None else strings[index]
+    properties = [PropertyShape(strings[path], min_count, max_count, KINDS[kind], string(target))
+                  for path, min_count, max_count, kind, target in tables["properties"]]
+    shapes = [NodeShape(strings[iri], strings[target_class], properties[first:first + count])
+              for iri, target_class, first, count in tables["shapes"]]
+    namespaces = [(strings[prefix], strings[namespace]) for prefix, namespace in tables["namespaces"]]
+    return ShapeIR(namespaces, shapes, [])
+
+def read_bundle(source: Union[str, os.PathLike, bytes]) -> ShapeIR:
+    """
+    Read a bundle of either variant, from a path or from its bytes, back
+    into the shape IR.
+    """
+    if isinstance(source, bytes):
+        if source.startswith(MAGIC):
+            bundle = BinaryBundle(source)
+            return ShapeIR(bundle.namespaces(), list(bundle.shapes()), [])
+        return ir_from_tables(json.loads(source))
+    with open(source, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            f.seek(0)
+            return ir_from_tables(json.load(f))
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+            bundle = BinaryBundle(buffer)
+            return ShapeIR(bundle.namespaces(), list(bundle.shapes()), [])
@@ -0,0 +1,237 @@
+"""
+On-disk, content-addressed cache for extracted SHACL shapes.
+
+Entries are keyed by the SHA-256 of the input ontology plus the extractor
+and shapes versions, so a cache directory can be shared between jobs (and
+between parallel CI workers) without ever serving shapes built from different
+input or by a different extractor. Entries are stored as N-Triples and JSON,
+never as pickles, so writing to a shared cache cannot run code in its readers.
+"""
+
+import hashlib
+import json
+import os
+import time
+from pathlib import Path
+from typing import TYPE_CHECKING, Iterable, Iterator, Optional, Tuple, Union
+
+from src import SHAPES_VERSION, __version__
+from src.atomic import TMP_PREFIX, atomic_write
+
+if TYPE_CHECKING: # pragma: no cover
+    from rdflib import Graph
+
+# Bump whenever the layout of a cached snapshot changes.
+CACHE_FORMAT = 2
+
+DEFAULT_MAX_SIZE = 256 * 1024 * 1024
+
+# Temporary files older than this are leftovers of crashed writers.
+STALE_TMP_AGE = 3600
+
+def default_cache_dir() -> Path:
+    """
+    Return the default cache directory, honouring XDG_CACHE_HOME.
+    """
+    base = os.environ.get("XDG_CACHE_HOME") or str(Path.home() / ".cache")
+    return Path(base) / "skg-if-shacl-extractor"
+
+def file_digest(path: Union[str, os.PathLike], chunk_size: int = 1 << 20) -> str:
+    """
+    Return the hex SHA-256 of a file, read in fixed-size chunks.
+    """
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+class DiskCache:
+    """
+    A directory of immutable byte blobs with size-bounded LRU eviction.
+
+    Writes go to a temporary file in the cache directory and are published
+    with an atomic rename, so concurrent readers never observe a partial
+    entry. Reads refresh the entry mtime, which is what eviction orders by.
+    Any entry may disappear at any moment because of another process
+    evicting it: every operation treats a missing file as a cache miss.
+    """
+
+    def __init__(self, directory: Union[str, os.PathLike], max_size: int = DEFAULT_MAX_SIZE,
+                 suffix: str = ".bin"):
+        self.directory = Path(directory)
+        self.max_size = max_size
+        self.suffix = suffix
+
+    def path_for(self, key: str) -> Path:
+        return self.directory / key[:2] / (key + self.suffix)
+
+    def get(self, key: str) -> Optional[bytes]:
+        path = self.path_for(key)
+        try:
+            with open(path, "rb") as f:
+                data = f.read()
+        except FileNotFoundError:
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return data
+
+    def set(self, key: str, data: bytes) -> None:
+        with atomic_write(self.path_for(key), "wb") as f:
+            f.write(data)
+        self.evict()
+
+    def delete(self, key: str) -> None:
+        try:
+            os.unlink(self.path_for(key))
+        except FileNotFoundError:
+            pass
+
+    def _entries(self) -> Iterator[Tuple[Path, os.stat_result]]:
+        if not self.directory.exists():
+            return
+        now = time.time()
+        for path in self.directory.glob("*/*"):
+            try:
+                st = path.stat()
+            except FileNotFoundError:
+                continue
+            if path.name.startswith(TMP_PREFIX):
+                if now - st.st_mtime > STALE_TMP_AGE:
+                    try:
+                        os.unlink(path)
+                    except FileNotFoundError:
+                        pass
+                continue
+            if path.name.endswith(self.suffix):
+                yield path, st
+
+    def size(self) -> int:
+        return sum(st.st_size for _, st in self._entries())
+
+    def evict(self) -> None:
+        """
+        Remove least recently used entries until the cache fits max_size.
+        """
+        entries = list(self._entries())
+        total = sum(st.st_size for _, st in entries)
+        if total <= self.max_size:
+            return
+        entries.sort(key=lambda e: e[1].st_mtime)
+        for path, st in entries:
+            if total <= self.max_size:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            total -= st.st_size
+
+    def clear(self) -> None:
+        for path, _ in list(self._entries()):
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+
+class ShapesCache(DiskCache):
+    """
+    Cache of shapes graphs.
+
+    An entry holds a JSON header with the namespace bindings of the shapes
+    graph, on its first line, followed by its triples in N-Triples, so a hit
+    rebuilds the Graph without parsing the ontology.
+    """
+
+    def __init__(self, directory: Union[str, os.PathLike, None] = None,
+                 max_size: int = DEFAULT_MAX_SIZE):
+        super().__init__(directory or default_cache_dir(), max_size=max_size, suffix=".shapes")
+
+    def key_for(self, input_file: Union[str, os.PathLike],
+                prefixes: Optional[Iterable[Tuple[str, str]]] = None, stable_ids: bool = False) -> str:
+        h = hashlib.sha256()
+        h.update(f"{CACHE_FORMAT}\0{__version__}\0{SHAPES_VERSION}\0".encode("utf-8"))
+        h.update(file_digest(input_file).encode("ascii"))
+        for prefix, namespace in prefixes or ():
+            h.update(f"\0{prefix}\0{namespace}".encode("utf-8"))
+        if stable_ids:
+            h.update(b"\0stable-ids")
+        return h.hexdigest()
+
+    def get_shapes(self, key: str) -> Optional['Graph']:
+        from rdflib import Graph
+
+        data = self.get(key)
+        if data is None:
+            return None
+        try:
+            header, _, triples = data.partition(b"\n")
+            snapshot = json.loads(header)
+            if snapshot.get("format") != CACHE_FORMAT:
+                raise ValueError("unsupported snapshot format")
+            shapes = Graph()
+            for prefix, namespace in snapshot["namespaces"]:
+                shapes.bind(prefix, namespace, override=True, replace=True)
+            shapes.parse(data=triples.decode("utf-8"), format="nt")
+        except Exception:
+            self.delete(key)
+            return None
+        return shapes
+
+    def put_shapes(self, key: str, shapes: 'Graph') -> None:
+        header = {
+            "format": CACHE_FORMAT,
+            "namespaces": [(prefix, str(ns)) for prefix, ns in shapes.namespaces()],
+        }
+        self.set(key, json.dumps(header).encode("utf-8") + b"\n" + shapes.serialize(format="nt", encoding="utf-8"))
+
+class ValidationCache(DiskCache):
+    """
+    Cache of the validation results of whole data files.
+
+    Entries are keyed by the SHA-256 of the file content, a fingerprint of
+    the shapes and the validation settings, so an unchanged file validated
+    against unchanged shapes is never validated again, wherever it lives,
+    and any change of the shapes invalidates every entry. The results of the
+    chunks of a file are stored as JSON.
+    """
+
+    def __init__(self, directory: Union[str, os.PathLike, None] = None,
+                 max_size: int = DEFAULT_MAX_SIZE):
+        super().__init__(directory or default_cache_dir(), max_size=max_size, suffix=".validation")
+        self.hits = 0
+        self.misses = 0
+
+    def key_for(self, data_digest: str, shapes_key: str, *settings: object) -> str:
+        h = hashlib.sha256()
+        h.update(f"{CACHE_FORMAT}\0{__version__}\0{shapes_key}\0{data_digest}".encode("utf-8"))
+        for setting in settings:
+            h.update(f"\0{setting}".encode("utf-8"))
+        return h.hexdigest()
+
+    def get_results(self, key: str) -> Optional[list]:
+        data = self.get(key)
+        results = None
+        if data is not None:
+            try:
+                snapshot = json.loads(data)
+                if snapshot.get("format") != CACHE_FORMAT:
+                    raise ValueError("unsupported snapshot format")
+                results = snapshot["chunks"]
+            except Exception:
+                self.delete(key)
+        if results is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return results
+
+    def put_results(self, key: str, chunks: list) -> None:
+        snapshot = {"format": CACHE_FORMAT, "chunks": chunks}
+        self.set(key, json.dumps(snapshot, separators=(",", ":")).encode("utf-8"))
+
+    def stats(self) -> dict:
+        return {"hits": self.hits, "misses": self.misses}
@@ -0,0 +1,483 @@
+"""
+Native fast-path validation for the shapes produced by the extractor.
+
+The generated shapes only use sh:targetClass, sh:minCount, sh:maxCount,
+sh:datatype, sh:nodeKind and the pattern
+sh:or ( [ sh:class X ] [ sh:nodeKind sh:BlankNodeOrIRI ] ). compile_shapes
+turns every NodeShape restricted to that subset into specialized Python
+checks indexed by target class; any other NodeShape is set aside and
+validated with pyshacl. The checks reproduce pyshacl's semantics, so both
+engines report the same conformance and the same violations.
+
+Validation starts with a pre-pass over rdf:type: every typed entity is
+mapped to the target classes it falls under, through the rdfs:subClassOf
+closure precomputed from the ontology hierarchy (given to pyshacl as its
+ont_graph) and any subclass statements of the data itself. Each entity is
+then checked against the shapes of those classes only, and the values of
+untyped or untargeted entities are never looked up.
+"""
+
+from datetime import date, datetime, time
+from decimal import Decimal
+from typing import Callable, Collection, Dict, FrozenSet, Iterable, List, Optional, Set, Tuple
+
+from rdflib import BNode, Graph, Literal, URIRef
+from rdflib.namespace import RDF, RDFS, XSD
+from rdflib.term import Node
+
+from src.emit import SH
+
+MIN_COUNT = SH.MinCountConstraintComponent
+MAX_COUNT = SH.MaxCountConstraintComponent
+DATATYPE = SH.DatatypeConstraintComponent
+NODE_KIND = SH.NodeKindConstraintComponent
+OR = SH.OrConstraintComponent
+
+# rdflib resolves namespace attributes on every access: keep the terms used
+# in the per-triple loops at hand
+TYPE = RDF.type
+SUBCLASS_OF = RDFS.subClassOf
+
+NODE_SHAPE_PREDICATES = {RDF.type, SH.targetClass, SH.property}
+TARGET_PREDICATES = (SH.targetClass, SH.targetNode, SH.targetSubjectsOf, SH.targetObjectsOf)
+PROPERTY_SHAPE_PREDICATES = {SH.path, SH.minCount, SH.maxCount, SH.datatype, SH.nodeKind, SH['or']}
+
+NODE_KINDS = {
+    SH.IRI: lambda v: isinstance(v, URIRef),
+    SH.BlankNode: lambda v: isinstance(v, BNode),
+    SH.Literal: lambda v: isinstance(v, Literal),
+    SH.BlankNodeOrIRI: lambda v: isinstance(v, (BNode, URIRef)),
+    SH.BlankNodeOrLiteral: lambda v: isinstance(v, (BNode, Literal)),
+    SH.IRIOrLiteral: lambda v: isinstance(v, (URIRef, Literal)),
+}
+
+# Python value types rdflib produces for the datatypes pyshacl checks
+DATATYPE_VALUES = {
+    XSD.string: (str, bytes),
+    RDF.langString: (str, bytes),
+    XSD.integer: int,
+    XSD.float: float,
+    XSD.decimal: Decimal,
+    XSD.boolean: bool,
+    XSD.date: date,
+    XSD.time: time,
+    XSD.dateTime: datetime,
+}
+
+class Violation:
+    __slots__ = ('focus', 'path', 'component', 'value', 'shape', 'message')
+
+    def __init__(self, focus: Node, path: Optional[Node], component: Node, value: Optional[Node],
+                 shape: Optional[Node], message: Optional[str] = None):
+        self.focus = focus
+        self.path = path
+        self.component = component
+        self.value = value
+        self.shape = shape
+        self.message = message
+
+    def key(self) -> Tuple:
+        """
+        What identifies a violation independently of how it was reported.
+        """
+        return self.focus, self.path, self.component, self.value
+
+    def as_dict(self) -> Dict[str, str]:
+        record = {
+            'focusNode': str(self.focus),
+            'resultPath': str(self.path),
+            'sourceShape': str(self.shape),
+            'sourceConstraintComponent': str(self.component),
+            'resultSeverity': str(SH.Violation),
+        }
+        if self.value is not None:
+            record['value'] = str(self.value)
+        if self.message:
+            record['resultMessage'] = self.message
+        return record
+
+    def __repr__(self):
+        return f"Violation({self.focus!r}, {self.path!r}, {self.component!r}, {self.value!r})"
+
+def results_graph(violations: Iterable[Violation]) -> Graph:
+    """
+    Build a SHACL validation report graph holding the violations.
+    """
+    g = Graph()
+    g.bind('sh', SH)
+    report = BNode()
+    conforms = True
+    g.add((report, RDF.type, SH.ValidationReport))
+    for violation in violations:
+        conforms = False
+        result = BNode()
+        g.add((report, SH.result, result))
+        g.add((result, RDF.type, SH.ValidationResult))
+        g.add((result, SH.focusNode, violation.focus))
+        g.add((result, SH.sourceConstraintComponent, violation.component))
+        g.add((result, SH.resultSeverity, SH.Violation))
+        if violation.path is not None:
+            g.add((result, SH.resultPath, violation.path))
+        if violation.value is not None:
+            g.add((result, SH.value, violation.value))
+        if violation.shape is not None:
+            g.add((result, SH.sourceShape, violation.shape))
+        if violation.message:
+            g.add((result, SH.resultMessage, Literal(violation.message)))
+    g.add((report, SH.conforms, Literal(conforms)))
+    return g
+
+def violations_from_results(results: Graph) -> List[Violation]:
+    """
+    Read the violations out of a pyshacl results graph.
+    """
+    violations = []
+    for result in results.subjects(RDF.type, SH.ValidationResult):
+        if results.value(result, SH.resultSeverity) != SH.Violation:
+            continue
+        message = results.value(result, SH.resultMessage)
+        violations.append(Violation(
+            results.value(result, SH.focusNode),
+            results.value(result, SH.resultPath),
+            results.value(result, SH.sourceConstraintComponent),
+            results.value(result, SH.value),
+            results.value(result, SH.sourceShape),
+            str(message) if message is not None else None,
+        ))
+    return violations
+
+def datatype_matches(value: Node, datatype: URIRef) -> bool:
+    """
+    sh:datatype as pyshacl evaluates it, including its ill-typed literal
+    and value type checks.
+    """
+    if not isinstance(value, Literal):
+        return False
+    if value.datatype == datatype:
+        if getattr(value, "ill_typed", None) is True:
+            return False
+    elif datatype == RDFS.Literal:
+        return True
+    elif datatype == RDFS.Datatype and value.datatype:
+        return True
+    elif not ((value.datatype is None and value.language is None and datatype == XSD.string)
+              or (datatype == RDF.langString and value.language)):
+        return False
+    expected = DATATYPE_VALUES.get(datatype)
+    return expected is None or isinstance(value.value, expected)
+
+def datatype_check(datatype: URIRef) -> Callable[[Node], bool]:
+    """
+    datatype_matches specialised for one datatype, with a shortcut for the
+    common cases of a well-typed literal of exactly that datatype and of a
+    plain literal checked against xsd:string.
+    """
+    expected = DATATYPE_VALUES.get(datatype)
+    plain = datatype == XSD.string
+
+    def check(value: Node) -> bool:
+        if isinstance(value, Literal):
+            if value.datatype == datatype and getattr(value, "ill_typed", None) is not True:
+                return expected is None or isinstance(value.value, expected)
+            if plain and value.datatype is None and value.language is None:
+                return True
+        return datatype_matches(value, datatype)
+
+    return check
+
+_NO_VALUES: Dict[Node, None] = {}
+
+def subclass_closure(subclasses: Callable[[Node], Iterable[Node]],
+                     target_classes: Iterable[Node]) -> Dict[Node, FrozenSet[Node]]:
+    """
+    Map every class to the target classes it is a subclass of (itself
+    included), following subclasses(c), the direct subclasses of c.
+    """
+    closure: Dict[Node, Set[Node]] = {}
+    for target_class in target_classes:
+        seen = {target_class}
+        stack = [target_class]
+        while stack:
+            cls = stack.pop()
+            closure.setdefault(cls, set()).add(target_class)
+            for sub in subclasses(cls):
+                if sub not in seen:
+                    seen.add(sub)
+                    stack.append(sub)
+    return {cls: frozenset(targets) for cls, targets in closure.items()}
+
+def class_hierarchy(graph: Optional[Graph]) -> Dict[Node, List[Node]]:
+    """
+    The direct named subclasses of every class of graph, from its
+    rdfs:subClassOf statements.
+    """
+    hierarchy: Dict[Node, List[Node]] = {}
+    if graph is not None:
+        for sub, sup in graph.subject_objects(SUBCLASS_OF):
+            if isinstance(sub, URIRef) and isinstance(sup, URIRef) and sub != sup:
+                hierarchy.setdefault(sup, []).append(sub)
+    return hierarchy
+
+class DataIndex:
+    """
+    The part of a data graph the compiled checks look at: types, the
+    rdfs:subClassOf hierarchy and the values of the constrained paths.
+    Built either from a triple stream, so that no full Graph is needed, or
+    over a Graph, whose values are then loaded for the focus nodes only.
+    """
+
+    def __init__(self, paths: Set[Node], graph: Optional[Graph] = None):
+        self.paths = paths
+        self.graph = graph
+        self.instances: Dict[Node, Dict[Node, None]] = {}
+        self.subclasses: Dict[Node, Dict[Node, None]] = {}
+        self._values: Dict[Tuple[Node, Node], Dict[Node, None]] = {}
+
+    def add(self, triple: Tuple[Node, Node, Node]) -> None:
+        s, p, o = triple
+        if p == TYPE:
+            self.instances.setdefault(o, {})[s] = None
+        elif p == SUBCLASS_OF:
+            self.subclasses.setdefault(o, {})[s] = None
+        if p in self.paths:
+            self._values.setdefault((s, p), {})[o] = None
+
+    @classmethod
+    def from_graph(cls, graph: Graph, paths: Set[Node]) -> 'DataIndex':
+        """
+        Index the types and the rdfs:subClassOf statements of a Graph.
+        """
+        index = cls(paths, graph)
+        for s, o in graph.subject_objects(TYPE):
+            index.instances.setdefault(o, {})[s] = None
+        for s, o in graph.subject_objects(SUBCLASS_OF):
+            index.subclasses.setdefault(o, {})[s] = None
+        return index
+
+    def subjects(self, predicate: Node, obj: Node) -> Iterable[Node]:
+        table = self.instances if predicate == TYPE else self.subclasses
+        return table.get(obj, {}).keys()
+
+    def transitive_subjects(self, predicate: Node, obj: Node) -> Iterable[Node]:
+        seen = {obj: None}
+        stack = [obj]
+        while stack:
+            for sub in self.subjects(predicate, stack.pop()):
+                if sub not in seen:
+                    seen[sub] = None
+                    stack.append(sub)
+        return seen.keys()
+
+    def prefetch(self, subjects: Collection[Node]) -> None:
+        """
+        Load the values of subjects from the indexed Graph. When they are
+        most of the typed entities, every path is scanned once; otherwise
+        each subject is looked up, so that the cost follows the number of
+        subjects rather than the size of the graph.
+        """
+        if self.graph is None:
+            return
+        values, paths = self._values, self.paths
+        # Entities with several types count several times: close enough
+        typed = sum(len(members) for members in self.instances.values())
+        if 2 * len(subjects) >= typed:
+            for p in paths:
+                for s, o in self.graph.subject_objects(p):
+                    if s in subjects:
+                        values.setdefault((s, p), {})[o] = None
+        else:
+            for s in subjects:
+                for p, o in self.graph.predicate_objects(s):
+                    if p in paths:
+                        values.setdefault((s, p), {})[o] = None
+
+    def objects(self, subject: Node, predicate: Node) -> Collection[Node]:
+        return self._values.get((subject, predicate), _NO_VALUES).keys()
+
+Check = Callable[[Node, Collection[Node], List[Violation]], None]
+
+def compile_property_shape(shapes: Graph, node: Node) -> Optional[Tuple[Node, Check]]:
+    """
+    Compile one property shape into (path, check), or None when it uses
+    anything outside the supported subset.
+    """
+    if not set(shapes.predicates(node)) <= PROPERTY_SHAPE_PREDICATES:
+        return None
+    if any(len(list(shapes.objects(node, p))) > 1 for p in PROPERTY_SHAPE_PREDICATES):
+        return None
+    path = shapes.value(node, SH.path)
+    if not isinstance(path, URIRef):
+        return None
+
+    min_count = shapes.value(node, SH.minCount)
+    max_count = shapes.value(node, SH.maxCount)
+    min_count = int(min_count) if min_count is not None else None
+    max_count = int(max_count) if max_count is not None else None
+    if min_count == 0:
+        min_count = None
+
+    value_checks: List[Tuple[Node, Callable[[Node], bool]]] = []
+    datatype = shapes.value(node, SH.datatype)
+    if datatype is not None:
+        value_checks.append((DATATYPE, datatype_check(datatype)))
+    node_kind = shapes.value(node, SH.nodeKind)
+    if node_kind is not None:
+        if node_kind not in NODE_KINDS:
+            return None
+        value_checks.append((NODE_KIND, NODE_KINDS[node_kind]))
+    alternatives = shapes.value(node, SH['or'])
+    if alternatives is not None:
+        members = list(shapes.items(alternatives))
+        if len(members) != 2:
+            return None
+        class_alt, kind_alt = members
+        if (set(shapes.predicate_objects(kind_alt)) != {(SH.nodeKind, SH.BlankNodeOrIRI)}
+                or set(shapes.predicates(class_alt)) != {SH['class']}
+                or len(list(shapes.objects(class_alt, SH['class']))) != 1):
+            return None
+        # The second alternative accepts every IRI and blank node, and
+        # sh:class never accepts a literal: only literals violate sh:or
+        value_checks.append((OR, lambda v: not isinstance(v, Literal)))
+
+    def check(focus: Node, values: Collection[Node], out: List[Violation]) -> None:
+        count = len(values)
+        if min_count is not None and count < min_count:
+            out.append(Violation(focus, path, MIN_COUNT, None, node,
+                                 f"Less than {min_count} values on {focus.n3()}->{path.n3()}"))
+        if max_count is not None and count > max_count:
+            out.append(Violation(focus, path, MAX_COUNT, None, node,
+                                 f"More than {max_count} values on {focus.n3()}->{path.n3()}"))
+        for component, ok in value_checks:
+            for value in values:
+                if not ok(value):
+                    out.append(Violation(focus, path, component, value, node))
+
+    return path, check
+
+class CompiledShapes:
+    """
+    Compiled checks indexed by target class, plus the shapes that fell back
+    to pyshacl. hierarchy is the ontology the data is validated against,
+    of which only the rdfs:subClassOf statements are used.
+    """
+
+    def __init__(self, checks: Dict[Node, List[Tuple[Node, Check]]], fallback: Optional[Graph] = None,
+                 hierarchy: Optional[Graph] = None):
+        self.checks = checks
+        self.fallback = fallback
+        self.hierarchy = hierarchy
+        self.paths = {path for shape_checks in checks.values() for path, _ in shape_checks}
+        self._subclasses = class_hierarchy(hierarchy)
+        self.targets = subclass_closure(lambda c: self._subclasses.get(c, ()), checks)
+
+    def _focus_targets(self, data: DataIndex) -> Dict[Node, FrozenSet[Node]]:
+        """
+        Map every focus node to the target classes it is an instance of.
+        """
+        targets = self.targets
+        if data.subclasses:
+            # The data extends the hierarchy
+            ontology = self._subclasses
+            targets = subclass_closure(lambda c: list(ontology.get(c, ())) + list(data.subjects(SUBCLASS_OF, c)),
+                                       self.checks)
+        focus: Dict[Node, FrozenSet[Node]] = {}
+        for cls, members in data.instances.items():
+            implied = targets.get(cls)
+            if implied:
+                for node in members:
+                    current = focus.get(node)
+                    focus[node] = implied if current is None else current | implied
+        return focus
+
+    def _run_checks(self, data: DataIndex) -> List[Violation]:
+        violations: List[Violation] = []
+        objects = data.objects
+        checks = self.checks
+        focus_targets = self._focus_targets(data)
+        data.prefetch(focus_targets)
+        for focus, target_classes in focus_targets.items():
+            for target_class in target_classes:
+                for path, check in checks[target_class]:
+                    check(focus, objects(focus, path), violations)
+        return violations
+
+    def _run_fallback(self, data_graph: Graph) -> List[Violation]:
+        if self.fallback is None:
+            return []
+        from pyshacl import validate
+
+        _, results, _ = validate(data_graph=data_graph, shacl_graph=self.fallback, ont_graph=self.hierarchy,
+                                 debug=False)
+        return violations_from_results(results)
+
+    def validate(self, data_graph: Graph) -> Tuple[bool, List[Violation]]:
+        index = DataIndex.from_graph(data_graph, self.paths)
+        violations = self._run_checks(index) + self._run_fallback(data_graph)
+        return not violations, violations
+
+    def validate_triples(self, triples: Iterable[Tuple[Node, Node, Node]]) -> Tuple[bool, List[Violation]]:
+        """
+        Validate a triple stream. Only the triples the checks need are kept,
+        unless some shapes fell back to pyshacl, which needs a whole Graph.
+        """
+        if self.fallback is not None:
+            data_graph = Graph()
+            for triple in triples:
+                data_graph.add(triple)
+            return self.validate(data_graph)
+        index = DataIndex(self.paths)
+        for triple in triples:
+            index.add(triple)
+        violations = self._run_checks(index)
+        return not violations, violations
+
+def _copy_shape(shapes: Graph, node: Node, target: Graph) -> None:
+    """
+    Copy a shape and all the blank nodes it reaches into target.
+    """
+    stack, seen = [node], set()
+    while stack:
+        subject = stack.pop()
+        if subject in seen:
+            continue
+        seen.add(subject)
+        for p, o in shapes.predicate_objects(subject):
+            target.add((subject, p, o))
+            if isinstance(o, BNode):
+                stack.append(o)
+
+def _root_shapes(shapes: Graph) -> List[Node]:
+    """
+    The shapes validation starts from: the node shapes, and every shape with
+    a target, declared as a shape or not.
+    """
+    roots = dict.fromkeys(shapes.subjects(RDF.type, SH.NodeShape, unique=True))
+    for predicate in TARGET_PREDICATES:
+        roots.update(dict.fromkeys(shapes.subjects(predicate, None, unique=True)))
+    return list(roots)
+
+def compile_shapes(shapes: Graph, hierarchy: Optional[Graph] = None) -> CompiledShapes:
+    """
+    Compile a shapes graph, typically the output of create_shacl_shapes.
+    Shapes that cannot be compiled are validated by pyshacl instead.
+    hierarchy holds the rdfs:subClassOf statements of the ontology (see
+    load_class_hierarchy), which extend the targets of the shapes to the
+    instances of subclasses.
+    """
+    checks: Dict[Node, List[Tuple[Node, Check]]] = {}
+    fallback = None
+    for shape in _root_shapes(shapes):
+        targets = list(shapes.objects(shape, SH.targetClass))
+        compiled = [compile_property_shape(shapes, p) for p in shapes.objects(shape, SH.property)]
+        # Any other type, such as rdfs:Class for implicit class targets, is
+        # left to pyshacl
+        if (len(targets) != 1 or not set(shapes.predicates(shape)) <= NODE_SHAPE_PREDICATES
+                or not set(shapes.objects(shape, RDF.type)) <= {SH.NodeShape} or None in compiled):
+            if fallback is None:
+                fallback = Graph()
+                for prefix, namespace in shapes.namespaces():
+                    fallback.bind(prefix, namespace)
+            _copy_shape(shapes, shape, fallback)
+            continue
+        checks.setdefault(targets[0], []).extend(compiled)
+    return CompiledShapes(checks, fallback, hierarchy)
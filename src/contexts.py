@@ -0,0 +1,135 @@
+"""
+Resolution of remote JSON-LD @context references from local copies.
+
+SKG-IF documents reference their context by URL, which rdflib fetches again
+for every document it parses. A ContextResolver replaces every such
+reference with the content of the context, read from the context submodule
+(context/ver/<version>/...) when the URL is an SKG-IF context URL, and from
+the network otherwise. Each context is loaded once per process and reused
+for every document. In offline mode, remote contexts without a local copy
+are an error instead of a network request.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from pathlib import Path
+from typing import Any, Dict, Iterable, Optional, Set, Union
+from urllib.parse import urljoin, urlparse
+
+CONTEXT_BASE_PATH = Path("context/ver")
+
+# URL prefixes served by the files under CONTEXT_BASE_PATH
+CONTEXT_URL_PREFIXES = (
+    "https://w3id.org/skg-if/context/",
+    "http://w3id.org/skg-if/context/",
+    "https://skg-if.github.io/context/ver/",
+)
+
+REMOTE_TIMEOUT = 30
+
+class ContextResolver:
+    """
+    Inlines the remote contexts referenced by JSON-LD @context values.
+    Safe to share between threads.
+    """
+
+    def __init__(self, base_path: Union[str, os.PathLike, None] = None, offline: bool = False,
+                 url_prefixes: Iterable[str] = CONTEXT_URL_PREFIXES):
+        self.base_path = Path(base_path) if base_path is not None else CONTEXT_BASE_PATH
+        self.offline = offline
+        self.url_prefixes = tuple(url_prefixes)
+        self.local = 0
+        self.remote = 0
+        self._resolved: Dict[str, Any] = {}
+        self._lock = threading.RLock()
+
+    def local_path(self, url: str) -> Optional[Path]:
+        """
+        The local copy of the context at url, if url is a context URL
+        served from base_path.
+        """
+        for prefix in self.url_prefixes:
+            if url.startswith(prefix):
+                return self.base_path / url[len(prefix):].split('#')[0].split('?')[0]
+        return None
+
+    def fingerprint(self) -> str:
+        """
+        SHA-256 of the local context documents (base_path/*/*.json*), which
+        changes whenever the context submodule is updated.
+        """
+        h = hashlib.sha256(f"{self.offline}\0{self.url_prefixes}".encode('utf-8'))
+        for path in sorted(self.base_path.glob("*/*.json*")):
+            h.update(f"\0{path.relative_to(self.base_path).as_posix()}\0".encode('utf-8'))
+            h.update(path.read_bytes())
+        return h.hexdigest()
+
+    def _fetch(self, url: str) -> Any:
+        path = self.local_path(url)
+        if path is not None and path.is_file():
+            with open(path, 'r', encoding='utf-8') as f:
+                document = json.load(f)
+            self.local += 1
+        elif self.offline:
+            raise ValueError(f"JSON-LD context {url} is not available offline"
+                             + (f" (no local copy at {path})" if path is not None else ""))
+        else:
+            from urllib.request import Request, urlopen
+
+            request = Request(url, headers={"Accept": "application/ld+json, application/json"})
+            with urlopen(request, timeout=REMOTE_TIMEOUT) as response:
+                document = json.load(response)
+            self.remote += 1
+        if not isinstance(document, dict) or "@context" not in document:
+            raise ValueError(f"{url} is not a JSON-LD context document")
+        return document["@context"]
+
+    def _load(self, url: str, loading: Set[str]) -> Any:
+        resolved = self._resolved.get(url)
+        if resolved is None:
+            if url in loading:
+                raise ValueError(f"JSON-LD context {url} references itself")
+            resolved = self._resolve(self._fetch(url), url, loading | {url})
+            self._resolved[url] = resolved
+        return resolved
+
+    def _resolve(self, context: Any, base: Optional[str], loading: Set[str]) -> Any:
+        if isinstance(context, str):
+            url = urljoin(base, context) if base else context
+            if urlparse(url).scheme not in ('http', 'https'):
+                # A local file, relative to the document: left to rdflib
+                return context
+            return self._load(url, loading)
+        if isinstance(context, list):
+            resolved = []
+            for item in context:
+                item = self._resolve(item, base, loading)
+                # A context array cannot hold arrays: splice them
+                resolved.extend(item if isinstance(item, list) else [item])
+            return resolved
+        if not isinstance(context, dict):
+            return context
+        resolved = {}
+        if isinstance(context.get("@import"), str):
+            imported = self._resolve(context["@import"], base, loading)
+            if isinstance(imported, dict):
+                resolved.update(imported)
+        for key, value in context.items():
+            if key == "@import":
+                continue
+            if isinstance(value, dict) and "@context" in value:
+                # Scoped context of a term definition
+                value = dict(value, **{"@context": self._resolve(value["@context"], base, loading)})
+            resolved[key] = value
+        return resolved
+
+    def resolve(self, context: Any, base: Optional[str] = None) -> Any:
+        """
+        Return context, the value of an @context, with every reference to a
+        remote context replaced by the content of that context. Relative
+        references are resolved against base.
+        """
+        with self._lock:
+            return self._resolve(context, base, set())
@@ -0,0 +1,119 @@
+"""
+Second extraction stage: turn the shape IR into SHACL triples.
+"""
+
+from typing import Iterator, Optional, Set, Tuple
+
+from rdflib import BNode, Graph, Literal, Namespace, URIRef
+from rdflib.namespace import RDF, XSD
+from rdflib.term import Node
+
+from src.ir import (ALTERNATIVES_TAIL_LABEL, CLASS, DATATYPE, LITERAL, NODE_KIND_LABEL, NodeShape, PropertyShape,
+                    ShapeIR, alternatives_label, class_constraint_label, property_label)
+
+SH = Namespace("http://www.w3.org/ns/shacl#")
+
+Triple = Tuple[Node, Node, Node]
+
+def shared_alternatives(target: str, shared: Set[str]) -> Iterator[Triple]:
+    """
+    Yield the triples of the sh:or list of target, and of the tail all such
+    lists share, unless shared says they were already emitted.
+    """
+    or_label = alternatives_label(target)
+    if or_label in shared:
+        return
+    shared.add(or_label)
+    or_node, tail = BNode(or_label), BNode(ALTERNATIVES_TAIL_LABEL)
+    class_constraint = BNode(class_constraint_label(target))
+    yield or_node, RDF.first, class_constraint
+    yield class_constraint, SH['class'], URIRef(target)
+    yield or_node, RDF.rest, tail
+    if ALTERNATIVES_TAIL_LABEL not in shared:
+        shared.add(ALTERNATIVES_TAIL_LABEL)
+        nodekind_constraint = BNode(NODE_KIND_LABEL)
+        yield tail, RDF.first, nodekind_constraint
+        yield nodekind_constraint, SH.nodeKind, SH.BlankNodeOrIRI
+        yield tail, RDF.rest, RDF.nil
+
+def property_triples(shape_uri: URIRef, prop: PropertyShape, shared: Optional[Set[str]] = None) -> Iterator[Triple]:
+    """
+    Yield the triples of one property shape. With shared, the labels of the
+    shared nodes emitted so far, every blank node gets a content-derived
+    label and the sh:or lists are shared between property shapes.
+    """
+    bnode = BNode() if shared is None else BNode(property_label(str(shape_uri), prop))
+    yield shape_uri, SH.property, bnode
+    yield bnode, SH.path, URIRef(prop.path)
+
+    if prop.min_count is not None:
+        yield bnode, SH.minCount, Literal(prop.min_count, datatype=XSD.integer)
+    if prop.max_count is not None:
+        yield bnode, SH.maxCount, Literal(prop.max_count, datatype=XSD.integer)
+
+    if prop.kind == LITERAL:
+        yield bnode, SH.nodeKind, SH.Literal
+    elif prop.kind == DATATYPE:
+        yield bnode, SH.datatype, URIRef(prop.target)
+    elif prop.kind == CLASS and shared is not None:
+        yield bnode, SH['or'], BNode(alternatives_label(prop.target))
+        yield from shared_alternatives(prop.target, shared)
+    elif prop.kind == CLASS:
+        # sh:or ( [ sh:class <target> ] [ sh:nodeKind sh:BlankNodeOrIRI ] )
+        or_node = BNode()
+        yield bnode, SH['or'], or_node
+
+        class_constraint = BNode()
+        yield or_node, RDF.first, class_constraint
+        yield class_constraint, SH['class'], URIRef(prop.target)
+
+        rest_node = BNode()
+        yield or_node, RDF.rest, rest_node
+
+        nodekind_constraint = BNode()
+        yield rest_node, RDF.first, nodekind_constraint
+        yield nodekind_constraint, SH.nodeKind, SH.BlankNodeOrIRI
+        yield rest_node, RDF.rest, RDF.nil
+
+def shape_triple_count(shape: NodeShape, shared: Optional[Set[str]] = None) -> int:
+    """
+    The number of triples the shape is emitted as, without emitting them.
+    With shared, as in property_triples, the shared sh:or lists are only
+    counted the first time.
+    """
+    count = 2
+    for prop in shape.properties:
+        count += 2 + (prop.min_count is not None) + (prop.max_count is not None)
+        if prop.kind != CLASS:
+            count += 1
+        elif shared is None:
+            count += 7
+        else:
+            count += sum(1 for _ in shared_alternatives(prop.target, shared)) + 1
+    return count
+
+def iter_triples(ir: ShapeIR, stable_ids: bool = False) -> Iterator[Triple]:
+    """
+    Yield the SHACL triples of every shape in the IR, shape by shape. With
+    stable_ids the blank nodes have content-derived labels and identical
+    sh:or lists are only emitted once.
+    """
+    shared: Optional[Set[str]] = set() if stable_ids else None
+    for shape in ir.shapes:
+        shape_uri = URIRef(shape.iri)
+        yield shape_uri, RDF.type, SH.NodeShape
+        yield shape_uri, SH.targetClass, URIRef(shape.target_class)
+        for prop in shape.properties:
+            yield from property_triples(shape_uri, prop, shared)
+
+def emit_graph(ir: ShapeIR, stable_ids: bool = False) -> Graph:
+    """
+    Build an rdflib Graph holding the SHACL shapes of the IR.
+    """
+    shacl = Graph()
+    shacl.bind('sh', SH)
+    for prefix, namespace in ir.namespaces:
+        shacl.bind(prefix, namespace)
+    for triple in iter_triples(ir, stable_ids):
+        shacl.add(triple)
+    return shacl
@@ -0,0 +1,216 @@
+"""
+Normalization of text files to UTF-8 without a byte order mark.
+
+Ontologies and data dumps are sometimes saved as UTF-16 or with a BOM, which
+the parsers reject or misread. normalize_files takes files, directory trees
+and glob patterns, detects the encoding of every file from a bounded prefix
+and transcodes it in fixed-size chunks into a temporary file that then
+replaces the original, so memory does not depend on the size of the file and
+an interrupted run never leaves a truncated file behind. Files that are
+already clean UTF-8 are read but never rewritten. Files are processed in
+parallel by a process pool.
+"""
+
+import argparse
+import codecs
+import fnmatch
+import glob
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Iterable, Iterator, List, Optional, Tuple
+
+from src.atomic import atomic_write
+
+PREFIX_SIZE = 64 * 1024
+CHUNK_SIZE = 1024 * 1024
+
+# Used when a file without BOM is not valid UTF-8
+FALLBACK_ENCODING = 'iso-8859-1'
+
+# UTF-32 first: its little-endian BOM starts with the UTF-16 one
+BOMS = (
+    (codecs.BOM_UTF32_LE, 'utf-32-le'),
+    (codecs.BOM_UTF32_BE, 'utf-32-be'),
+    (codecs.BOM_UTF8, 'utf-8'),
+    (codecs.BOM_UTF16_LE, 'utf-16-le'),
+    (codecs.BOM_UTF16_BE, 'utf-16-be'),
+)
+
+# Files picked up when walking a directory
+DEFAULT_PATTERNS = ('*.ttl', '*.nt', '*.n3', '*.owl', '*.rdf', '*.xml', '*.json', '*.jsonld', '*.jsonl',
+                    '*.ndjson', '*.csv', '*.md', '*.txt', '*.toml', '*.py')
+
+CLEAN = 'clean'
+CONVERTED = 'converted'
+WOULD_CONVERT = 'would convert'
+SKIPPED = 'skipped'
+MISSING = 'missing'
+ERROR = 'error'
+
+class FileResult:
+    __slots__ = ('path', 'status', 'encoding', 'bom', 'message')
+
+    def __init__(self, path: str, status: str, encoding: Optional[str] = None, bom: bool = False,
+                 message: Optional[str] = None):
+        self.path = path
+        self.status = status
+        self.encoding = encoding
+        self.bom = bom
+        self.message = message
+
+    def __str__(self):
+        detail = self.message or (self.encoding or '') + (' with BOM' if self.bom else '')
+        return f"{self.status}: {self.path}" + (f" ({detail})" if detail else "")
+
+def detect_encoding(prefix: bytes, complete: bool = False) -> Tuple[str, int]:
+    """
+    The encoding of a file starting with prefix, and the length of its BOM.
+    complete tells that prefix is the whole file. Raises ValueError for
+    binary content.
+    """
+    for bom, encoding in BOMS:
+        if prefix.startswith(bom):
+            return encoding, len(bom)
+    if b'\0' in prefix:
+        # UTF-16 without BOM: mostly-ASCII text has a NUL in every other byte
+        pairs = len(prefix) // 2
+        even = prefix[0:2 * pairs:2].count(0)
+        odd = prefix[1:2 * pairs:2].count(0)
+        if odd > pairs // 2 and even == 0:
+            return 'utf-16-le', 0
+        if even > pairs // 2 and odd == 0:
+            return 'utf-16-be', 0
+        raise ValueError("binary content")
+    try:
+        codecs.getincrementaldecoder('utf-8')().decode(prefix, final=complete)
+    except UnicodeDecodeError:
+        return FALLBACK_ENCODING, 0
+    return 'utf-8', 0
+
+def _transcode(src, encoding: str, out=None, chunk_size: int = CHUNK_SIZE) -> None:
+    # Decode src from its current position, writing UTF-8 to out if given
+    decoder = codecs.getincrementaldecoder(encoding)()
+    while True:
+        data = src.read(chunk_size)
+        text = decoder.decode(data, final=not data)
+        if out is not None and text:
+            out.write(text.encode('utf-8'))
+        if not data:
+            return
+
+def _is_utf8(src, chunk_size: int = CHUNK_SIZE) -> bool:
+    try:
+        _transcode(src, 'utf-8', chunk_size=chunk_size)
+    except UnicodeDecodeError:
+        return False
+    return True
+
+def normalize_file(path: str, dry_run: bool = False, chunk_size: int = CHUNK_SIZE) -> FileResult:
+    """
+    Rewrite the file at path as UTF-8 without BOM, unless it already is, or
+    with dry_run only report what would be done.
+    """
+    if not os.path.lexists(path):
+        return FileResult(path, MISSING)
+    try:
+        with open(path, 'rb') as src:
+            prefix = src.read(PREFIX_SIZE)
+            try:
+                encoding, bom = detect_encoding(prefix, complete=len(prefix) < PREFIX_SIZE)
+            except ValueError as e:
+                return FileResult(path, SKIPPED, message=str(e))
+            if encoding == 'utf-8' and not bom:
+                src.seek(0)
+                if _is_utf8(src, chunk_size):
+                    return FileResult(path, CLEAN, encoding)
+                # Invalid UTF-8 past the prefix
+                encoding = FALLBACK_ENCODING
+            src.seek(bom)
+            if dry_run:
+                _transcode(src, encoding, chunk_size=chunk_size)
+                return FileResult(path, WOULD_CONVERT, encoding, bool(bom))
+            with atomic_write(path, 'wb') as out:
+                _transcode(src, encoding, out, chunk_size)
+        return FileResult(path, CONVERTED, encoding, bool(bom))
+    except (OSError, UnicodeDecodeError) as e:
+        return FileResult(path, ERROR, message=str(e))
+
+def _has_magic(spec: str) -> bool:
+    return any(c in spec for c in '*?[')
+
+def _walk(directory: str, patterns: Iterable[str]) -> Iterator[str]:
+    for root, dirs, files in os.walk(directory):
+        dirs[:] = sorted(d for d in dirs if not d.startswith('.') and d != '__pycache__')
+        for name in sorted(files):
+            if any(fnmatch.fnmatch(name, pattern) for pattern in patterns):
+                yield os.path.join(root, name)
+
+def iter_paths(specs: Iterable[str], patterns: Iterable[str] = DEFAULT_PATTERNS) -> Iterator[str]:
+    """
+    The files named by specs, each at most once: files as they are,
+    directories walked recursively for the files matching patterns, and
+    glob patterns (with ** for any depth) expanded. Missing files are
+    yielded too, to be reported.
+    """
+    patterns = tuple(patterns)
+    seen = set()
+    for spec in specs:
+        if _has_magic(spec):
+            matches = sorted(glob.glob(spec, recursive=True))
+        else:
+            matches = [spec]
+        for match in matches:
+            paths = _walk(match, patterns) if os.path.isdir(match) else [match]
+            for path in paths:
+                key = os.path.normpath(os.path.abspath(path))
+                if key not in seen:
+                    seen.add(key)
+                    yield path
+
+def normalize_files(specs: Iterable[str], dry_run: bool = False, workers: Optional[int] = None,
+                    patterns: Iterable[str] = DEFAULT_PATTERNS, chunk_size: int = CHUNK_SIZE) -> Iterator[FileResult]:
+    """
+    Normalize the files named by specs (see iter_paths) with normalize_file
+    in a pool of workers processes (default: CPU count), yielding their
+    results in order.
+    """
+    paths = list(iter_paths(specs, patterns))
+    normalize = partial(normalize_file, dry_run=dry_run, chunk_size=chunk_size)
+    workers = min(len(paths), workers or os.cpu_count() or 1)
+    if workers <= 1:
+        yield from map(normalize, paths)
+        return
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        yield from executor.map(normalize, paths, chunksize=max(1, len(paths) // (4 * workers)))
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description='Convert text files to UTF-8 without byte order mark')
+    parser.add_argument('paths', nargs='+', help='Files, directories (searched recursively) or glob patterns')
+    parser.add_argument('--include', action='append', metavar='PATTERN',
+                        help='File name pattern to pick up in directories, repeatable '
+                        f'(default: {" ".join(DEFAULT_PATTERNS)})')
+    parser.add_argument('--dry-run', action='store_true', help='Report the files to convert without changing them')
+    parser.add_argument('--workers', type=int, help='Worker processes (default: CPU count)')
+    parser.add_argument('--chunk-size', type=int, default=CHUNK_SIZE,
+                        help=f'Bytes read at a time (default: {CHUNK_SIZE})')
+    parser.add_argument('--verbose', action='store_true', help='Also list the files that are already clean')
+
+    args = parser.parse_args(argv)
+    if args.chunk_size < 1:
+        parser.error("--chunk-size must be positive")
+
+    counts = {status: 0 for status in (CLEAN, CONVERTED, WOULD_CONVERT, SKIPPED, MISSING, ERROR)}
+    for result in normalize_files(args.paths, dry_run=args.dry_run, workers=args.workers,
+                                  patterns=args.include or DEFAULT_PATTERNS, chunk_size=args.chunk_size):
+        counts[result.status] += 1
+        if result.status != CLEAN or args.verbose:
+            print(result)
+
+    print(", ".join(f"{count} {status}" for status, count in counts.items() if count) or "No files",
+          file=sys.stderr)
+    sys.exit(1 if counts[ERROR] else 0)
+
+if __name__ == "__main__": # pragma: no cover
+    main()
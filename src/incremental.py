@@ -0,0 +1,189 @@
+"""
+Incremental re-extraction of the shapes of one ontology.
+
+A state file next to the output records the extractor and shapes versions,
+the output format, the namespace bindings and, for every described class, a
+fingerprint of its dc:description together with its NodeShape in compact
+JSON. A later run re-parses only the descriptions whose fingerprint changed,
+and rewrites the output from the patched shapes with the streaming writers,
+without building a shapes Graph. Any other change (extractor or shapes
+version, format or namespace bindings) invalidates the state and triggers a
+full extraction.
+
+watch repeats the update whenever the ontology changes on disk.
+"""
+
+import hashlib
+import json
+import logging
+import os
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
+
+from src import SHAPES_VERSION, __version__
+from src.atomic import atomic_write
+from src.ir import NodeShape, ShapeIR, UnparsedLine, parse_description, shape_from_json, shape_to_json
+from src.loader import load_ontology, read_prefix_declarations
+from src.main import described_classes, report_unparsed
+from src.writer import write_shapes
+
+logger = logging.getLogger(__name__)
+
+# Bump whenever the layout of the state file changes.
+STATE_FORMAT = 1
+
+STATE_SUFFIX = ".state.json"
+
+DEFAULT_INTERVAL = 0.2
+DEFAULT_DEBOUNCE = 0.3
+
+def description_fingerprint(description: str) -> str:
+    return hashlib.sha256(description.encode('utf-8')).hexdigest()
+
+def state_path_for(output_file: Union[str, os.PathLike]) -> Path:
+    return Path(str(output_file) + STATE_SUFFIX)
+
+class ShapesDiff:
+    """
+    The classes whose NodeShape was added, changed or removed by an update.
+    full is set when the previous state could not be reused.
+    """
+    __slots__ = ('added', 'changed', 'removed', 'full')
+
+    def __init__(self, added: Optional[List[str]] = None, changed: Optional[List[str]] = None,
+                 removed: Optional[List[str]] = None, full: bool = False):
+        self.added = added if added is not None else []
+        self.changed = changed if changed is not None else []
+        self.removed = removed if removed is not None else []
+        self.full = full
+
+    def __bool__(self):
+        return bool(self.added or self.changed or self.removed)
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {"full": self.full, "added": self.added, "changed": self.changed, "removed": self.removed}
+
+    def __str__(self):
+        summary = f"{len(self.added)} added, {len(self.changed)} changed, {len(self.removed)} removed"
+        return summary + " (full extraction)" if self.full else summary
+
+    def __repr__(self):
+        return f"ShapesDiff({self.added!r}, {self.changed!r}, {self.removed!r}, full={self.full!r})"
+
+def load_state(path: Union[str, os.PathLike]) -> Optional[Dict[str, Any]]:
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+    if not isinstance(state, dict) or state.get("format") != STATE_FORMAT:
+        return None
+    return state
+
+def update_shapes(input_file: str, output_file: str, format: str = 'turtle',
+                  prefixes: Optional[List[Tuple[str, str]]] = None, stable_ids: bool = False) -> ShapesDiff:
+    """
+    Bring output_file up to date with input_file, re-parsing only the class
+    descriptions that changed since the previous update. The output is left
+    untouched when nothing changed. Unparsed entries are only reported for
+    the descriptions that were re-parsed.
+    """
+    g = load_ontology(input_file, prefixes=prefixes)
+    namespaces = [(prefix, str(ns)) for prefix, ns in g.namespaces()]
+
+    output_path = Path(output_file)
+    state_path = state_path_for(output_file)
+    state = load_state(state_path)
+    reusable = (state is not None and output_path.exists() and state.get("version") == __version__
+                and state.get("shapes_version") == SHAPES_VERSION
+                and state.get("output_format") == format and state.get("stable_ids", False) == stable_ids
+                and [tuple(ns) for ns in state.get("namespaces", [])] == namespaces)
+    previous: Dict[str, list] = state["classes"] if reusable else {}
+
+    prefix_map = dict(namespaces)
+    unparsed: List[UnparsedLine] = []
+    diff = ShapesDiff(full=not reusable)
+    classes: Dict[str, list] = {}
+    shapes: List[NodeShape] = []
+    for cls, desc in described_classes(g):
+        fingerprint = description_fingerprint(desc)
+        entry = previous.get(cls)
+        if entry is not None and entry[0] == fingerprint:
+            shape = shape_from_json(entry[1])
+        else:
+            shape = parse_description(cls, desc, prefix_map, unparsed)
+            (diff.changed if entry is not None else diff.added).append(cls)
+        classes[cls] = [fingerprint, shape_to_json(shape)]
+        shapes.append(shape)
+    diff.removed = [cls for cls in previous if cls not in classes]
+    report_unparsed(ShapeIR(namespaces, [], unparsed))
+
+    if diff or not reusable:
+        with atomic_write(output_path, newline='\n') as out:
+            write_shapes(shapes, namespaces, out, format, stable_ids)
+        state = {
+            "format": STATE_FORMAT,
+            "version": __version__,
+            "shapes_version": SHAPES_VERSION,
+            "output_format": format,
+            "stable_ids": stable_ids,
+            "namespaces": namespaces,
+            "classes": classes,
+        }
+        with atomic_write(state_path, newline='\n') as out:
+            json.dump(state, out, separators=(',', ':'))
+    return diff
+
+def _snapshot(paths: Iterable[Path]) -> Dict[Path, Optional[Tuple[int, int]]]:
+    snapshot = {}
+    for path in paths:
+        try:
+            st = path.stat()
+            snapshot[path] = (st.st_mtime_ns, st.st_size)
+        except FileNotFoundError:
+            # Editors may replace a file by renaming a new one over it
+            snapshot[path] = None
+    return snapshot
+
+def watch(paths: Iterable[Union[str, os.PathLike]], callback: Callable[[], None],
+          interval: float = DEFAULT_INTERVAL, debounce: float = DEFAULT_DEBOUNCE,
+          stop: Optional[Callable[[], bool]] = None) -> None:
+    """
+    Poll the modification times of paths every interval seconds and call
+    callback once they have stopped changing for debounce seconds, so a
+    burst of writes from an editor triggers a single run. Runs until stop
+    returns True, or forever.
+    """
+    paths = [Path(p) for p in paths]
+    last = _snapshot(paths)
+    changed_at = None
+    while not (stop and stop()):
+        time.sleep(interval)
+        current = _snapshot(paths)
+        if current != last:
+            last = current
+            changed_at = time.monotonic()
+        elif changed_at is not None and time.monotonic() - changed_at >= debounce:
+            changed_at = None
+            callback()
+
+def watch_shapes(input_file: str, output_file: str, format: str = 'turtle',
+                 prefixes_file: Optional[str] = None, debounce: float = DEFAULT_DEBOUNCE,
+                 report: Callable[[ShapesDiff], None] = print,
+                 stop: Optional[Callable[[], bool]] = None, stable_ids: bool = False) -> None:
+    """
+    Update output_file now and again after every change of the ontology or
+    of the prefixes file. Errors, such as an ontology saved halfway through
+    an edit, are logged and the next change is waited for.
+    """
+    def run() -> None:
+        try:
+            prefixes = read_prefix_declarations(prefixes_file) if prefixes_file else None
+            report(update_shapes(input_file, output_file, format, prefixes, stable_ids))
+        except Exception as e:
+            logger.error("Could not update %s: %s", output_file, e)
+
+    run()
+    watched = [input_file] + ([prefixes_file] if prefixes_file else [])
+    watch(watched, run, debounce=debounce, stop=stop)
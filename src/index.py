@@ -0,0 +1,106 @@
+"""
+Prebuilt index of the shapes of the published ontology versions.
+
+The index is a compact JSON file built with --build-index. For every
+version under data-model/ontology it holds the SHA-256 of its skg-o.ttl,
+its namespace bindings and its shapes in the compact form of src.ir.
+Serving a version from the index only takes reading this file and running
+the streaming writer: neither rdflib nor the ontology is loaded.
+
+The index records the SHAPES_VERSION of the extractor that built it, and is
+ignored once the extractor produces different shapes. An entry is only used
+while the ontology it was built from is unchanged. A version whose ontology
+is not checked out is served from the index as is.
+"""
+
+import json
+import logging
+import os
+from pathlib import Path
+from typing import Any, Dict, List, Optional, TextIO, Union
+
+from src import SHAPES_VERSION, __version__
+from src.atomic import atomic_write
+from src.cache import file_digest
+from src.ir import ShapeIR, shape_from_json, shape_to_json
+from src.writer import write_shapes
+
+logger = logging.getLogger(__name__)
+
+INDEX_PATH = Path("shapes.index.json")
+
+# Bump whenever the layout of the index changes.
+INDEX_FORMAT = 1
+
+Entry = Dict[str, Any]
+
+def index_entry(ontology_path: Union[str, os.PathLike]) -> Entry:
+    from src.loader import load_ontology
+    from src.main import extract_ir, report_unparsed
+
+    ir = extract_ir(load_ontology(ontology_path))
+    report_unparsed(ir)
+    return {
+        "sha256": file_digest(ontology_path),
+        "namespaces": [list(ns) for ns in ir.namespaces],
+        "shapes": [shape_to_json(shape) for shape in ir.shapes],
+    }
+
+def build_index(ontologies: Dict[str, str], path: Union[str, os.PathLike] = INDEX_PATH) -> Dict[str, Any]:
+    """
+    Extract the shapes of every version in ontologies, a map from version to
+    ontology path, and write them to the index at path.
+    """
+    index = {
+        "format": INDEX_FORMAT,
+        "extractor": __version__,
+        "shapes_version": SHAPES_VERSION,
+        "versions": {version: index_entry(ontology) for version, ontology in ontologies.items()},
+    }
+    with atomic_write(path) as f:
+        json.dump(index, f, separators=(',', ':'), sort_keys=True)
+    return index
+
+def load_index(path: Union[str, os.PathLike] = INDEX_PATH) -> Optional[Dict[str, Any]]:
+    """
+    Read the index, or return None if it is missing, unreadable or was built
+    by another version of the extractor.
+    """
+    try:
+        with open(path, 'r', encoding='utf-8') as f:
+            index = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+    if not isinstance(index, dict) or index.get("format") != INDEX_FORMAT:
+        return None
+    if index.get("extractor") != __version__ or index.get("shapes_version") != SHAPES_VERSION:
+        logger.warning("Ignoring %s, built by another version of the extractor: rebuild it with --build-index", path)
+        return None
+    return index
+
+def lookup(index: Dict[str, Any], version: str, ontology_path: Union[str, os.PathLike]) -> Optional[Entry]:
+    """
+    The entry of version, unless the ontology at ontology_path no longer
+    matches it.
+    """
+    entry = index.get("versions", {}).get(version)
+    if entry is None:
+        return None
+    if os.path.exists(ontology_path) and file_digest(ontology_path) != entry["sha256"]:
+        return None
+    return entry
+
+def indexed_versions(index: Optional[Dict[str, Any]]) -> List[str]:
+    return list(index.get("versions", {})) if index else []
+
+def entry_ir(entry: Entry) -> ShapeIR:
+    return ShapeIR([tuple(ns) for ns in entry["namespaces"]],
+                   [shape_from_json(shape) for shape in entry["shapes"]], [])
+
+def write_entry(entry: Entry, out: TextIO, format: str = 'turtle', stable_ids: bool = False) -> int:
+    """
+    Write the shapes of an index entry with the streaming writers.
+    """
+    namespaces = [tuple(ns) for ns in entry["namespaces"]]
+    shapes = (shape_from_json(shape) for shape in entry["shapes"])
+    return write_shapes(shapes, namespaces, out, format, stable_ids)
@@ -0,0 +1,250 @@
+"""
+Compact intermediate representation (IR) of the shapes described in an ontology.
+
+The first extraction stage tokenizes the dc:description of every class into
+NodeShape/PropertyShape records holding plain IRI strings. The records do not
+depend on rdflib, so any output backend can consume them.
+"""
+
+import hashlib
+import re
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+XSD_NS = "http://www.w3.org/2001/XMLSchema#"
+
+BULLET_RE = re.compile(r'\n[*-] ')
+PROPERTY_RE = re.compile(r'([\w:]+) -\[(\d+|[*N])(\.\.)?(\d+|[*N])?]->\s+([\w:]+)')
+UNBOUNDED = ('*', 'N')
+
+# Below this many described classes, parsing them takes less than starting a
+# process pool, and iter_shapes stays serial whatever the number of workers
+PARALLEL_THRESHOLD = 2000
+SHARDS_PER_WORKER = 4
+
+# Kinds of property targets
+LITERAL = 'literal'
+DATATYPE = 'datatype'
+CLASS = 'class'
+
+class PropertyShape:
+    __slots__ = ('path', 'min_count', 'max_count', 'kind', 'target')
+
+    def __init__(self, path: str, min_count: Optional[int], max_count: Optional[int],
+                 kind: str, target: Optional[str]):
+        self.path = path
+        self.min_count = min_count
+        self.max_count = max_count
+        self.kind = kind
+        self.target = target
+
+    def __eq__(self, other):
+        if not isinstance(other, PropertyShape):
+            return NotImplemented
+        return all(getattr(self, a) == getattr(other, a) for a in self.__slots__)
+
+    def __repr__(self):
+        return (f"PropertyShape({self.path!r}, {self.min_count!r}, {self.max_count!r}, "
+                f"{self.kind!r}, {self.target!r})")
+
+class NodeShape:
+    __slots__ = ('iri', 'target_class', 'properties')
+
+    def __init__(self, iri: str, target_class: str, properties: Optional[List[PropertyShape]] = None):
+        self.iri = iri
+        self.target_class = target_class
+        self.properties = properties if properties is not None else []
+
+    def __eq__(self, other):
+        if not isinstance(other, NodeShape):
+            return NotImplemented
+        return all(getattr(self, a) == getattr(other, a) for a in self.__slots__)
+
+    def __repr__(self):
+        return f"NodeShape({self.iri!r}, {self.target_class!r}, {self.properties!r})"
+
+class UnparsedLine:
+    __slots__ = ('cls', 'line', 'reason')
+
+    def __init__(self, cls: str, line: str, reason: str):
+        self.cls = cls
+        self.line = line
+        self.reason = reason
+
+    def __repr__(self):
+        return f"UnparsedLine({self.cls!r}, {self.line!r}, {self.reason!r})"
+
+class ShapeIR:
+    """
+    The shapes extracted from one ontology, with its namespace bindings and
+    the description lines that could not be turned into a property shape.
+    """
+    __slots__ = ('namespaces', 'shapes', 'unparsed')
+
+    def __init__(self, namespaces: List[Tuple[str, str]], shapes: List[NodeShape],
+                 unparsed: List[UnparsedLine]):
+        self.namespaces = namespaces
+        self.shapes = shapes
+        self.unparsed = unparsed
+
+def shape_to_json(shape: NodeShape) -> list:
+    """
+    Compact JSON form of a NodeShape: [iri, target class, [property, ...]],
+    with every property as [path, min, max, kind, target].
+    """
+    return [shape.iri, shape.target_class,
+            [[p.path, p.min_count, p.max_count, p.kind, p.target] for p in shape.properties]]
+
+def shape_from_json(data: list) -> NodeShape:
+    iri, target_class, properties = data
+    return NodeShape(iri, target_class, [PropertyShape(*p) for p in properties])
+
+def node_label(*parts: Optional[object]) -> str:
+    """
+    Content-derived blank node label: the same parts always give the same
+    label, in every run and every process.
+    """
+    key = "\x1f".join("" if part is None else str(part) for part in parts)
+    return "n" + hashlib.sha256(key.encode('utf-8')).hexdigest()[:16]
+
+def property_label(shape_iri: str, prop: PropertyShape) -> str:
+    return node_label("property", shape_iri, prop.path, prop.min_count, prop.max_count, prop.kind, prop.target)
+
+def alternatives_label(target: str) -> str:
+    """
+    Label of the sh:or ( [ sh:class target ] [ sh:nodeKind sh:BlankNodeOrIRI ] )
+    list, shared by every property shape pointing to target.
+    """
+    return node_label("or", target)
+
+def class_constraint_label(target: str) -> str:
+    return node_label("class", target)
+
+# The ( [ sh:nodeKind sh:BlankNodeOrIRI ] ) tail shared by all the sh:or lists
+ALTERNATIVES_TAIL_LABEL = node_label("or-tail")
+NODE_KIND_LABEL = node_label("nodeKind", "BlankNodeOrIRI")
+
+def _is_bullet(chunk: str) -> bool:
+    return chunk[:2] in ('- ', '* ')
+
+def parse_cardinality(card_min: str, range_sep: Optional[str],
+                      card_max: Optional[str]) -> Tuple[Optional[int], Optional[int]]:
+    """
+    Turn the groups of a '-[min..max]->' cardinality into (min_count, max_count).
+    A single number is an exact cardinality; '*' and 'N' are unbounded.
+    """
+    if range_sep is None and card_min not in UNBOUNDED:
+        exact = int(card_min)
+        return exact, exact
+    min_count = int(card_min) if card_min and card_min not in UNBOUNDED else None
+    max_count = int(card_max) if card_max and card_max not in UNBOUNDED else None
+    return min_count, max_count
+
+def parse_description(cls: str, description: str, prefixes: Dict[str, str],
+                      unparsed: List[UnparsedLine]) -> NodeShape:
+    """
+    Tokenize one class description into a NodeShape.
+    Entries that cannot be parsed are appended to unparsed. The free text
+    preceding the first bullet is not an entry and is never reported.
+    """
+    shape = NodeShape(cls + 'Shape', cls)
+    chunks = BULLET_RE.split(description)
+    for index, chunk in enumerate(chunks):
+        entry = chunk.strip()
+        if not entry:
+            continue
+
+        match = PROPERTY_RE.match(entry)
+        if not match:
+            if index > 0 or _is_bullet(entry):
+                unparsed.append(UnparsedLine(cls, entry, "not a property entry"))
+            continue
+
+        prop_name, card_min, range_sep, card_max, target = match.groups()
+        if prop_name.count(':') != 1 or target.count(':') != 1:
+            unparsed.append(UnparsedLine(cls, entry, "names must be prefixed names"))
+            continue
+
+        prefix, local = prop_name.split(':')
+        ns = prefixes.get(prefix)
+        if ns is None:
+            unparsed.append(UnparsedLine(cls, entry, f"unknown prefix '{prefix}'"))
+            continue
+
+        min_count, max_count = parse_cardinality(card_min, range_sep, card_max)
+
+        target_prefix, target_local = target.split(':')
+        if target == "rdfs:Literal":
+            kind, target_iri = LITERAL, None
+        elif target_prefix == "xsd":
+            kind, target_iri = DATATYPE, XSD_NS + target_local
+        else:
+            target_ns = prefixes.get(target_prefix)
+            if target_ns is None:
+                unparsed.append(UnparsedLine(cls, entry, f"unknown prefix '{target_prefix}'"))
+                continue
+            kind, target_iri = CLASS, target_ns + target_local
+
+        shape.properties.append(PropertyShape(ns + local, min_count, max_count, kind, target_iri))
+    return shape
+
+def iter_shapes(described_classes: Iterable[Tuple[str, str]], prefixes: Dict[str, str],
+                unparsed: List[UnparsedLine], workers: Optional[int] = None) -> Iterator[NodeShape]:
+    """
+    Lazily tokenize (class IRI, description) pairs into NodeShapes, so
+    streaming backends can write each shape as soon as it is parsed.
+
+    With workers > 1 and at least PARALLEL_THRESHOLD classes, the pairs are
+    split into contiguous shards parsed by a pool of worker processes. The
+    shards are merged back in order, so shapes and unparsed lines are the
+    same as in a serial run.
+    """
+    if workers is not None and workers > 1:
+        described_classes = list(described_classes)
+        if len(described_classes) >= PARALLEL_THRESHOLD:
+            yield from _iter_shapes_parallel(described_classes, prefixes, unparsed, workers)
+            return
+    for cls, desc in described_classes:
+        yield parse_description(cls, desc, prefixes, unparsed)
+
+def _parse_shard(shard: List[Tuple[str, str]], prefixes: Dict[str, str]) -> Tuple[List[list], List[tuple]]:
+    """
+    Parse a shard in a worker process. The shapes are sent back in the form
+    of shape_to_json with their IRIs interned: pickle then writes every IRI
+    once, which makes the result several times smaller and faster to load
+    than the records themselves.
+    """
+    unparsed: List[UnparsedLine] = []
+    strings: Dict[str, str] = {}
+    intern = lambda iri: iri if iri is None else strings.setdefault(iri, iri)
+    shapes = []
+    for cls, desc in shard:
+        shape = parse_description(cls, desc, prefixes, unparsed)
+        shapes.append([intern(shape.iri), intern(shape.target_class),
+                       [[intern(p.path), p.min_count, p.max_count, p.kind, intern(p.target)]
+                        for p in shape.properties]])
+    return shapes, [(line.cls, line.line, line.reason) for line in unparsed]
+
+def _iter_shapes_parallel(described_classes: List[Tuple[str, str]], prefixes: Dict[str, str],
+                          unparsed: List[UnparsedLine], workers: int) -> Iterator[NodeShape]:
+    from concurrent.futures import ProcessPoolExecutor
+
+    # A few shards per worker keep the pool busy when descriptions vary in length
+    size = -(-len(described_classes) // (workers * SHARDS_PER_WORKER))
+    shards = [described_classes[i:i + size] for i in range(0, len(described_classes), size)]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        for shapes, lines in executor.map(_parse_shard, shards, [prefixes] * len(shards)):
+            unparsed.extend(UnparsedLine(*line) for line in lines)
+            for shape in shapes:
+                yield shape_from_json(shape)
+
+def build_ir(described_classes: Iterable[Tuple[str, str]],
+             namespaces: Iterable[Tuple[str, str]], workers: Optional[int] = None) -> ShapeIR:
+    """
+    Build the IR from (class IRI, description) pairs and the ontology's
+    (prefix, namespace) bindings, resolving the prefix map once. See
+    iter_shapes for workers.
+    """
+    namespaces = [(prefix, str(ns)) for prefix, ns in namespaces]
+    unparsed: List[UnparsedLine] = []
+    shapes = list(iter_shapes(described_classes, dict(namespaces), unparsed, workers))
+    return ShapeIR(namespaces, shapes, unparsed)
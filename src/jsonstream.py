@@ -0,0 +1,207 @@
+"""
+Incremental reading of large JSON-LD dumps.
+
+Items are yielded one at a time together with the @context they are to be
+interpreted in, from either JSON Lines files (one JSON-LD document per line)
+or a single JSON-LD document whose top-level @graph array is read item by
+item, so that only one item at a time has to be held in memory. Items of a
+@graph that comes before the @context of its document, or in a document
+without @context, cannot be interpreted until the end of the document:
+they are spooled to a temporary file rather than kept in memory.
+"""
+
+import json
+import logging
+import os
+import tempfile
+from typing import Any, Iterator, List, Optional, TextIO, Tuple, Union
+
+JSON_LINES_SUFFIXES = ('.jsonl', '.ndjson')
+
+logger = logging.getLogger(__name__)
+
+READ_SIZE = 1 << 16
+
+# The @context of a document that has not been read yet, as opposed to null
+_UNSEEN = object()
+
+_decoder = json.JSONDecoder()
+
+Item = Tuple[Any, dict]
+
+class JSONStreamReader:
+    """
+    Pulls consecutive JSON values out of a text stream with a bounded
+    look-ahead buffer.
+    """
+
+    def __init__(self, f: TextIO, read_size: int = READ_SIZE):
+        self.f = f
+        self.read_size = read_size
+        self.buffer = ""
+        self.pos = 0
+        self.eof = False
+
+    def _fill(self) -> bool:
+        if self.eof:
+            return False
+        data = self.f.read(self.read_size)
+        if not data:
+            self.eof = True
+            return False
+        self.buffer = self.buffer[self.pos:] + data
+        self.pos = 0
+        return True
+
+    def peek(self) -> str:
+        """
+        Return the next non-whitespace character without consuming it,
+        or an empty string at the end of the stream.
+        """
+        while True:
+            while self.pos < len(self.buffer) and self.buffer[self.pos].isspace():
+                self.pos += 1
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._fill():
+                return ""
+
+    def expect(self, char: str) -> None:
+        found = self.peek()
+        if found != char:
+            raise ValueError(f"Expected {char!r} in JSON stream, found {found or 'end of input'!r}")
+        self.pos += 1
+
+    def value(self) -> Any:
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                if self._fill():
+                    continue
+                raise
+            # A number may continue in the data that has not been read yet
+            if end == len(self.buffer) and not self.eof and self._fill():
+                continue
+            self.pos = end
+            return value
+
+    def array_items(self) -> Iterator[Any]:
+        """
+        Yield the items of the array starting at the current position.
+        """
+        self.expect('[')
+        if self.peek() == ']':
+            self.pos += 1
+            return
+        while True:
+            yield self.value()
+            if self.peek() == ',':
+                self.pos += 1
+                continue
+            self.expect(']')
+            return
+
+def _document_items(document: Any, context: Any = None) -> Iterator[Item]:
+    if isinstance(document, list):
+        for item in document:
+            yield from _document_items(item, context)
+        return
+    if not isinstance(document, dict):
+        raise ValueError("JSON-LD items must be objects")
+    context = document.get("@context", context)
+    if "@graph" in document:
+        for item in document["@graph"]:
+            yield context, item
+    else:
+        item = {k: v for k, v in document.items() if k != "@context"}
+        yield context, item
+
+def _iter_json_lines(f: TextIO) -> Iterator[Item]:
+    for line in f:
+        if line.strip():
+            yield from _document_items(json.loads(line))
+
+def _iter_document(f: TextIO, read_size: int = READ_SIZE) -> Iterator[Item]:
+    reader = JSONStreamReader(f, read_size)
+    if reader.peek() != '{':
+        yield from _document_items(reader.value())
+        return
+
+    reader.expect('{')
+    context = _UNSEEN
+    pending: Optional[TextIO] = None
+    graph_seen = False
+    properties = {}
+    try:
+        while reader.peek() != '}':
+            key = reader.value()
+            reader.expect(':')
+            if key == "@graph":
+                graph_seen = True
+                for item in reader.array_items():
+                    if context is _UNSEEN:
+                        # @context may still follow: spool items until the end
+                        if pending is None:
+                            logger.warning("%s: @graph before @context, its items are buffered in a temporary file "
+                                           "until the end of the document", getattr(f, 'name', "document"))
+                            pending = tempfile.TemporaryFile('w+', encoding='utf-8')
+                        pending.write(json.dumps(item) + "\n")
+                    else:
+                        yield context, item
+            elif key == "@context":
+                context = reader.value()
+            else:
+                properties[key] = reader.value()
+            if reader.peek() == ',':
+                reader.pos += 1
+        reader.expect('}')
+
+        if context is _UNSEEN:
+            context = None
+        if pending is not None:
+            pending.seek(0)
+            for line in pending:
+                yield context, json.loads(line)
+    finally:
+        if pending is not None:
+            pending.close()
+    if not graph_seen:
+        yield context, properties
+
+def iter_jsonld_items(source: Union[str, os.PathLike, TextIO], json_lines: Optional[bool] = None) -> Iterator[Item]:
+    """
+    Yield (context, item) for every top-level item of a JSON-LD dump, read
+    from a path or a text stream. JSON Lines input is recognised by a
+    .jsonl/.ndjson suffix unless json_lines says otherwise.
+    """
+    if not isinstance(source, (str, os.PathLike)):
+        if json_lines:
+            yield from _iter_json_lines(source)
+        else:
+            yield from _iter_document(source)
+        return
+    if json_lines is None:
+        json_lines = str(source).lower().endswith(JSON_LINES_SUFFIXES)
+    with open(source, 'r', encoding='utf-8') as f:
+        if json_lines:
+            yield from _iter_json_lines(f)
+        else:
+            yield from _iter_document(f)
+
+def iter_chunks(items: Iterator[Item], chunk_size: int) -> Iterator[Tuple[Any, List[dict]]]:
+    """
+    Group consecutive items sharing the same @context into chunks of at most
+    chunk_size items. Items are never split, so every entity reaches the
+    validator together with everything embedded in it.
+    """
+    context, chunk = None, []
+    for item_context, item in items:
+        if chunk and (len(chunk) >= chunk_size or item_context != context):
+            yield context, chunk
+            chunk = []
+        context = item_context
+        chunk.append(item)
+    if chunk:
+        yield context, chunk
@@ -0,0 +1,202 @@
+"""
+Selective ontology loader.
+
+The extractor only needs the prefix declarations, the rdf:type owl:Class
+statements and the dc:description values of an ontology. This loader keeps
+exactly those and drops every other triple as it is parsed, so memory scales
+with the number of documented classes rather than with the size of the input.
+
+load_class_hierarchy keeps only the rdfs:subClassOf statements, which the
+validator uses to extend the targets of the shapes to subclasses.
+
+Turtle is parsed by rdflib into a filtering store. N-Triples and N-Quads are
+read line by line and only candidate lines reach the parser. Gzip-compressed
+inputs are detected from their magic number and decompressed on the fly.
+"""
+
+import gzip
+import io
+import os
+import re
+from pathlib import Path
+from typing import BinaryIO, Callable, Iterable, List, Optional, TextIO, Tuple, Union
+
+from rdflib import Dataset, Graph
+from rdflib.namespace import DC, OWL, RDF, RDFS
+from rdflib.plugins.stores.memory import Memory
+
+GZIP_MAGIC = b'\x1f\x8b'
+
+LINE_FORMATS = ('nt', 'nquads')
+
+PREFIX_RE = re.compile(r'^\s*(?:@prefix\s+([\w\-.]*):\s*<([^>]*)>\s*\.|PREFIX\s+([\w\-.]*):\s*<([^>]*)>)\s*$',
+                       re.IGNORECASE)
+
+_DESCRIPTION_REF = '<' + str(DC.description) + '>'
+_TYPE_REF = '<' + str(RDF.type) + '>'
+_CLASS_REF = '<' + str(OWL.Class) + '>'
+_SUBCLASS_REF = '<' + str(RDFS.subClassOf) + '>'
+
+OntologySource = Union[str, os.PathLike, bytes, BinaryIO, TextIO, Graph]
+
+class SelectiveMemory(Memory):
+    """
+    In-memory store that silently discards every triple the extractor does
+    not use.
+    """
+
+    def add(self, triple, context, quoted=False):
+        _, predicate, obj = triple
+        if predicate == DC.description or (predicate == RDF.type and obj == OWL.Class):
+            super().add(triple, context, quoted)
+
+class HierarchyMemory(Memory):
+    """
+    In-memory store that keeps only rdfs:subClassOf statements.
+    """
+
+    def add(self, triple, context, quoted=False):
+        if triple[1] == RDFS.subClassOf:
+            super().add(triple, context, quoted)
+
+def is_gzipped(path: Union[str, os.PathLike]) -> bool:
+    with open(path, 'rb') as f:
+        return f.read(2) == GZIP_MAGIC
+
+def open_binary(path: Union[str, os.PathLike]) -> BinaryIO:
+    """
+    Open a file for binary reading, transparently decompressing gzip.
+    """
+    if is_gzipped(path):
+        return gzip.open(path, 'rb')
+    return open(path, 'rb')
+
+def guess_format(path: Union[str, os.PathLike]) -> str:
+    """
+    Guess the RDF format from the file extension, ignoring a trailing .gz.
+    Anything that is not N-Triples or N-Quads is read as Turtle.
+    """
+    suffixes = [s.lower() for s in Path(path).suffixes]
+    if suffixes and suffixes[-1] == '.gz':
+        suffixes.pop()
+    suffix = suffixes[-1] if suffixes else ''
+    if suffix == '.nt':
+        return 'nt'
+    if suffix == '.nq':
+        return 'nquads'
+    return 'turtle'
+
+def read_prefix_declarations(path: Union[str, os.PathLike]) -> List[Tuple[str, str]]:
+    """
+    Read the @prefix/PREFIX directives at the top of a Turtle file, stopping
+    at the first statement, without parsing the rest of the file.
+    """
+    prefixes = []
+    with open_binary(path) as f:
+        for raw in f:
+            line = raw.decode('utf-8').strip()
+            if not line or line.startswith('#'):
+                continue
+            match = PREFIX_RE.match(line)
+            if not match:
+                break
+            prefix, namespace = (match.group(1), match.group(2)) if match.group(2) is not None \
+                else (match.group(3), match.group(4))
+            prefixes.append((prefix, namespace))
+    return prefixes
+
+def _is_candidate(line: str) -> bool:
+    return _DESCRIPTION_REF in line or (_TYPE_REF in line and _CLASS_REF in line)
+
+def _is_hierarchy_candidate(line: str) -> bool:
+    return _SUBCLASS_REF in line
+
+def _copy_ontology(source: Graph, g: Graph) -> None:
+    """
+    Copy the namespace bindings and the triples the extractor uses from an
+    already parsed graph, which is left untouched.
+    """
+    for prefix, namespace in source.namespaces():
+        g.bind(prefix, namespace, override=True, replace=True)
+    for triple in source.triples((None, DC.description, None)):
+        g.add(triple)
+    for cls in source.subjects(RDF.type, OWL.Class):
+        g.add((cls, RDF.type, OWL.Class))
+
+def _in_memory_stream(source: Union[bytes, BinaryIO, TextIO]) -> BinaryIO:
+    """
+    The content of bytes or of a binary or text file-like object as a
+    binary stream, decompressed if it is gzipped.
+    """
+    data = source if isinstance(source, bytes) else source.read()
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+    if data[:2] == GZIP_MAGIC:
+        return gzip.GzipFile(fileobj=io.BytesIO(data), mode='rb')
+    return io.BytesIO(data)
+
+def _is_path(source: OntologySource) -> bool:
+    return isinstance(source, (str, os.PathLike))
+
+def _parse(source: Union[str, os.PathLike, bytes, BinaryIO, TextIO], format: Optional[str], store: Memory,
+           is_candidate: Callable[[str], bool]) -> Graph:
+    """
+    Parse source into a Graph over a filtering store. Lines of N-Triples and
+    N-Quads for which is_candidate is false are dropped before parsing.
+    """
+    if format is None:
+        name = source if _is_path(source) else getattr(source, 'name', None)
+        format = guess_format(name) if isinstance(name, (str, os.PathLike)) else 'turtle'
+
+    if format in LINE_FORMATS:
+        g = Dataset(store=store, default_union=True) if format == 'nquads' else Graph(store=store)
+        with (open_binary(source) if _is_path(source) else _in_memory_stream(source)) as f:
+            lines = [line for line in (raw.decode('utf-8') for raw in f) if is_candidate(line)]
+        if lines:
+            g.parse(data=''.join(lines), format=format)
+    else:
+        g = Graph(store=store)
+        if not _is_path(source):
+            with _in_memory_stream(source) as f:
+                g.parse(f, format=format)
+        elif is_gzipped(source):
+            with gzip.open(source, 'rb') as f:
+                g.parse(f, format=format, publicID=Path(source).absolute().as_uri())
+        else:
+            g.parse(source, format=format, encoding='utf-8')
+    return g
+
+def load_ontology(source: OntologySource, format: Optional[str] = None,
+                  prefixes: Optional[Iterable[Tuple[str, str]]] = None) -> Graph:
+    """
+    Load the parts of an ontology used by the extractor into a Graph.
+    source is a path, the ontology as bytes, a binary or text file-like
+    object, or an rdflib Graph already holding it. The format of in-memory
+    sources defaults to Turtle, unless a file-like object has a name.
+    N-Triples and N-Quads carry no prefix declarations, so the bindings
+    the class descriptions rely on can be supplied through prefixes.
+    """
+    if isinstance(source, Graph):
+        g = Graph(store=SelectiveMemory())
+        _copy_ontology(source, g)
+    else:
+        g = _parse(source, format, SelectiveMemory(), _is_candidate)
+
+    for prefix, namespace in prefixes or ():
+        g.bind(prefix, namespace, override=True, replace=True)
+    return g
+
+def load_class_hierarchy(source: OntologySource, format: Optional[str] = None) -> Graph:
+    """
+    Load the rdfs:subClassOf statements of an ontology into a Graph, merging
+    the graphs of N-Quads. source and format are as for load_ontology.
+    """
+    if not isinstance(source, Graph):
+        source = _parse(source, format, HierarchyMemory(), _is_hierarchy_candidate)
+        if not isinstance(source, Dataset):
+            return source
+    # A plain Graph, also for the union of the graphs of a Dataset
+    g = Graph(store=HierarchyMemory())
+    for triple in source.triples((None, RDFS.subClassOf, None)):
+        g.add(triple)
+    return g
@@ -1,19 +1,35 @@
 import argparse
-import re
+import json
+import logging
+import sys
 from pathlib import Path
-from typing import Optional
+from typing import TYPE_CHECKING, Iterable, Iterator, List, Optional, Tuple, Union
 
-from rdflib import BNode, Graph, Literal, Namespace, URIRef
-from rdflib.namespace import OWL, RDF, XSD
+# Only lightweight modules are imported here, so that the command line starts
+# fast: rdflib and the modules built on it are imported where they are used.
+from src.bundle import BUNDLE_FORMATS, write_bundle
+from src.cache import ShapesCache
+from src.index import INDEX_PATH
+from src.ir import NodeShape, ShapeIR, UnparsedLine, build_ir, iter_shapes
+from src.stats import ExtractionStats, phase
+from src.writer import FORMATS, write_shapes
+
+if TYPE_CHECKING: # pragma: no cover
+    from rdflib import Graph
+
+    from src.loader import OntologySource
+
+logger = logging.getLogger(__name__)
 
 DEFAULT_ONTOLOGY_PATH = "data-model/current/skg-o.ttl"
+ONTOLOGY_BASE_PATH = Path("data-model/ontology")
 
 def get_ontology_path(version: Optional[str] = None) -> str:
     """
     Get the path to the ontology file based on version.
     If version is None, returns the current version.
     """
-    base_path = Path("data-model/ontology")
+    base_path = ONTOLOGY_BASE_PATH
     
     if version is None:
         return str(base_path / "current" / "skg-o.ttl")
@@ -24,95 +40,290 @@ def get_ontology_path(version: Optional[str] = None) -> str:
     
     return str(version_path)
 
-def create_shacl_shapes(input_file: str) -> Graph:
-    g = Graph()
-    g.parse(input_file, format='turtle', encoding='utf-8')
-    
-    shacl = Graph()
-    SH = Namespace("http://www.w3.org/ns/shacl#")
-    shacl.bind('sh', SH)
-    
-    for prefix, namespace in g.namespaces():
-        shacl.bind(prefix, namespace)
+def described_classes(g: 'Graph') -> Iterator[Tuple[str, str]]:
+    """
+    Yield (class IRI, description) for every owl:Class with a dc:description.
+    """
+    from rdflib.namespace import DC, OWL, RDF
     
     for cls in g.subjects(RDF.type, OWL.Class, unique=True):
-        desc = g.value(cls, URIRef("http://purl.org/dc/elements/1.1/description"))
+        desc = g.value(cls, DC.description)
         if desc:
-            shape_uri = URIRef(str(cls) + 'Shape')
-            shacl.add((shape_uri, RDF.type, SH.NodeShape))
-            shacl.add((shape_uri, SH.targetClass, cls))
-            
-            desc_str = str(desc)
-            # Split on either '* ' or '- ' at the start of lines
-            properties = [p for p in re.split(r'\n[*-] ', desc_str) if p.strip()]
-            
-            for prop in properties:
-                if not prop.strip():
-                    continue
-                
-                match = re.match(r'([\w:]+) -\[(\d+|[*N])(\.\.)?(\d+|[*N])?]->\s+([\w:]+)', prop.strip())
-                if match:
-                    prop_name, card_min, range_sep, card_max, target = match.groups()
-                    
-                    prefix, local = prop_name.split(':')
-                    ns = str(g.store.namespace(prefix))
-                    if ns:
-                        prop_uri = URIRef(ns + local)
-                        
-                        # Create property shape
-                        bnode = BNode()
-                        shacl.add((shape_uri, SH.property, bnode))
-                        shacl.add((bnode, SH.path, prop_uri))
-                        
-                        # Handle cardinality
-                        if range_sep is None and card_min not in ['*', 'N']:
-                            exact_card = int(card_min)
-                            shacl.add((bnode, SH.minCount, Literal(exact_card, datatype=XSD.integer)))
-                            shacl.add((bnode, SH.maxCount, Literal(exact_card, datatype=XSD.integer)))
-                        else:
-                            if card_min and card_min not in ['*', 'N']:
-                                shacl.add((bnode, SH.minCount, Literal(int(card_min), datatype=XSD.integer)))
-                            if card_max and card_max not in ['*', 'N']:
-                                shacl.add((bnode, SH.maxCount, Literal(int(card_max), datatype=XSD.integer)))
-                        
-                        # Handle target type
-                        if target:
-                            target_prefix, target_local = target.split(':')
-                            target_ns = str(g.store.namespace(target_prefix))
-                            if target_ns:
-                                if target == "rdfs:Literal":
-                                    shacl.add((bnode, SH.nodeKind, SH.Literal))
-                                elif target.startswith("xsd:"):
-                                    shacl.add((bnode, SH.datatype, URIRef(f"http://www.w3.org/2001/XMLSchema#{target_local}")))
-                                else:
-                                    # Creiamo un or tra class e nodeKind
-                                    or_node = BNode()
-                                    shacl.add((bnode, SH['or'], or_node))
-                                    
-                                    # Prima alternativa: la classe specifica
-                                    class_constraint = BNode()
-                                    shacl.add((or_node, RDF.first, class_constraint))
-                                    shacl.add((class_constraint, SH['class'], URIRef(target_ns + target_local)))
-                                    
-                                    # Seconda alternativa: qualsiasi IRI o blank node
-                                    rest_node = BNode()
-                                    shacl.add((or_node, RDF.rest, rest_node))
-                                    
-                                    nodekind_constraint = BNode()
-                                    shacl.add((rest_node, RDF.first, nodekind_constraint))
-                                    shacl.add((nodekind_constraint, SH.nodeKind, SH.BlankNodeOrIRI))
-                                    shacl.add((rest_node, RDF.rest, RDF.nil))
+            yield str(cls), str(desc)
+
+def extract_ir(g: 'Graph', workers: Optional[int] = None) -> ShapeIR:
+    """
+    Tokenize the class descriptions of an ontology graph into the shape IR,
+    in up to workers processes for large ontologies (see src.ir.iter_shapes).
+    """
+    return build_ir(described_classes(g), g.namespaces(), workers)
+
+def report_unparsed(ir: ShapeIR) -> None:
+    for line in ir.unparsed:
+        logger.warning("Skipping description entry of %s (%s): %s", line.cls, line.reason, line.line)
+
+def count_classes(stats: ExtractionStats, g: 'Graph') -> None:
+    from rdflib.namespace import OWL, RDF
+    
+    stats.count("classes", len(set(g.subjects(RDF.type, OWL.Class))))
+
+def count_shapes(stats: ExtractionStats, shapes: Iterable[NodeShape],
+                 stable_ids: bool = False) -> Iterator[NodeShape]:
+    """
+    Pass shapes through, counting them, their properties and their triples.
+    """
+    from src.emit import shape_triple_count
+    
+    shared = set() if stable_ids else None
+    for shape in shapes:
+        stats.count("described_classes")
+        stats.count("properties", len(shape.properties))
+        stats.count("triples", shape_triple_count(shape, shared))
+        yield shape
+
+def ontology_source(input_file: Optional['OntologySource'] = None,
+                    data: Union[str, bytes, None] = None) -> 'OntologySource':
+    """
+    Pick the ontology out of the input_file and data arguments, exactly one
+    of which must be given. A data string is the serialized ontology.
+    """
+    if (input_file is None) == (data is None):
+        raise ValueError("Exactly one of input_file and data must be given")
+    if data is not None:
+        return data.encode('utf-8') if isinstance(data, str) else data
+    return input_file
+
+def create_shacl_shapes(input_file: Optional['OntologySource'] = None,
+                        prefixes: Optional[List[Tuple[str, str]]] = None,
+                        stats: Optional[ExtractionStats] = None, *,
+                        data: Union[str, bytes, None] = None, format: Optional[str] = None,
+                        stable_ids: bool = False, workers: Optional[int] = None) -> 'Graph':
+    """
+    Extract the SHACL shapes of an ontology. input_file is a path, bytes, a
+    file-like object or an rdflib Graph holding the ontology; alternatively
+    data is the serialized ontology as a string or bytes. format defaults
+    to a guess from the file name, or Turtle. With stable_ids the blank
+    nodes have content-derived labels and the sh:or lists are shared, so the
+    same ontology always gives the same, smaller, graph. With workers, the
+    descriptions of large ontologies are parsed in that many processes,
+    with the same result.
+    """
+    from src.emit import emit_graph
+    from src.loader import load_ontology
+    
+    source = ontology_source(input_file, data)
+    with phase(stats, "parse"):
+        g = load_ontology(source, format=format, prefixes=prefixes)
+    
+    with phase(stats, "namespaces"):
+        namespaces = list(g.namespaces())
+    with phase(stats, "extract"):
+        ir = build_ir(described_classes(g), namespaces, workers)
+    report_unparsed(ir)
+    with phase(stats, "emit"):
+        shacl = emit_graph(ir, stable_ids)
     
+    if stats is not None:
+        count_classes(stats, g)
+        stats.count("described_classes", len(ir.shapes))
+        stats.count("properties", sum(len(shape.properties) for shape in ir.shapes))
+        stats.count("unparsed_lines", len(ir.unparsed))
+        stats.count("triples", len(shacl))
     return shacl
 
+def stream_shacl_shapes(input_file: str, output_file: str, format: str = 'turtle',
+                        prefixes: Optional[List[Tuple[str, str]]] = None,
+                        stats: Optional[ExtractionStats] = None, stable_ids: bool = False,
+                        workers: Optional[int] = None) -> int:
+    """
+    Write the SHACL shapes of input_file to output_file as they are parsed,
+    without building the shapes Graph. Returns the number of NodeShapes.
+    """
+    from src.loader import load_ontology
+    
+    with phase(stats, "parse"):
+        g = load_ontology(input_file, prefixes=prefixes)
+    
+    with phase(stats, "namespaces"):
+        namespaces = [(prefix, str(ns)) for prefix, ns in g.namespaces()]
+    unparsed: List[UnparsedLine] = []
+    shapes = iter_shapes(described_classes(g), dict(namespaces), unparsed, workers)
+    if stats is not None:
+        count_classes(stats, g)
+        shapes = count_shapes(stats, shapes, stable_ids)
+    # Extraction and serialization are interleaved
+    with phase(stats, "stream"):
+        with open(output_file, 'w', encoding='utf-8', newline='\n') as out:
+            count = write_shapes(shapes, namespaces, out, format, stable_ids)
+    report_unparsed(ShapeIR(namespaces, [], unparsed))
+    if stats is not None:
+        stats.count("unparsed_lines", len(unparsed))
+    return count
+
+def bundle_shacl_shapes(input_file: str, output_file: str, format: str = 'bundle',
+                        prefixes: Optional[List[Tuple[str, str]]] = None,
+                        stats: Optional[ExtractionStats] = None, workers: Optional[int] = None) -> int:
+    """
+    Write the shapes of input_file to output_file as a 'bundle' or
+    'bundle-json' (see src.bundle). Returns the number of NodeShapes.
+    """
+    from src.loader import load_ontology
+    
+    with phase(stats, "parse"):
+        g = load_ontology(input_file, prefixes=prefixes)
+    with phase(stats, "extract"):
+        ir = extract_ir(g, workers)
+    report_unparsed(ir)
+    with phase(stats, "serialize"):
+        count = write_bundle(ir, output_file, format)
+    
+    if stats is not None:
+        count_classes(stats, g)
+        for _ in count_shapes(stats, ir.shapes):
+            pass
+        stats.count("unparsed_lines", len(ir.unparsed))
+    return count
+
+def load_or_create_shapes(input_file: str, cache: Optional[ShapesCache] = None,
+                          prefixes: Optional[List[Tuple[str, str]]] = None,
+                          stats: Optional[ExtractionStats] = None, stable_ids: bool = False,
+                          workers: Optional[int] = None) -> 'Graph':
+    """
+    Return the SHACL shapes for input_file, served from cache when possible.
+    Without a cache this is equivalent to create_shacl_shapes.
+    """
+    if cache is None:
+        return create_shacl_shapes(input_file, prefixes, stats, stable_ids=stable_ids, workers=workers)
+    
+    with phase(stats, "cache"):
+        key = cache.key_for(input_file, prefixes, stable_ids)
+        shacl = cache.get_shapes(key)
+    if stats is not None:
+        stats.count("cache_hits", int(shacl is not None))
+    if shacl is None:
+        shacl = create_shacl_shapes(input_file, prefixes, stats, stable_ids=stable_ids, workers=workers)
+        with phase(stats, "cache"):
+            cache.put_shapes(key, shacl)
+    elif stats is not None:
+        stats.count("triples", len(shacl))
+    return shacl
+
+def serialize_shapes(shacl: 'Graph', output_file: str, format: str = 'turtle',
+                     stable_ids: bool = False) -> None:
+    """
+    Serialize a shapes graph to output_file. rdflib writes N-Triples in hash
+    order, which differs from one process to the next, so with stable_ids
+    the statements are sorted to keep the output byte-identical.
+    """
+    if stable_ids and format == 'nt':
+        lines = sorted(line for line in shacl.serialize(format='nt').splitlines() if line)
+        with open(output_file, 'w', encoding='utf-8', newline='\n') as out:
+            out.write('\n'.join(lines) + '\n')
+    else:
+        shacl.serialize(destination=output_file, format=format, encoding="utf-8")
+
 def main():
     parser = argparse.ArgumentParser(description='Convert SKG ontology to SHACL shapes')
-    parser.add_argument('--input', help='Input TTL file path (optional)')
-    parser.add_argument('--version', help='Ontology version (e.g., "1.0.0", "current")')
-    parser.add_argument('output', help='Output SHACL file path')
+    parser.add_argument('--input', help='Input ontology file path (optional): Turtle, N-Triples (.nt) '
+                        'or N-Quads (.nq), optionally gzip-compressed')
+    parser.add_argument('--prefixes', help='Turtle file whose prefix declarations are used to resolve '
+                        'the class descriptions (useful for N-Triples/N-Quads inputs)')
+    parser.add_argument('--version', help='Ontology version (e.g., "1.0.0", "current"), '
+                        'a comma-separated list of versions or "all"')
+    parser.add_argument('--cache-dir', help='Directory of the shapes cache (default: ~/.cache/skg-if-shacl-extractor)')
+    parser.add_argument('--no-cache', action='store_true', help='Always re-extract the shapes, bypassing the cache')
+    parser.add_argument('--format', choices=FORMATS + BUNDLE_FORMATS, default='turtle',
+                        help='Output serialization (default: turtle); bundle and bundle-json are compact '
+                        'machine-oriented shape tables, see src/bundle.py')
+    parser.add_argument('--stream', action='store_true',
+                        help='Write shapes as they are extracted instead of building the shapes graph (bypasses the cache)')
+    parser.add_argument('--stable-ids', action='store_true',
+                        help='Give blank nodes content-derived labels and share identical sh:or lists, '
+                        'so that the same ontology always gives byte-identical, smaller shapes')
+    parser.add_argument('--workers', type=int,
+                        help='Worker processes for batch extraction (default: CPU count); for a single '
+                        'ontology, parse the descriptions of large ontologies in this many processes '
+                        '(default: serial)')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Re-extract only the classes whose description changed since the last run, '
+                        'patching the output (state kept in OUTPUT.state.json)')
+    parser.add_argument('--watch', action='store_true',
+                        help='Keep running and update the output incrementally whenever the ontology changes')
+    parser.add_argument('--debounce', type=float, default=0.3,
+                        help='Seconds without further changes before --watch updates the output (default: 0.3)')
+    parser.add_argument('--stats', nargs='?', const='human', choices=('human', 'json'),
+                        help='Print the time spent in every phase, counters and the peak RSS '
+                        'to standard error, as text (default) or JSON')
+    parser.add_argument('--diff', help='With --incremental or --watch, write the added, changed and removed '
+                        'classes of the last update to this JSON file')
+    parser.add_argument('--index', default=str(INDEX_PATH),
+                        help=f'Prebuilt shapes index of the ontology versions (default: {INDEX_PATH})')
+    parser.add_argument('--no-index', action='store_true', help='Always extract, ignoring the prebuilt index')
+    parser.add_argument('--build-index', action='store_true',
+                        help='Extract every ontology version into the prebuilt index and exit')
+    parser.add_argument('--list-versions', action='store_true', help='List the available ontology versions and exit')
+    parser.add_argument('output', nargs='?', help='Output SHACL file path; with several versions, '
+                        'a template containing {version}')
     
     args = parser.parse_args()
     
+    if args.list_versions or args.build_index:
+        from src.batch import list_versions
+        from src.index import build_index, indexed_versions, load_index
+        versions = list_versions()
+        if args.build_index:
+            if not versions:
+                parser.error(f"No ontology versions found under {ONTOLOGY_BASE_PATH}")
+            build_index({version: get_ontology_path(version) for version in versions}, args.index)
+            print(f"Indexed {len(versions)} versions in {args.index}")
+        else:
+            indexed = indexed_versions(load_index(args.index))
+            for version in versions + [v for v in indexed if v not in versions]:
+                print(version + (" (indexed)" if version in indexed else ""))
+        return
+    if args.output is None:
+        parser.error("the following arguments are required: output")
+    
+    from src.batch import is_batch, output_path_for, resolve_versions, run_batch
+    if is_batch(args.version):
+        if args.input:
+            parser.error("--input cannot be combined with several versions")
+        if args.incremental or args.watch:
+            parser.error("--incremental and --watch cannot be combined with several versions")
+        if args.stats:
+            parser.error("--stats cannot be combined with several versions")
+        try:
+            versions = resolve_versions(args.version)
+            output_path_for(args.output, versions[0])
+        except ValueError as e:
+            parser.error(str(e))
+        status = run_batch(versions, args.output, cache_dir=args.cache_dir,
+                           use_cache=not args.no_cache, workers=args.workers,
+                           format=args.format, stream=args.stream, stable_ids=args.stable_ids)
+        for version, result in status.items():
+            print(f"{version}: {result} -> {output_path_for(args.output, version)}")
+        return
+    
+    stats = ExtractionStats() if args.stats else None
+    
+    # Published versions are served from the prebuilt index, as long as it
+    # matches their ontology, without loading rdflib at all
+    if not (args.input or args.prefixes or args.no_index or args.incremental or args.watch):
+        from src.index import entry_ir, load_index, lookup, write_entry
+        version = args.version or "current"
+        index = load_index(args.index)
+        entry = lookup(index, version, ONTOLOGY_BASE_PATH / version / "skg-o.ttl") if index else None
+        if entry is not None:
+            with phase(stats, "index"):
+                if args.format in BUNDLE_FORMATS:
+                    write_bundle(entry_ir(entry), args.output, args.format)
+                else:
+                    with open(args.output, 'w', encoding='utf-8', newline='\n') as out:
+                        write_entry(entry, out, args.format, args.stable_ids)
+            if stats is not None:
+                print(stats.format(args.stats), file=sys.stderr)
+            return
+    
     # If no input file is specified, use the versioned ontology
     if args.input:
         input_path = args.input
@@ -122,8 +333,47 @@ def main():
         except ValueError as e:
             parser.error(str(e))
     
-    shacl_graph = create_shacl_shapes(input_path)
-    shacl_graph.serialize(destination=args.output, format="turtle", encoding="utf-8")
+    if (args.incremental or args.watch) and args.stats:
+        parser.error("--stats cannot be combined with --incremental or --watch")
+    if (args.incremental or args.watch) and args.format in BUNDLE_FORMATS:
+        parser.error("--incremental and --watch cannot write bundles")
+    from src.loader import read_prefix_declarations
+    if args.incremental or args.watch:
+        from src.incremental import update_shapes, watch_shapes
+        
+        def report(diff):
+            print(f"{args.output}: {diff}", flush=True)
+            if args.diff:
+                with open(args.diff, 'w', encoding='utf-8') as f:
+                    json.dump(diff.as_dict(), f, indent=2)
+        
+        if args.watch:
+            try:
+                watch_shapes(input_path, args.output, args.format, args.prefixes,
+                             debounce=args.debounce, report=report, stable_ids=args.stable_ids)
+            except KeyboardInterrupt:
+                pass
+        else:
+            prefixes = read_prefix_declarations(args.prefixes) if args.prefixes else None
+            report(update_shapes(input_path, args.output, args.format, prefixes, args.stable_ids))
+        return
+    
+    prefixes = read_prefix_declarations(args.prefixes) if args.prefixes else None
+    
+    if args.format in BUNDLE_FORMATS:
+        bundle_shacl_shapes(input_path, args.output, args.format, prefixes, stats, args.workers)
+    elif args.stream:
+        stream_shacl_shapes(input_path, args.output, args.format, prefixes, stats, args.stable_ids,
+                            args.workers)
+    else:
+        cache = None if args.no_cache else ShapesCache(args.cache_dir)
+        shacl_graph = load_or_create_shapes(input_path, cache, prefixes, stats, args.stable_ids,
+                                            args.workers)
+        with phase(stats, "serialize"):
+            serialize_shapes(shacl_graph, args.output, args.format, args.stable_ids)
+    
+    if stats is not None:
+        print(stats.format(args.stats), file=sys.stderr)
 
 if __name__ == "__main__": # pragma: no cover
     main()
\ No newline at end of file
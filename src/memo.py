@@ -0,0 +1,104 @@
+"""
+In-memory memoization of extracted shapes for long-running processes.
+
+A worker that receives the ontology over and over, as a Graph, bytes, a
+string or a file, asks a ShapesMemo for its shapes every time and only pays
+for an extraction when the content actually changed.
+"""
+
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from typing import Iterable, Optional, Tuple, Union
+
+from rdflib import Graph
+from rdflib.namespace import DC, OWL, RDF
+
+from src.cache import file_digest
+from src.loader import OntologySource, guess_format
+from src.main import create_shacl_shapes, ontology_source
+
+DEFAULT_MEMO_SIZE = 16
+
+def graph_digest(g: Graph) -> str:
+    """
+    SHA-256 of what the extractor reads from a graph: its namespace bindings,
+    its classes and their descriptions, independently of triple order.
+    """
+    h = hashlib.sha256()
+    for prefix, namespace in sorted((p, str(ns)) for p, ns in g.namespaces()):
+        h.update(f"{prefix}\0{namespace}\n".encode('utf-8'))
+    lines = {f"{s.n3()} {o.n3()}" for s, o in g.subject_objects(DC.description)}
+    lines.update(s.n3() for s in g.subjects(RDF.type, OWL.Class))
+    for line in sorted(lines):
+        h.update(line.encode('utf-8') + b"\n")
+    return h.hexdigest()
+
+class ShapesMemo:
+    """
+    A size-bounded LRU cache of shapes graphs keyed by the SHA-256 of the
+    ontology content, its format and the extra prefixes. Safe to share
+    between threads. The returned graphs are shared by every caller asking
+    for the same ontology and must not be modified.
+    """
+
+    def __init__(self, maxsize: int = DEFAULT_MEMO_SIZE):
+        self.maxsize = maxsize
+        self.hits = 0
+        self.misses = 0
+        self._entries: "OrderedDict[Tuple, Graph]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _digest(self, source: OntologySource) -> Tuple[str, OntologySource]:
+        """
+        Return the content digest of source and the source to extract from,
+        which for a file-like object is its content read once.
+        """
+        if isinstance(source, Graph):
+            return "graph:" + graph_digest(source), source
+        if isinstance(source, (str, os.PathLike)):
+            return file_digest(source), source
+        data = source if isinstance(source, bytes) else source.read()
+        if isinstance(data, str):
+            data = data.encode('utf-8')
+        return hashlib.sha256(data).hexdigest(), data
+
+    def shapes(self, input_file: Optional[OntologySource] = None,
+               prefixes: Optional[Iterable[Tuple[str, str]]] = None, *,
+               data: Union[str, bytes, None] = None, format: Optional[str] = None,
+               stable_ids: bool = False) -> Graph:
+        """
+        create_shacl_shapes, memoized. Paths are keyed by their content, so
+        a file rewritten in place is extracted again.
+        """
+        source = ontology_source(input_file, data)
+        if format is None and not isinstance(source, (str, os.PathLike, bytes, Graph)):
+            # The name of a file-like object is lost once its content is read
+            name = getattr(source, 'name', None)
+            format = guess_format(name) if isinstance(name, str) else None
+        digest, source = self._digest(source)
+        prefixes = list(prefixes) if prefixes is not None else None
+        key = (digest, format, tuple(prefixes or ()), stable_ids)
+        with self._lock:
+            shapes = self._entries.get(key)
+            if shapes is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return shapes
+            self.misses += 1
+
+        shapes = create_shacl_shapes(source, prefixes, format=format, stable_ids=stable_ids)
+        with self._lock:
+            self._entries[key] = shapes
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+        return shapes
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
@@ -0,0 +1,493 @@
+"""
+Local HTTP service for shapes and validation, with warm caches.
+
+    poetry run serve --port 8080 --workers 4
+
+Endpoints:
+
+    GET  /versions                   the ontology versions under
+                                     data-model/ontology and which are loaded
+    GET  /shapes/{version}           the shapes of a version, in ?format=turtle
+                                     (default) or nt, or as negotiated with
+                                     Accept; with an ETag
+    POST /validate?version=          validate the JSON-LD document in the body,
+                                     or JSON Lines with ?json_lines=1 or an
+                                     application/x-ndjson body; also takes
+                                     engine= and chunk_size=
+    GET  /metrics                    request counts, latency percentiles and
+                                     throughput per endpoint, as JSON
+    GET  /health
+
+The shapes of every version are loaded on first use, or at start with
+--preload, and kept with their serializations until the ontology file
+changes. Validation runs in a process pool whose workers keep a compiled
+validator and the resolved JSON-LD contexts per version, so a request only
+pays for parsing its data and running the checks. At most --max-concurrent
+validations run at once and up to --max-queue more wait for a slot; beyond
+that requests are turned away with 503.
+
+The HTTP/1.1 server is a small asyncio one: keep-alive and
+Content-Length bodies, no chunked request bodies.
+"""
+
+import argparse
+import asyncio
+import io
+import json
+import multiprocessing
+import os
+import sys
+import time
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from http import HTTPStatus
+from pathlib import Path
+from typing import Any, Deque, Dict, List, Optional, Tuple, Union
+from urllib.parse import parse_qs, urlsplit
+
+from src.batch import list_versions
+from src.cache import ShapesCache, file_digest
+from src.contexts import CONTEXT_BASE_PATH, ContextResolver
+from src.jsonstream import iter_chunks, iter_jsonld_items
+from src.loader import load_class_hierarchy
+from src.main import ONTOLOGY_BASE_PATH, load_or_create_shapes
+from src.validate import DEFAULT_CHUNK_SIZE, ENGINES, chunk_graph, make_validator
+from src.writer import FORMATS
+
+DEFAULT_PORT = 8080
+DEFAULT_MAX_BODY = 64 * 1024 * 1024
+DEFAULT_MAX_QUEUE = 64
+
+# Latencies kept per endpoint for the percentiles
+LATENCY_WINDOW = 1024
+
+# Compiled validators kept per worker
+WORKER_VALIDATORS = 8
+
+CONTENT_TYPES = {
+    'turtle': 'text/turtle; charset=utf-8',
+    'nt': 'application/n-triples; charset=utf-8',
+}
+
+JSON_LINES_TYPES = ('application/x-ndjson', 'application/jsonl', 'application/json-lines')
+
+class HTTPError(Exception):
+    def __init__(self, status: HTTPStatus, message: Optional[str] = None):
+        super().__init__(message or status.phrase)
+        self.status = status
+
+class EndpointMetrics:
+    __slots__ = ('requests', 'errors', 'total', 'max', 'latencies')
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.total = 0.0
+        self.max = 0.0
+        self.latencies: Deque[float] = deque(maxlen=LATENCY_WINDOW)
+
+    def record(self, elapsed: float, error: bool) -> None:
+        self.requests += 1
+        self.errors += int(error)
+        self.total += elapsed
+        self.max = max(self.max, elapsed)
+        self.latencies.append(elapsed)
+
+    def as_dict(self, uptime: float) -> Dict[str, Any]:
+        window = sorted(self.latencies)
+
+        def percentile(p: float) -> float:
+            return round(window[min(len(window) - 1, int(p * len(window)))] * 1000, 3) if window else 0.0
+
+        return {
+            "requests": self.requests,
+            "errors": self.errors,
+            "requests_per_second": round(self.requests / uptime, 3) if uptime else 0.0,
+            "latency_ms": {
+                "mean": round(self.total / self.requests * 1000, 3) if self.requests else 0.0,
+                "p50": percentile(0.5),
+                "p95": percentile(0.95),
+                "p99": percentile(0.99),
+                "max": round(self.max * 1000, 3),
+            },
+        }
+
+class Metrics:
+    """
+    Latency and throughput counters of a running service. Percentiles are
+    computed over the last LATENCY_WINDOW requests of every endpoint.
+    """
+
+    def __init__(self):
+        self.started = time.monotonic()
+        self.endpoints: Dict[str, EndpointMetrics] = {}
+        self.in_flight = 0
+        self.items = 0
+        self.rejected = 0
+
+    def record(self, endpoint: str, elapsed: float, error: bool) -> None:
+        self.endpoints.setdefault(endpoint, EndpointMetrics()).record(elapsed, error)
+
+    def as_dict(self) -> Dict[str, Any]:
+        uptime = time.monotonic() - self.started
+        return {
+            "uptime_seconds": round(uptime, 3),
+            "in_flight": self.in_flight,
+            "rejected": self.rejected,
+            "validated_items": self.items,
+            "items_per_second": round(self.items / uptime, 3) if uptime else 0.0,
+            "endpoints": {name: m.as_dict(uptime) for name, m in sorted(self.endpoints.items())},
+        }
+
+class LoadedVersion:
+    __slots__ = ('path', 'stamp', 'key', 'shapes', 'rendered')
+
+    def __init__(self, path: Path, stamp: Tuple[int, int], key: str, shapes):
+        self.path = path
+        self.stamp = stamp
+        self.key = key
+        self.shapes = shapes
+        self.rendered: Dict[str, bytes] = {}
+
+def _file_stamp(path: Path) -> Tuple[int, int]:
+    stat = path.stat()
+    return stat.st_mtime_ns, stat.st_size
+
+# Worker state: compiled validators by (shapes key, engine), and context
+# resolvers by (context directory, offline)
+_validators: 'OrderedDict[Tuple[str, str], Any]' = OrderedDict()
+_resolvers: Dict[Tuple[str, bool], ContextResolver] = {}
+
+def _worker_validator(path: str, key: str, engine: str, cache_dir: Optional[str]):
+    validator = _validators.get((key, engine))
+    if validator is None:
+        shapes = load_or_create_shapes(path, ShapesCache(cache_dir) if cache_dir is not None else None)
+        validator = make_validator(shapes, engine, load_class_hierarchy(path))
+        _validators[(key, engine)] = validator
+        while len(_validators) > WORKER_VALIDATORS:
+            _validators.popitem(last=False)
+    else:
+        _validators.move_to_end((key, engine))
+    return validator
+
+def validate_request(path: str, key: str, body: bytes, json_lines: bool = False, engine: str = 'native',
+                     chunk_size: int = DEFAULT_CHUNK_SIZE, cache_dir: Optional[str] = None,
+                     context_dir: Union[str, os.PathLike] = CONTEXT_BASE_PATH,
+                     offline: bool = False) -> Dict[str, Any]:
+    """
+    Validate a request body against the shapes of the ontology at path,
+    identified by key. Runs inside a worker process, where the compiled
+    shapes and the resolved contexts are kept for the next requests.
+    """
+    validator = _worker_validator(path, key, engine, cache_dir)
+    resolver = _resolvers.get((str(context_dir), offline))
+    if resolver is None:
+        resolver = _resolvers[(str(context_dir), offline)] = ContextResolver(context_dir, offline=offline)
+
+    summary = {"conforms": True, "items": 0, "chunks": 0, "violations": 0, "results": []}
+    items = iter_jsonld_items(io.StringIO(body.decode('utf-8')), json_lines)
+    for index, (context, chunk) in enumerate(iter_chunks(items, chunk_size)):
+        conforms, violations = validator.validate(chunk_graph(resolver.resolve(context), chunk))
+        summary["conforms"] = summary["conforms"] and conforms
+        summary["items"] += len(chunk)
+        summary["chunks"] += 1
+        summary["violations"] += len(violations)
+        summary["results"].extend(dict(v.as_dict(), chunk=index) for v in violations)
+    return summary
+
+class ShapesService:
+    """
+    The state of a running service: the loaded versions, the validation
+    pool and the metrics.
+    """
+
+    def __init__(self, base_path: Union[str, os.PathLike, None] = None, cache_dir: Optional[str] = None,
+                 use_cache: bool = True, workers: Optional[int] = None, max_concurrent: Optional[int] = None,
+                 max_queue: int = DEFAULT_MAX_QUEUE, max_body: int = DEFAULT_MAX_BODY,
+                 context_dir: Union[str, os.PathLike] = CONTEXT_BASE_PATH, offline: bool = False):
+        self.base_path = Path(base_path) if base_path is not None else ONTOLOGY_BASE_PATH
+        self.cache = ShapesCache(cache_dir) if use_cache else None
+        self.cache_dir = str(self.cache.directory) if self.cache is not None else None
+        self.workers = workers or os.cpu_count() or 1
+        self.max_concurrent = max_concurrent or 2 * self.workers
+        self.max_queue = max_queue
+        self.max_body = max_body
+        self.context_dir = str(context_dir)
+        self.offline = offline
+        self.metrics = Metrics()
+        self.versions: Dict[str, LoadedVersion] = {}
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._slots: Optional[asyncio.Semaphore] = None
+        self._locks: Dict[str, asyncio.Lock] = {}
+        self._pending = 0
+
+    def version_path(self, version: str) -> Path:
+        if version not in list_versions(self.base_path):
+            raise HTTPError(HTTPStatus.NOT_FOUND, f"Unknown ontology version: {version}")
+        return self.base_path / version / "skg-o.ttl"
+
+    def _load(self, path: Path, stamp: Tuple[int, int]) -> LoadedVersion:
+        key = self.cache.key_for(path) if self.cache is not None else file_digest(path)
+        return LoadedVersion(path, stamp, key, load_or_create_shapes(str(path), self.cache))
+
+    async def version(self, version: str) -> LoadedVersion:
+        """
+        The loaded shapes of version, loaded again if its ontology changed.
+        """
+        path = self.version_path(version)
+        lock = self._locks.setdefault(version, asyncio.Lock())
+        async with lock:
+            stamp = _file_stamp(path)
+            loaded = self.versions.get(version)
+            if loaded is None or loaded.stamp != stamp:
+                loop = asyncio.get_running_loop()
+                loaded = self.versions[version] = await loop.run_in_executor(None, self._load, path, stamp)
+        return loaded
+
+    async def rendered(self, version: str, format: str) -> Tuple[LoadedVersion, bytes]:
+        loaded = await self.version(version)
+        data = loaded.rendered.get(format)
+        if data is None:
+            loop = asyncio.get_running_loop()
+            data = await loop.run_in_executor(None, partial(loaded.shapes.serialize, format=format, encoding='utf-8'))
+            loaded.rendered[format] = data
+        return loaded, data
+
+    async def validate(self, version: str, body: bytes, json_lines: bool, engine: str,
+                       chunk_size: int) -> Dict[str, Any]:
+        if self._pending >= self.max_concurrent + self.max_queue:
+            self.metrics.rejected += 1
+            raise HTTPError(HTTPStatus.SERVICE_UNAVAILABLE, "Too many validations in progress")
+        self._pending += 1
+        try:
+            loaded = await self.version(version)
+            if self._slots is None:
+                self._slots = asyncio.Semaphore(self.max_concurrent)
+            async with self._slots:
+                if self._executor is None:
+                    # Spawned rather than forked: forked workers would hold on
+                    # to the sockets of the connections open at the time
+                    self._executor = ProcessPoolExecutor(max_workers=self.workers,
+                                                         mp_context=multiprocessing.get_context('spawn'))
+                job = partial(validate_request, str(loaded.path), loaded.key, body, json_lines, engine,
+                              chunk_size, self.cache_dir, self.context_dir, self.offline)
+                summary = await asyncio.get_running_loop().run_in_executor(self._executor, job)
+        finally:
+            self._pending -= 1
+        self.metrics.items += summary["items"]
+        return summary
+
+    async def preload(self) -> None:
+        for version in list_versions(self.base_path):
+            await self.version(version)
+
+    def close(self) -> None:
+        if self._executor is not None:
+            self._executor.shutdown()
+            self._executor = None
+
+def _json_response(status: HTTPStatus, value: Any) -> Tuple[HTTPStatus, Dict[str, str], bytes]:
+    return status, {"Content-Type": "application/json"}, json.dumps(value).encode('utf-8')
+
+def _query_value(query: Dict[str, List[str]], name: str, default: Optional[str] = None) -> Optional[str]:
+    values = query.get(name)
+    return values[-1] if values else default
+
+def _shapes_format(query: Dict[str, List[str]], headers: Dict[str, str]) -> str:
+    format = _query_value(query, 'format')
+    if format is None:
+        accept = headers.get('accept', '')
+        format = 'nt' if 'application/n-triples' in accept and 'text/turtle' not in accept else 'turtle'
+    if format not in FORMATS:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, f"Unsupported format: {format}")
+    return format
+
+ENDPOINTS = ('health', 'metrics', 'versions', 'shapes', 'validate')
+
+def endpoint_name(path: str) -> str:
+    """
+    The endpoint metrics are recorded under for a request path.
+    """
+    name = path.strip('/').split('/')[0]
+    return name if name in ENDPOINTS else 'other'
+
+async def route(service: ShapesService, method: str, path: str, query: Dict[str, List[str]],
+                headers: Dict[str, str], body: bytes) -> Tuple[HTTPStatus, Dict[str, str], bytes]:
+    """
+    Handle one request and return its status, headers and body.
+    """
+    parts = [part for part in path.split('/') if part]
+    if parts == ['health']:
+        return _json_response(HTTPStatus.OK, {"status": "ok"})
+    if parts == ['metrics']:
+        return _json_response(HTTPStatus.OK, service.metrics.as_dict())
+    if parts == ['versions']:
+        versions = list_versions(service.base_path)
+        return _json_response(HTTPStatus.OK, {
+            "versions": versions,
+            "loaded": [v for v in versions if v in service.versions],
+        })
+    if len(parts) == 2 and parts[0] == 'shapes':
+        if method not in ('GET', 'HEAD'):
+            raise HTTPError(HTTPStatus.METHOD_NOT_ALLOWED)
+        format = _shapes_format(query, headers)
+        loaded, data = await service.rendered(parts[1], format)
+        etag = f'"{loaded.key[:32]}-{format}"'
+        if headers.get('if-none-match') == etag:
+            return HTTPStatus.NOT_MODIFIED, {"ETag": etag}, b''
+        return (HTTPStatus.OK, {"Content-Type": CONTENT_TYPES[format], "ETag": etag}, data)
+    if parts == ['validate']:
+        if method != 'POST':
+            raise HTTPError(HTTPStatus.METHOD_NOT_ALLOWED)
+        version = _query_value(query, 'version', 'current')
+        engine = _query_value(query, 'engine', 'native')
+        if engine not in ENGINES:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, f"Unknown validation engine: {engine}")
+        try:
+            chunk_size = int(_query_value(query, 'chunk_size', str(DEFAULT_CHUNK_SIZE)))
+        except ValueError:
+            chunk_size = 0
+        if chunk_size < 1:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, "chunk_size must be a positive integer")
+        json_lines = _query_value(query, 'json_lines')
+        if json_lines is None:
+            json_lines = headers.get('content-type', '').split(';')[0].strip() in JSON_LINES_TYPES
+        else:
+            json_lines = json_lines.lower() in ('1', 'true', 'yes')
+        try:
+            summary = await service.validate(version, body, json_lines, engine, chunk_size)
+        except ValueError as e:
+            raise HTTPError(HTTPStatus.BAD_REQUEST, str(e))
+        return _json_response(HTTPStatus.OK, summary)
+    raise HTTPError(HTTPStatus.NOT_FOUND)
+
+async def _read_head(reader: asyncio.StreamReader) -> Optional[Tuple[str, str, str, Dict[str, str]]]:
+    line = await reader.readline()
+    if not line.strip():
+        return None
+    try:
+        method, target, protocol = line.decode('latin-1').split()
+    except ValueError:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, "Malformed request line")
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            break
+        name, _, value = line.decode('latin-1').partition(':')
+        headers[name.strip().lower()] = value.strip()
+    return method, target, protocol, headers
+
+async def _read_body(service: ShapesService, reader: asyncio.StreamReader, writer: asyncio.StreamWriter,
+                     headers: Dict[str, str]) -> bytes:
+    if 'chunked' in headers.get('transfer-encoding', '').lower():
+        raise HTTPError(HTTPStatus.LENGTH_REQUIRED, "Chunked request bodies are not supported")
+    try:
+        length = int(headers.get('content-length', '0'))
+    except ValueError:
+        raise HTTPError(HTTPStatus.BAD_REQUEST, "Invalid Content-Length")
+    if length > service.max_body:
+        raise HTTPError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, f"Request bodies are limited to {service.max_body} bytes")
+    if length and headers.get('expect', '').lower() == '100-continue':
+        writer.write(b"HTTP/1.1 100 Continue\r\n\r\n")
+    return await reader.readexactly(length) if length else b''
+
+def _write_response(writer: asyncio.StreamWriter, status: HTTPStatus, headers: Dict[str, str], body: bytes,
+                    keep_alive: bool, head: bool = False) -> None:
+    lines = [f"HTTP/1.1 {status.value} {status.phrase}", f"Content-Length: {len(body)}",
+             f"Connection: {'keep-alive' if keep_alive else 'close'}"]
+    lines.extend(f"{name}: {value}" for name, value in headers.items())
+    writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1'))
+    if not head:
+        writer.write(body)
+
+async def handle_connection(service: ShapesService, reader: asyncio.StreamReader,
+                            writer: asyncio.StreamWriter) -> None:
+    try:
+        keep_alive = True
+        while keep_alive:
+            start = time.perf_counter()
+            endpoint, head, body = 'other', False, None
+            try:
+                request = await _read_head(reader)
+                if request is None:
+                    break
+                method, target, protocol, headers = request
+                connection = headers.get('connection', '').lower()
+                keep_alive = connection != 'close' and (protocol != 'HTTP/1.0' or connection == 'keep-alive')
+                head = method == 'HEAD'
+                url = urlsplit(target)
+                endpoint = endpoint_name(url.path)
+                body = await _read_body(service, reader, writer, headers)
+                service.metrics.in_flight += 1
+                try:
+                    status, response_headers, response = await route(
+                        service, method, url.path, parse_qs(url.query), headers, body)
+                finally:
+                    service.metrics.in_flight -= 1
+            except HTTPError as e:
+                status, response_headers, response = _json_response(e.status, {"error": str(e)})
+                if body is None:
+                    # The rest of the request is still in the stream
+                    keep_alive = False
+            except (asyncio.IncompleteReadError, ConnectionError):
+                break
+            except Exception as e: # pragma: no cover - reported to the client
+                status, response_headers, response = _json_response(HTTPStatus.INTERNAL_SERVER_ERROR,
+                                                                     {"error": str(e)})
+            _write_response(writer, status, response_headers, response, keep_alive, head)
+            await writer.drain()
+            service.metrics.record(endpoint, time.perf_counter() - start, status.value >= 400)
+    finally:
+        writer.close()
+
+async def start_server(service: ShapesService, host: str = '127.0.0.1',
+                       port: int = DEFAULT_PORT) -> asyncio.AbstractServer:
+    return await asyncio.start_server(partial(handle_connection, service), host, port)
+
+async def _serve(service: ShapesService, host: str, port: int, preload: bool) -> None:
+    if preload:
+        await service.preload()
+    server = await start_server(service, host, port)
+    address = server.sockets[0].getsockname()
+    print(f"Serving on http://{address[0]}:{address[1]}", file=sys.stderr)
+    async with server:
+        await server.serve_forever()
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve SHACL shapes and validate SKG-IF data over HTTP')
+    parser.add_argument('--host', default='127.0.0.1', help='Address to listen on (default: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help=f'Port to listen on (default: {DEFAULT_PORT})')
+    parser.add_argument('--ontology-dir', default=str(ONTOLOGY_BASE_PATH),
+                        help=f'Directory of the ontology versions (default: {ONTOLOGY_BASE_PATH})')
+    parser.add_argument('--preload', action='store_true', help='Load the shapes of every version at start')
+    parser.add_argument('--cache-dir', help='Directory of the shapes cache (default: ~/.cache/skg-if-shacl-extractor)')
+    parser.add_argument('--no-cache', action='store_true', help='Extract the shapes without the disk cache')
+    parser.add_argument('--workers', type=int, help='Validation worker processes (default: CPU count)')
+    parser.add_argument('--max-concurrent', type=int,
+                        help='Validations running at once (default: twice the workers)')
+    parser.add_argument('--max-queue', type=int, default=DEFAULT_MAX_QUEUE,
+                        help='Validations waiting for a slot before requests are rejected '
+                        f'(default: {DEFAULT_MAX_QUEUE})')
+    parser.add_argument('--max-body', type=int, default=DEFAULT_MAX_BODY,
+                        help=f'Largest request body in bytes (default: {DEFAULT_MAX_BODY})')
+    parser.add_argument('--context-dir', default=str(CONTEXT_BASE_PATH),
+                        help=f'Local copies of the SKG-IF JSON-LD contexts (default: {CONTEXT_BASE_PATH})')
+    parser.add_argument('--offline', action='store_true',
+                        help='Fail on remote @context URLs without a local copy instead of fetching them')
+
+    args = parser.parse_args()
+
+    service = ShapesService(args.ontology_dir, args.cache_dir, use_cache=not args.no_cache, workers=args.workers,
+                            max_concurrent=args.max_concurrent, max_queue=args.max_queue, max_body=args.max_body,
+                            context_dir=args.context_dir, offline=args.offline)
+    try:
+        asyncio.run(_serve(service, args.host, args.port, args.preload))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        service.close()
+
+if __name__ == "__main__": # pragma: no cover
+    main()
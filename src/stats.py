@@ -0,0 +1,91 @@
+"""
+Optional instrumentation of an extraction run.
+
+An ExtractionStats collects the wall time of every phase, a few counters
+and the peak resident set size of the process. The extraction functions
+take it as an optional stats argument. Without one they only pay for a
+None check at phase boundaries: nothing is measured inside per-class
+loops, and the counters are derived from the results of each phase.
+"""
+
+import json
+import sys
+import time
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional
+
+try:
+    import resource
+except ImportError: # pragma: no cover - not available on Windows
+    resource = None
+
+PhaseCallback = Callable[[str, float], None]
+
+def peak_rss() -> Optional[int]:
+    """
+    Peak resident set size of this process in bytes, or None where the
+    platform does not report it.
+    """
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux reports KiB, macOS bytes
+    return peak if sys.platform == 'darwin' else peak * 1024
+
+class ExtractionStats:
+    """
+    Phase timings and counters of one run. on_phase, when given, is called
+    with the name and duration of every phase as soon as it ends.
+    """
+
+    def __init__(self, on_phase: Optional[PhaseCallback] = None):
+        self.on_phase = on_phase
+        self.phases: Dict[str, float] = {}
+        self.counters: Dict[str, int] = {}
+
+    @contextmanager
+    def phase(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.phases[name] = self.phases.get(name, 0.0) + elapsed
+            if self.on_phase is not None:
+                self.on_phase(name, elapsed)
+
+    def count(self, name: str, n: int = 1) -> None:
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "phases": dict(self.phases),
+            "total": sum(self.phases.values()),
+            "counters": dict(self.counters),
+            "peak_rss": peak_rss(),
+        }
+
+    def format(self, style: str = 'human') -> str:
+        """
+        Render the stats as 'human' readable lines or as 'json'.
+        """
+        data = self.as_dict()
+        if style == 'json':
+            return json.dumps(data)
+        lines = [f"{name:<12} {seconds:9.3f} s" for name, seconds in data["phases"].items()]
+        lines.append(f"{'total':<12} {data['total']:9.3f} s")
+        lines.extend(f"{name:<20} {value}" for name, value in data["counters"].items())
+        if data["peak_rss"] is not None:
+            lines.append(f"{'peak RSS':<20} {data['peak_rss'] / 2**20:.1f} MiB")
+        return "\n".join(lines)
+
+@contextmanager
+def phase(stats: Optional[ExtractionStats], name: str) -> Iterator[None]:
+    """
+    stats.phase(name), or nothing at all when stats is None.
+    """
+    if stats is None:
+        yield
+    else:
+        with stats.phase(name):
+            yield
@@ -0,0 +1,380 @@
+"""
+Streaming, parallel validation of large SKG-IF JSON-LD dumps.
+
+The input is read item by item and cut into chunks of whole top-level
+entities. Chunks are validated in a process pool against shapes built once,
+by default with the compiled checks of src.compiler and otherwise with
+pyshacl, and the results are written incrementally, so memory is bounded
+by the chunk size and the number of chunks in flight rather than by the size
+of the dump.
+
+With a ValidationCache, the results of every file are stored under the hash
+of its content and a fingerprint of the shapes: a file that did not change
+since it was last validated against the same shapes is not read again and
+its results are replayed from the cache.
+
+Entities are checked against the shapes targeting their classes or, with
+the rdfs:subClassOf hierarchy of the ontology, their superclasses (see
+src.compiler); untyped and untargeted entities cost a type lookup only.
+
+Remote @context references are inlined by a ContextResolver from the local
+copies of the context submodule, so documents are parsed without network
+access (see src.contexts).
+
+Chunks are closed over top-level entities: everything embedded in an entity
+is validated with it. References to entities in other chunks are plain IRIs,
+which the generated class constraints accept through their
+sh:nodeKind sh:BlankNodeOrIRI alternative.
+"""
+
+import argparse
+import hashlib
+import json
+import os
+import sys
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from typing import Any, Deque, Dict, Iterator, List, Optional, TextIO, Tuple, Union
+
+from rdflib import BNode, Graph, Literal
+from rdflib.namespace import RDF
+
+from src.cache import ShapesCache, ValidationCache, file_digest
+from src.compiler import Violation, compile_shapes, results_graph, violations_from_results
+from src.contexts import CONTEXT_BASE_PATH, ContextResolver
+from src.emit import SH
+from src.jsonstream import iter_chunks, iter_jsonld_items
+from src.loader import load_class_hierarchy
+from src.main import get_ontology_path, load_or_create_shapes
+
+DEFAULT_CHUNK_SIZE = 1000
+
+REPORT_FORMATS = ('jsonl', 'nt')
+
+ENGINES = ('native', 'pyshacl')
+
+class ChunkResult:
+    __slots__ = ('source', 'index', 'items', 'conforms', 'results', 'report')
+
+    def __init__(self, source: str, index: int, items: int, conforms: bool,
+                 results: List[Dict[str, str]], report: str):
+        self.source = source
+        self.index = index
+        self.items = items
+        self.conforms = conforms
+        self.results = results
+        self.report = report
+
+class PyShaclValidator:
+    """
+    Runs the general-purpose pyshacl engine, with the interface of
+    CompiledShapes.
+    """
+
+    def __init__(self, shapes: Graph, hierarchy: Optional[Graph] = None):
+        self.shapes = shapes
+        self.hierarchy = hierarchy
+
+    def validate(self, data_graph: Graph) -> Tuple[bool, List[Violation]]:
+        from pyshacl import validate
+
+        conforms, results, _ = validate(data_graph=data_graph, shacl_graph=self.shapes, ont_graph=self.hierarchy,
+                                        debug=False)
+        return conforms, violations_from_results(results)
+
+def make_validator(shapes: Graph, engine: str = 'native', hierarchy: Optional[Graph] = None):
+    if engine == 'native':
+        return compile_shapes(shapes, hierarchy)
+    if engine == 'pyshacl':
+        return PyShaclValidator(shapes, hierarchy)
+    raise ValueError(f"Unknown validation engine: {engine}")
+
+_validator = None
+
+def _init_worker(shapes_nt: str, engine: str, hierarchy_nt: Optional[str] = None) -> None:
+    global _validator
+    shapes = Graph()
+    shapes.parse(data=shapes_nt, format='nt')
+    hierarchy = None
+    if hierarchy_nt is not None:
+        hierarchy = Graph()
+        hierarchy.parse(data=hierarchy_nt, format='nt')
+    _validator = make_validator(shapes, engine, hierarchy)
+
+def _worker_args(shapes: Graph, engine: str, hierarchy: Optional[Graph]) -> tuple:
+    return (shapes.serialize(format='nt'), engine,
+            hierarchy.serialize(format='nt') if hierarchy is not None else None)
+
+def chunk_graph(context: Any, items: List[dict]) -> Graph:
+    document = {"@graph": items}
+    if context is not None:
+        document["@context"] = context
+    data_graph = Graph()
+    data_graph.parse(data=json.dumps(document), format='json-ld')
+    return data_graph
+
+def validate_chunk(source: str, index: int, context: Any, items: List[dict]) -> ChunkResult:
+    """
+    Validate one chunk with the worker's validator. Runs inside a worker process.
+    """
+    conforms, violations = _validator.validate(chunk_graph(context, items))
+    return ChunkResult(source, index, len(items), conforms, [v.as_dict() for v in violations],
+                       results_graph(violations).serialize(format='nt'))
+
+class JSONLinesReport:
+    """
+    One JSON object per validation result, followed by a summary line.
+    """
+
+    def __init__(self, out: TextIO):
+        self.out = out
+
+    def write_chunk(self, chunk: ChunkResult) -> None:
+        for result in chunk.results:
+            record = {"source": chunk.source, "chunk": chunk.index}
+            record.update(result)
+            self.out.write(json.dumps(record) + "\n")
+
+    def close(self, summary: Dict[str, Any]) -> None:
+        self.out.write(json.dumps({"summary": summary}) + "\n")
+
+class ValidationReportWriter:
+    """
+    A single sh:ValidationReport in N-Triples, written chunk by chunk.
+    The blank nodes of every chunk report are relabelled to stay distinct.
+    """
+
+    REPORT = "_:report"
+
+    def __init__(self, out: TextIO):
+        self.out = out
+        self.chunks = 0
+
+    def write_chunk(self, chunk: ChunkResult) -> None:
+        self.chunks += 1
+        g = Graph()
+        g.parse(data=chunk.report, format='nt')
+        prefix = f"_:c{self.chunks}_"
+        label = lambda term: prefix + str(term) if isinstance(term, BNode) else term.n3()
+        reports = set(g.subjects(RDF.type, SH.ValidationReport))
+        for s, p, o in g:
+            if s in reports:
+                continue
+            self.out.write(f"{label(s)} {p.n3()} {label(o)} .\n")
+        for result in g.subjects(RDF.type, SH.ValidationResult):
+            self.out.write(f"{self.REPORT} {SH.result.n3()} {label(result)} .\n")
+
+    def close(self, summary: Dict[str, Any]) -> None:
+        self.out.write(f"{self.REPORT} {RDF.type.n3()} {SH.ValidationReport.n3()} .\n")
+        self.out.write(f"{self.REPORT} {SH.conforms.n3()} {Literal(summary['conforms']).n3()} .\n")
+
+def shapes_fingerprint(shapes: Graph) -> str:
+    """
+    SHA-256 of the triples of a shapes graph, independently of their order
+    and of blank node labels: every blank node stands for the digest of
+    the triples it is the subject of.
+    """
+    digests: Dict[BNode, str] = {}
+
+    def term(node) -> str:
+        if not isinstance(node, BNode):
+            return node.n3()
+        digest = digests.get(node)
+        if digest is None:
+            lines = sorted(f"{p.n3()} {term(o)}" for p, o in shapes.predicate_objects(node))
+            digest = digests[node] = "_:" + hashlib.sha256("\n".join(lines).encode('utf-8')).hexdigest()
+        return digest
+
+    h = hashlib.sha256()
+    for line in sorted(f"{term(s)} {p.n3()} {term(o)}" for s, p, o in shapes):
+        h.update(line.encode('utf-8') + b"\n")
+    return h.hexdigest()
+
+class FileResults:
+    """
+    The chunk results of one data file, stored in the validation cache once
+    all of them are collected.
+    """
+    __slots__ = ('key', 'chunks', 'expected')
+
+    def __init__(self, key: str):
+        self.key = key
+        self.chunks: List[tuple] = []
+        self.expected: Optional[int] = None
+
+    def store_if_complete(self, cache: ValidationCache) -> None:
+        if self.expected is not None and len(self.chunks) == self.expected:
+            cache.put_results(self.key, self.chunks)
+
+def validate_files(inputs: List[str], shapes: Graph, report, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                   workers: Optional[int] = None, json_lines: Optional[bool] = None,
+                   engine: str = 'native', result_cache: Optional[ValidationCache] = None,
+                   shapes_key: Optional[str] = None,
+                   contexts: Optional[ContextResolver] = None,
+                   hierarchy: Optional[Graph] = None) -> Dict[str, Any]:
+    """
+    Validate every input against shapes, writing each chunk's results to
+    report as soon as it is available, in input order. At most two chunks
+    per worker are in flight at any time.
+
+    With result_cache, files whose content was already validated against
+    the same shapes are replayed from the cache. shapes_key identifies the
+    shapes, for instance the digest of the file they come from; by default
+    it is their shapes_fingerprint.
+
+    With contexts, remote @context references are resolved by it once and
+    sent to the workers inline. hierarchy holds the rdfs:subClassOf
+    statements of the ontology (see load_class_hierarchy), which extend the
+    targets of the shapes to the instances of subclasses.
+
+    Returns a summary with the overall conformance and counters, plus the
+    cache hits and misses.
+    """
+    workers = workers or os.cpu_count() or 1
+    summary = {"conforms": True, "files": len(inputs), "chunks": 0, "items": 0, "violations": 0}
+    if result_cache is not None and shapes_key is None:
+        shapes_key = shapes_fingerprint(shapes)
+    contexts_key = contexts.fingerprint() if result_cache is not None and contexts is not None else None
+    hierarchy_key = shapes_fingerprint(hierarchy) if result_cache is not None and hierarchy is not None else None
+
+    def collect(record: Optional[FileResults], chunk: Union[ChunkResult, Future]) -> None:
+        if isinstance(chunk, Future):
+            chunk = chunk.result()
+        summary["conforms"] = summary["conforms"] and chunk.conforms
+        summary["chunks"] += 1
+        summary["items"] += chunk.items
+        summary["violations"] += len(chunk.results)
+        report.write_chunk(chunk)
+        if record is not None:
+            record.chunks.append((chunk.items, chunk.conforms, chunk.results, chunk.report))
+            record.store_if_complete(result_cache)
+
+    def jobs() -> Iterator[Tuple[Optional[FileResults], Union[ChunkResult, tuple]]]:
+        for source in inputs:
+            record = None
+            if result_cache is not None:
+                key = result_cache.key_for(file_digest(source), shapes_key, engine, chunk_size, json_lines,
+                                           contexts_key, hierarchy_key)
+                cached = result_cache.get_results(key)
+                if cached is not None:
+                    for index, chunk in enumerate(cached):
+                        yield None, ChunkResult(source, index, *chunk)
+                    continue
+                record = FileResults(key)
+            count = 0
+            for count, (context, items) in enumerate(iter_chunks(iter_jsonld_items(source, json_lines),
+                                                                 chunk_size), 1):
+                if contexts is not None:
+                    context = contexts.resolve(context)
+                yield record, (source, count - 1, context, items)
+            if record is not None:
+                record.expected = count
+                record.store_if_complete(result_cache)
+
+    # Workers, and the shapes they are sent, are only set up for the first
+    # chunk that actually needs validating
+    executor: Optional[ProcessPoolExecutor] = None
+    initialized = False
+    in_flight: Deque[Tuple[Optional[FileResults], Union[ChunkResult, Future]]] = deque()
+    try:
+        for record, job in jobs():
+            if isinstance(job, ChunkResult):
+                in_flight.append((record, job))
+            elif workers == 1:
+                if not initialized:
+                    _init_worker(*_worker_args(shapes, engine, hierarchy))
+                    initialized = True
+                in_flight.append((record, validate_chunk(*job)))
+            else:
+                if executor is None:
+                    executor = ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                                   initargs=_worker_args(shapes, engine, hierarchy))
+                in_flight.append((record, executor.submit(validate_chunk, *job)))
+            if len(in_flight) >= 2 * workers:
+                collect(*in_flight.popleft())
+        while in_flight:
+            collect(*in_flight.popleft())
+    finally:
+        if executor is not None:
+            executor.shutdown()
+
+    if result_cache is not None:
+        summary["cache"] = result_cache.stats()
+    report.close(summary)
+    return summary
+
+def main():
+    parser = argparse.ArgumentParser(description='Validate SKG-IF JSON-LD data against the extracted SHACL shapes')
+    parser.add_argument('inputs', nargs='+', help='JSON-LD files: documents with a top-level @graph, '
+                        'or JSON Lines (.jsonl/.ndjson) with one document per line')
+    parser.add_argument('--shapes', help='SHACL shapes file (default: extracted from the ontology)')
+    parser.add_argument('--input', help='Ontology to extract the shapes from (optional); its rdfs:subClassOf '
+                        'hierarchy extends the targets of the shapes to subclasses, also with --shapes')
+    parser.add_argument('--version', help='Ontology version to extract the shapes from (e.g., "1.0.0", "current")')
+    parser.add_argument('--cache-dir', help='Directory of the shapes cache (default: ~/.cache/skg-if-shacl-extractor)')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Always re-extract the shapes and validate every file, bypassing the caches')
+    parser.add_argument('--no-result-cache', action='store_true',
+                        help='Validate every file, even if its results against the same shapes are cached')
+    parser.add_argument('--context-dir', default=str(CONTEXT_BASE_PATH),
+                        help=f'Local copies of the SKG-IF JSON-LD contexts (default: {CONTEXT_BASE_PATH})')
+    parser.add_argument('--offline', action='store_true',
+                        help='Fail on remote @context URLs without a local copy instead of fetching them')
+    parser.add_argument('--json-lines', action='store_true', help='Read every input as JSON Lines')
+    parser.add_argument('--chunk-size', type=int, default=DEFAULT_CHUNK_SIZE,
+                        help=f'Top-level entities validated together (default: {DEFAULT_CHUNK_SIZE})')
+    parser.add_argument('--workers', type=int, help='Worker processes (default: CPU count)')
+    parser.add_argument('--engine', choices=ENGINES, default='native',
+                        help='native: compiled checks, with pyshacl only for unsupported shapes (default); '
+                        'pyshacl: pyshacl for every shape')
+    parser.add_argument('--report', help='Report file (default: standard output)')
+    parser.add_argument('--report-format', choices=REPORT_FORMATS, default='jsonl',
+                        help='jsonl: one JSON object per result; nt: a SHACL ValidationReport in N-Triples')
+
+    args = parser.parse_args()
+
+    if args.shapes:
+        shapes = Graph()
+        shapes.parse(args.shapes)
+        shapes_key = "shapes:" + file_digest(args.shapes)
+        # The class hierarchy still comes from the ontology, if one is given
+        input_path = args.input
+    else:
+        if args.input:
+            input_path = args.input
+        else:
+            try:
+                input_path = get_ontology_path(args.version)
+            except ValueError as e:
+                parser.error(str(e))
+        cache = None if args.no_cache else ShapesCache(args.cache_dir)
+        shapes = load_or_create_shapes(input_path, cache)
+        # The shapes are identified by the ontology they are extracted from
+        shapes_key = "ontology:" + ShapesCache(args.cache_dir).key_for(input_path)
+    hierarchy = load_class_hierarchy(input_path) if input_path else None
+    result_cache = None if args.no_cache or args.no_result_cache else ValidationCache(args.cache_dir)
+
+    out = open(args.report, 'w', encoding='utf-8') if args.report else sys.stdout
+    try:
+        report = JSONLinesReport(out) if args.report_format == 'jsonl' else ValidationReportWriter(out)
+        contexts = ContextResolver(args.context_dir, offline=args.offline)
+        try:
+            summary = validate_files(args.inputs, shapes, report, chunk_size=args.chunk_size,
+                                     workers=args.workers, json_lines=True if args.json_lines else None,
+                                     engine=args.engine, result_cache=result_cache, shapes_key=shapes_key,
+                                     contexts=contexts, hierarchy=hierarchy)
+        except ValueError as e:
+            parser.error(str(e))
+    finally:
+        if args.report:
+            out.close()
+
+    print(f"{summary['items']} items in {summary['chunks']} chunks: "
+          f"{'conforms' if summary['conforms'] else str(summary['violations']) + ' violations'}",
+          file=sys.stderr)
+    if result_cache is not None:
+        print(f"Result cache: {result_cache.hits} files replayed, {result_cache.misses} validated", file=sys.stderr)
+    sys.exit(0 if summary['conforms'] else 1)
+
+if __name__ == "__main__": # pragma: no cover
+    main()
@@ -0,0 +1,217 @@
+"""
+Streaming SHACL writers that serialize shape IR records straight to a file
+handle, without building an rdflib Graph.
+
+Each NodeShape is written as soon as it is received, so memory does not grow
+with the number of shapes. The Turtle writer groups every shape in a single
+block with inline [ ] property shapes and ( ) lists, and declares each prefix
+right before the first block that uses it.
+
+With stable_ids, blank nodes get content-derived labels (see src.ir) and the
+sh:or list of every target class is written once, after the first shape
+that uses it, and referenced by label from then on.
+"""
+
+import re
+from typing import Dict, Iterable, List, Optional, Set, TextIO, Tuple
+
+from src.ir import (ALTERNATIVES_TAIL_LABEL, CLASS, DATATYPE, LITERAL, NODE_KIND_LABEL, NodeShape, PropertyShape,
+                    alternatives_label, class_constraint_label, property_label)
+
+SH_NS = "http://www.w3.org/ns/shacl#"
+RDF_NS = "http://www.w3.org/1999/02/22-rdf-syntax-ns#"
+XSD_INTEGER = "http://www.w3.org/2001/XMLSchema#integer"
+
+FORMATS = ('turtle', 'nt')
+
+LOCAL_NAME_RE = re.compile(r'^[A-Za-z_][A-Za-z0-9_\-]*$')
+IRI_ESCAPE_RE = re.compile(r'[\x00-\x20<>"{}|^`\\]')
+
+def iri_ref(iri: str) -> str:
+    return '<' + IRI_ESCAPE_RE.sub(lambda m: '\\u%04X' % ord(m.group()), iri) + '>'
+
+class NTriplesWriter:
+    """
+    Writes one N-Triples statement per line, labelling blank nodes in order,
+    or by content with stable_ids.
+    """
+
+    def __init__(self, out: TextIO, stable_ids: bool = False):
+        self.out = out
+        self._bnodes = 0
+        self._shared: Optional[Set[str]] = set() if stable_ids else None
+
+    def _bnode(self) -> str:
+        self._bnodes += 1
+        return f"_:s{self._bnodes}"
+
+    def _triple(self, s: str, p: str, o: str) -> str:
+        return f"{s} {p} {o} .\n"
+
+    def write_shape(self, shape: NodeShape) -> None:
+        sh = lambda local: iri_ref(SH_NS + local)
+        rdf = lambda local: iri_ref(RDF_NS + local)
+        shape_ref = iri_ref(shape.iri)
+        lines = [
+            self._triple(shape_ref, rdf('type'), sh('NodeShape')),
+            self._triple(shape_ref, sh('targetClass'), iri_ref(shape.target_class)),
+        ]
+        for prop in shape.properties:
+            node = self._bnode() if self._shared is None else "_:" + property_label(shape.iri, prop)
+            lines.append(self._triple(shape_ref, sh('property'), node))
+            lines.append(self._triple(node, sh('path'), iri_ref(prop.path)))
+            if prop.min_count is not None:
+                lines.append(self._triple(node, sh('minCount'), f'"{prop.min_count}"^^{iri_ref(XSD_INTEGER)}'))
+            if prop.max_count is not None:
+                lines.append(self._triple(node, sh('maxCount'), f'"{prop.max_count}"^^{iri_ref(XSD_INTEGER)}'))
+            if prop.kind == LITERAL:
+                lines.append(self._triple(node, sh('nodeKind'), sh('Literal')))
+            elif prop.kind == DATATYPE:
+                lines.append(self._triple(node, sh('datatype'), iri_ref(prop.target)))
+            elif prop.kind == CLASS and self._shared is not None:
+                or_label = alternatives_label(prop.target)
+                lines.append(self._triple(node, sh('or'), "_:" + or_label))
+                if or_label not in self._shared:
+                    self._shared.add(or_label)
+                    class_node, rest_node = "_:" + class_constraint_label(prop.target), "_:" + ALTERNATIVES_TAIL_LABEL
+                    lines += [
+                        self._triple("_:" + or_label, rdf('first'), class_node),
+                        self._triple(class_node, sh('class'), iri_ref(prop.target)),
+                        self._triple("_:" + or_label, rdf('rest'), rest_node),
+                    ]
+                    if ALTERNATIVES_TAIL_LABEL not in self._shared:
+                        self._shared.add(ALTERNATIVES_TAIL_LABEL)
+                        lines += [
+                            self._triple(rest_node, rdf('first'), "_:" + NODE_KIND_LABEL),
+                            self._triple("_:" + NODE_KIND_LABEL, sh('nodeKind'), sh('BlankNodeOrIRI')),
+                            self._triple(rest_node, rdf('rest'), rdf('nil')),
+                        ]
+            elif prop.kind == CLASS:
+                or_node, class_node, rest_node, kind_node = (self._bnode() for _ in range(4))
+                lines += [
+                    self._triple(node, sh('or'), or_node),
+                    self._triple(or_node, rdf('first'), class_node),
+                    self._triple(class_node, sh('class'), iri_ref(prop.target)),
+                    self._triple(or_node, rdf('rest'), rest_node),
+                    self._triple(rest_node, rdf('first'), kind_node),
+                    self._triple(kind_node, sh('nodeKind'), sh('BlankNodeOrIRI')),
+                    self._triple(rest_node, rdf('rest'), rdf('nil')),
+                ]
+        self.out.write(''.join(lines))
+
+class TurtleWriter:
+    """
+    Writes one grouped Turtle block per NodeShape, using prefixed names for
+    every IRI that falls in a bound namespace.
+    """
+
+    def __init__(self, out: TextIO, namespaces: Iterable[Tuple[str, str]], stable_ids: bool = False):
+        self.out = out
+        self._shared: Optional[Set[str]] = set() if stable_ids else None
+        bindings: Dict[str, str] = {'sh': SH_NS}
+        for prefix, namespace in namespaces:
+            if prefix and namespace not in bindings.values():
+                bindings.setdefault(prefix, namespace)
+        # Longest namespace first, so the most specific binding wins
+        self._bindings: List[Tuple[str, str]] = sorted(
+            ((ns, prefix) for prefix, ns in bindings.items()), key=lambda b: -len(b[0]))
+        self._declared: Set[str] = set()
+        self._used: Set[str] = set()
+        self._blocks = 0
+        # The same few IRIs come up in every shape: remember how each is written
+        self._terms: Dict[str, Tuple[str, Optional[str]]] = {}
+
+    def _resolve(self, iri: str) -> Tuple[str, Optional[str]]:
+        for namespace, prefix in self._bindings:
+            if iri.startswith(namespace):
+                local = iri[len(namespace):]
+                if LOCAL_NAME_RE.match(local):
+                    return f"{prefix}:{local}", prefix
+        return iri_ref(iri), None
+
+    def term(self, iri: str) -> str:
+        resolved = self._terms.get(iri)
+        if resolved is None:
+            resolved = self._terms[iri] = self._resolve(iri)
+        text, prefix = resolved
+        if prefix is not None:
+            self._used.add(prefix)
+        return text
+
+    def _property_block(self, prop: PropertyShape) -> str:
+        sh = lambda local: self.term(SH_NS + local)
+        parts = [f"{sh('path')} {self.term(prop.path)}"]
+        if prop.min_count is not None:
+            parts.append(f"{sh('minCount')} {prop.min_count}")
+        if prop.max_count is not None:
+            parts.append(f"{sh('maxCount')} {prop.max_count}")
+        if prop.kind == LITERAL:
+            parts.append(f"{sh('nodeKind')} {sh('Literal')}")
+        elif prop.kind == DATATYPE:
+            parts.append(f"{sh('datatype')} {self.term(prop.target)}")
+        elif prop.kind == CLASS and self._shared is not None:
+            parts.append(f"{sh('or')} _:{alternatives_label(prop.target)}")
+        elif prop.kind == CLASS:
+            parts.append(f"{sh('or')} ( [ {sh('class')} {self.term(prop.target)} ] "
+                         f"[ {sh('nodeKind')} {sh('BlankNodeOrIRI')} ] )")
+        return "[ " + " ;\n            ".join(parts) + " ]"
+
+    def _shared_blocks(self, shape: NodeShape) -> str:
+        """
+        The sh:or lists that shape is the first to reference.
+        """
+        sh = lambda local: self.term(SH_NS + local)
+        rdf = lambda local: self.term(RDF_NS + local)
+        blocks = ""
+        for prop in shape.properties:
+            if prop.kind != CLASS:
+                continue
+            or_label = alternatives_label(prop.target)
+            if or_label in self._shared:
+                continue
+            self._shared.add(or_label)
+            blocks += (f"\n_:{or_label} {rdf('first')} [ {sh('class')} {self.term(prop.target)} ] ;\n"
+                       f"    {rdf('rest')} _:{ALTERNATIVES_TAIL_LABEL} .\n")
+            if ALTERNATIVES_TAIL_LABEL not in self._shared:
+                self._shared.add(ALTERNATIVES_TAIL_LABEL)
+                blocks += (f"\n_:{ALTERNATIVES_TAIL_LABEL} {rdf('first')} "
+                           f"[ {sh('nodeKind')} {sh('BlankNodeOrIRI')} ] ;\n"
+                           f"    {rdf('rest')} {rdf('nil')} .\n")
+        return blocks
+
+    def write_shape(self, shape: NodeShape) -> None:
+        sh = lambda local: self.term(SH_NS + local)
+        block = f"{self.term(shape.iri)} a {sh('NodeShape')} ;\n    {sh('targetClass')} {self.term(shape.target_class)}"
+        if shape.properties:
+            properties = ",\n        ".join(self._property_block(prop) for prop in shape.properties)
+            block += f" ;\n    {sh('property')} {properties}"
+        block += " .\n"
+        if self._shared is not None:
+            block += self._shared_blocks(shape)
+
+        header = ""
+        for namespace, prefix in sorted(self._bindings, key=lambda b: b[1]):
+            if prefix in self._used and prefix not in self._declared:
+                header += f"@prefix {prefix}: {iri_ref(namespace)} .\n"
+                self._declared.add(prefix)
+        if header and self._blocks:
+            header = "\n" + header
+        self.out.write(header + "\n" + block if self._blocks or header else block)
+        self._blocks += 1
+
+def write_shapes(shapes: Iterable[NodeShape], namespaces: Iterable[Tuple[str, str]],
+                 out: TextIO, format: str = 'turtle', stable_ids: bool = False) -> int:
+    """
+    Stream shapes to out in 'turtle' or 'nt' and return how many were written.
+    """
+    if format == 'turtle':
+        writer = TurtleWriter(out, namespaces, stable_ids)
+    elif format == 'nt':
+        writer = NTriplesWriter(out, stable_ids)
+    else:
+        raise ValueError(f"Unsupported streaming format: {format}")
+    count = 0
+    for shape in shapes:
+        writer.write_shape(shape)
+        count += 1
+    return count
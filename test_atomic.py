@@ -0,0 +1,51 @@
+import os
+import shutil
+import stat
+import tempfile
+import unittest
+from pathlib import Path
+
+from src.atomic import atomic_write
+
+class TestAtomicWrite(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp(dir="."))
+        self.umask = os.umask(0)
+        os.umask(self.umask)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def mode(self, path: Path) -> int:
+        return stat.S_IMODE(os.stat(path).st_mode)
+
+    def test_new_files_get_the_default_mode(self):
+        path = self.temp_dir / "sub" / "shapes.ttl"
+        with atomic_write(path) as f:
+            f.write("ex:a ex:b ex:c .\n")
+        self.assertEqual(path.read_text(encoding='utf-8'), "ex:a ex:b ex:c .\n")
+        if os.name == 'posix':
+            self.assertEqual(self.mode(path), 0o666 & ~self.umask)
+
+    def test_replaced_files_keep_their_mode(self):
+        path = self.temp_dir / "data.bin"
+        path.write_bytes(b"old")
+        os.chmod(path, 0o640)
+        with atomic_write(path, 'wb') as f:
+            f.write(b"new")
+        self.assertEqual(path.read_bytes(), b"new")
+        if os.name == 'posix':
+            self.assertEqual(self.mode(path), 0o640)
+
+    def test_failures_leave_the_file_unchanged(self):
+        path = self.temp_dir / "state.json"
+        path.write_text("{}", encoding='utf-8')
+        with self.assertRaises(RuntimeError):
+            with atomic_write(path) as f:
+                f.write("{\"partial\":")
+                raise RuntimeError("interrupted")
+        self.assertEqual(path.read_text(encoding='utf-8'), "{}")
+        self.assertEqual([p.name for p in self.temp_dir.iterdir()], ["state.json"])
+
+if __name__ == '__main__':
+    unittest.main()
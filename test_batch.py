@@ -0,0 +1,99 @@
+import shutil
+import tempfile
+import unittest
+import unittest.mock
+from pathlib import Path
+
+from rdflib import Graph, Namespace
+from rdflib.namespace import RDF
+from src.batch import STATE_FILE, BatchState, list_versions, output_path_for, resolve_versions, run_batch
+
+ONTOLOGY = '''
+@prefix owl: <http://www.w3.org/2002/07/owl#> .
+@prefix dc: <http://purl.org/dc/elements/1.1/> .
+@prefix ex: <http://example.org/> .
+@prefix xsd: <http://www.w3.org/2001/XMLSchema#> .
+
+ex:%s a owl:Class ;
+    dc:description """The properties that can be used with this class are:
+- ex:stringProp -[1]-> xsd:string
+""" .
+'''
+
+class TestBatchExtraction(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp(dir=".")
+        self.base_path = Path(self.temp_dir) / "ontology"
+        for version in ["1.0.0", "1.0.1", "current"]:
+            self.write_version(version, "Class" + version.replace(".", ""))
+        (self.base_path / "not-a-version").mkdir()
+        self.cache_dir = Path(self.temp_dir) / "cache"
+        self.template = str(Path(self.temp_dir) / "out" / "shapes-{version}.ttl")
+        patchers = [
+            unittest.mock.patch('src.main.ONTOLOGY_BASE_PATH', self.base_path),
+            unittest.mock.patch('src.batch.ONTOLOGY_BASE_PATH', self.base_path),
+        ]
+        for patcher in patchers:
+            patcher.start()
+            self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def write_version(self, version, class_name):
+        path = self.base_path / version / "skg-o.ttl"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(ONTOLOGY % class_name)
+
+    def test_list_and_resolve_versions(self):
+        self.assertEqual(list_versions(), ["1.0.0", "1.0.1", "current"])
+        self.assertEqual(resolve_versions("all"), ["1.0.0", "1.0.1", "current"])
+        self.assertEqual(resolve_versions("1.0.1,current"), ["1.0.1", "current"])
+        with self.assertRaises(ValueError):
+            resolve_versions("1.0.0,9.9.9")
+
+    def test_output_template_is_required(self):
+        with self.assertRaises(ValueError):
+            output_path_for("shapes.ttl", "1.0.0")
+
+    def test_state_is_saved_atomically(self):
+        state = BatchState(self.cache_dir / STATE_FILE)
+        state.record(self.template, "key")
+        state.save()
+
+        state.record(self.template, "other")
+        with unittest.mock.patch('json.dump', side_effect=OSError("disk full")), self.assertRaises(OSError):
+            state.save()
+        self.assertEqual([p.name for p in self.cache_dir.iterdir()], [STATE_FILE])
+        self.assertEqual(BatchState(state.path).outputs, {str(Path(self.template).resolve()): "key"})
+
+    def test_run_batch_skips_unchanged_versions(self):
+        status = run_batch(["1.0.0", "1.0.1", "current"], self.template, cache_dir=self.cache_dir, workers=2)
+        self.assertEqual(set(status.values()), {"extracted"})
+
+        SH = Namespace("http://www.w3.org/ns/shacl#")
+        for version in status:
+            g = Graph()
+            g.parse(output_path_for(self.template, version), format='turtle')
+            shape = g.value(predicate=RDF.type, object=SH.NodeShape)
+            self.assertTrue(str(shape).endswith("Class" + version.replace(".", "") + "Shape"))
+
+        self.write_version("1.0.1", "Changed")
+        status = run_batch(["1.0.0", "1.0.1", "current"], self.template, cache_dir=self.cache_dir)
+        self.assertEqual(status, {"1.0.0": "unchanged", "1.0.1": "extracted", "current": "unchanged"})
+
+        status = run_batch(["1.0.0"], self.template, use_cache=False)
+        self.assertEqual(status, {"1.0.0": "extracted"})
+
+    def test_main_batch_mode(self):
+        test_args = ['prog_name', '--cache-dir', str(self.cache_dir), '--version', 'all', self.template]
+        with unittest.mock.patch('sys.argv', test_args):
+            from src.main import main
+            main()
+
+        for version in ["1.0.0", "1.0.1", "current"]:
+            self.assertTrue(Path(output_path_for(self.template, version)).exists())
+
+if __name__ == '__main__':
+    unittest.main()
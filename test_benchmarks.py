@@ -0,0 +1,48 @@
+import io
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+from benchmarks.suite import compare, run_size
+from benchmarks.synthetic import synthetic_descriptions, write_jsonld, write_ontology
+from src.emit import SH
+from src.main import create_shacl_shapes
+from src.validate import JSONLinesReport, validate_files
+
+class TestBenchmarkSuite(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp(dir="."))
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_synthetic_ontology_and_data(self):
+        ontology = self.temp_dir / "onto.ttl"
+        data = self.temp_dir / "data.json"
+        write_ontology(ontology, 8, 6)
+        write_jsonld(data, 40, 8, 6, invalid_every=10)
+
+        shapes = create_shacl_shapes(ontology)
+        expected = sum(desc.count("\n- ") for _, desc in synthetic_descriptions(8, 6))
+        self.assertEqual(expected, 8 * 6)
+        self.assertEqual(len(list(shapes.subjects(SH.path, None))), expected)
+
+        summary = validate_files([str(data)], shapes, JSONLinesReport(io.StringIO()), workers=1)
+        self.assertEqual(summary["items"], 40)
+        # Entities 0, 10, 20 and 30 miss a required value
+        self.assertEqual(summary["violations"], 4)
+
+    def test_run_size_and_compare(self):
+        phases = run_size(self.temp_dir, 5, 4, 20, memory=False)
+        self.assertEqual(set(phases), {"parse", "extract", "emit", "serialize", "stream", "validate"})
+        results = {"5x4": phases}
+        self.assertEqual(compare(results, results, 0.25), [])
+
+        slower = {"5x4": {"validate": {"seconds": 10.0, "peak_mib": 50.0}}}
+        baseline = {"5x4": {"validate": {"seconds": 1.0, "peak_mib": 10.0}}}
+        self.assertEqual(len(compare(slower, baseline, 0.25)), 2)
+        self.assertEqual(compare(baseline, slower, 0.25), [])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,96 @@
+import json
+import shutil
+import tempfile
+import unittest
+import unittest.mock
+from pathlib import Path
+
+from rdflib import Graph
+from rdflib.compare import isomorphic
+from src.bundle import BinaryBundle, bundle_tables, encode_binary, read_bundle
+from src.emit import emit_graph
+from src.ir import CLASS, DATATYPE, LITERAL
+from src.main import create_shacl_shapes, extract_ir, main
+
+ONTOLOGY = '''
+@prefix owl: <http://www.w3.org/2002/07/owl#> .
+@prefix dc: <http://purl.org/dc/elements/1.1/> .
+@prefix ex: <http://example.org/> .
+@prefix xsd: <http://www.w3.org/2001/XMLSchema#> .
+@prefix rdfs: <http://www.w3.org/2000/01/rdf-schema#> .
+
+ex:Work a owl:Class ;
+    dc:description """The properties that can be used with this class are:
+- ex:title -[1]-> rdfs:Literal
+- ex:year -[0..1]-> xsd:integer
+- ex:author -[1..N]-> ex:Agent
+- ex:subject -[N]-> ex:Agent
+""" .
+
+ex:Agent a owl:Class ;
+    dc:description """The properties that can be used with this class are:
+- ex:name -[1]-> xsd:string
+""" .
+
+ex:Empty a owl:Class ;
+    dc:description "No properties." .
+'''
+
+class TestShapesBundle(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp(dir="."))
+        self.ontology = self.temp_dir / "onto.ttl"
+        self.ontology.write_text(ONTOLOGY, encoding='utf-8')
+        self.ir = extract_ir(Graph().parse(self.ontology, format='turtle'))
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_round_trip(self):
+        for format in ('bundle', 'bundle-json'):
+            output = self.temp_dir / f"shapes.{format}"
+            with unittest.mock.patch('sys.argv', ['main.py', '--input', str(self.ontology),
+                                                  '--format', format, str(output)]):
+                main()
+            ir = read_bundle(output)
+            self.assertEqual(ir.shapes, self.ir.shapes)
+            self.assertEqual(ir.namespaces, [(p, str(ns)) for p, ns in self.ir.namespaces])
+            self.assertEqual(read_bundle(output.read_bytes()).shapes, self.ir.shapes)
+            self.assertTrue(isomorphic(emit_graph(ir), create_shacl_shapes(self.ontology)))
+
+    def test_tables(self):
+        tables = json.loads(json.dumps(bundle_tables(self.ir)))
+        strings = tables["strings"]
+        shapes = {strings[shape[1]]: shape for shape in tables["shapes"]}
+        iri, target_class, first, count = shapes["http://example.org/Work"]
+        self.assertEqual(strings[iri], "http://example.org/WorkShape")
+        properties = tables["properties"][first:first + count]
+        self.assertEqual([strings[p[0]] for p in properties],
+                         ["http://example.org/" + name for name in ("title", "year", "author", "subject")])
+        self.assertEqual([p[1:4] for p in properties],
+                         [[1, 1, 0], [0, 1, 1], [1, None, 2], [None, None, 2]])
+        self.assertIsNone(properties[0][4])
+        # IRIs are interned
+        self.assertEqual(properties[2][4], properties[3][4])
+        self.assertEqual(len(strings), len(set(strings)))
+
+    def test_binary_random_access(self):
+        data = encode_binary(bundle_tables(self.ir))
+        bundle = BinaryBundle(data)
+        self.assertEqual(len(bundle), 3)
+        self.assertEqual(bundle.extractor, "0.1.0")
+        for index, shape in enumerate(self.ir.shapes):
+            self.assertEqual(bundle.shape(index), shape)
+            if shape.target_class == "http://example.org/Work":
+                self.assertEqual([p.kind for p in bundle.shape(index).properties],
+                                 [LITERAL, DATATYPE, CLASS, CLASS])
+
+        with self.assertRaises(ValueError):
+            BinaryBundle(b"XXXX" + data[4:])
+        with self.assertRaises(ValueError):
+            BinaryBundle(data[:-1])
+        with self.assertRaises(ValueError):
+            BinaryBundle(data[:4] + b"\x02\x00" + data[6:])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,127 @@
+import json
+import os
+import pickle
+import shutil
+import tempfile
+import unittest
+import unittest.mock
+from pathlib import Path
+
+from rdflib import Graph, Namespace
+from rdflib.compare import isomorphic
+from rdflib.namespace import RDF
+from src.cache import DiskCache, ShapesCache, ValidationCache
+from src.main import create_shacl_shapes, load_or_create_shapes
+
+TEST_ONTOLOGY = '''
+@prefix owl: <http://www.w3.org/2002/07/owl#> .
+@prefix dc: <http://purl.org/dc/elements/1.1/> .
+@prefix ex: <http://example.org/> .
+@prefix xsd: <http://www.w3.org/2001/XMLSchema#> .
+@prefix rdfs: <http://www.w3.org/2000/01/rdf-schema#> .
+
+ex:TestClass a owl:Class ;
+    dc:description """The properties that can be used with this class are:
+- ex:stringProp -[1]-> xsd:string
+- ex:objectProp -[1..*]-> ex:OtherClass
+- ex:literalProp -[0..1]-> rdfs:Literal
+""" .
+
+ex:OtherClass a owl:Class .
+'''
+
+class TestShapesCache(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp(dir=".")
+        self.cache_dir = Path(self.temp_dir) / "cache"
+        self.input_file = Path(self.temp_dir) / "test.ttl"
+        with open(self.input_file, 'w', encoding='utf-8') as f:
+            f.write(TEST_ONTOLOGY)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_miss_then_hit(self):
+        cache = ShapesCache(self.cache_dir)
+        first = load_or_create_shapes(self.input_file, cache)
+
+        with unittest.mock.patch('src.main.create_shacl_shapes') as create:
+            second = load_or_create_shapes(self.input_file, cache)
+            create.assert_not_called()
+
+        self.assertTrue(isomorphic(first, second))
+        SH = Namespace("http://www.w3.org/ns/shacl#")
+        self.assertEqual(str(dict(second.namespaces())["sh"]), str(SH))
+
+    def test_key_follows_content(self):
+        cache = ShapesCache(self.cache_dir)
+        key = cache.key_for(self.input_file)
+        with open(self.input_file, 'a', encoding='utf-8') as f:
+            f.write("\nex:Another a owl:Class .\n")
+        self.assertNotEqual(key, cache.key_for(self.input_file))
+
+    def test_key_follows_extractor_version(self):
+        cache = ShapesCache(self.cache_dir)
+        key = cache.key_for(self.input_file)
+        with unittest.mock.patch('src.cache.__version__', '999.0.0'):
+            self.assertNotEqual(key, cache.key_for(self.input_file))
+        with unittest.mock.patch('src.cache.SHAPES_VERSION', 999):
+            self.assertNotEqual(key, cache.key_for(self.input_file))
+
+    def test_entries_are_not_pickled(self):
+        cache = ShapesCache(self.cache_dir)
+        key = cache.key_for(self.input_file)
+        cache.put_shapes(key, create_shacl_shapes(self.input_file))
+        header, _, triples = cache.get(key).partition(b"\n")
+        self.assertIn("sh", dict(json.loads(header)["namespaces"]))
+        self.assertTrue(isomorphic(Graph().parse(data=triples.decode('utf-8'), format='nt'),
+                                   create_shacl_shapes(self.input_file)))
+
+        # A pickle planted in the cache is never loaded
+        cache.set(key, pickle.dumps({"format": 2, "namespaces": [], "triples": []}))
+        self.assertIsNone(cache.get_shapes(key))
+        results = ValidationCache(self.cache_dir)
+        results.put_results(key, [(1, False, [{"focusNode": "http://example.org/a"}], "")])
+        self.assertEqual(results.get_results(key), [[1, False, [{"focusNode": "http://example.org/a"}], ""]])
+        results.set(key, pickle.dumps({"format": 2, "chunks": []}))
+        self.assertIsNone(results.get_results(key))
+
+    def test_corrupt_entry_is_a_miss(self):
+        cache = ShapesCache(self.cache_dir)
+        key = cache.key_for(self.input_file)
+        cache.set(key, b"not a snapshot")
+        self.assertIsNone(cache.get_shapes(key))
+        self.assertFalse(cache.path_for(key).exists())
+
+    def test_size_bounded_eviction(self):
+        cache = DiskCache(self.cache_dir, max_size=250)
+        for i in range(3):
+            cache.set(f"{i:02d}key", b"x" * 100)
+            os.utime(cache.path_for(f"{i:02d}key"), (i, i))
+        self.assertIsNone(cache.get("00key"))
+        self.assertIsNotNone(cache.get("01key"))
+        self.assertIsNotNone(cache.get("02key"))
+        self.assertLessEqual(cache.size(), 250)
+
+    def test_main_cache_options(self):
+        output_file = Path(self.temp_dir) / "out.ttl"
+
+        test_args = ['prog_name', '--no-cache', '--cache-dir', str(self.cache_dir),
+                     '--input', str(self.input_file), str(output_file)]
+        with unittest.mock.patch('sys.argv', test_args):
+            from src.main import main
+            main()
+        self.assertEqual(ShapesCache(self.cache_dir).size(), 0)
+
+        test_args = ['prog_name', '--cache-dir', str(self.cache_dir),
+                     '--input', str(self.input_file), str(output_file)]
+        with unittest.mock.patch('sys.argv', test_args):
+            main()
+        self.assertGreater(ShapesCache(self.cache_dir).size(), 0)
+
+        g = Graph()
+        g.parse(output_file, format='turtle')
+        self.assertTrue(isomorphic(g, create_shacl_shapes(self.input_file)))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,178 @@
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+from pyshacl import validate
+from rdflib import Graph, Literal, Namespace, URIRef
+from rdflib.namespace import RDF
+from src.compiler import (DATATYPE, MAX_COUNT, MIN_COUNT, NODE_KIND, OR, compile_shapes,
+                          results_graph, violations_from_results)
+from src.main import create_shacl_shapes
+
+ONTOLOGY = '''
+@prefix owl: <http://www.w3.org/2002/07/owl#> .
+@prefix dc: <http://purl.org/dc/elements/1.1/> .
+@prefix ex: <http://example.org/> .
+@prefix xsd: <http://www.w3.org/2001/XMLSchema#> .
+@prefix rdfs: <http://www.w3.org/2000/01/rdf-schema#> .
+
+ex:Work a owl:Class ;
+    dc:description """The properties that can be used with this class are:
+- ex:title -[1]-> rdfs:Literal
+- ex:code -[0..1]-> xsd:string
+- ex:amount -[0..1]-> xsd:float
+- ex:pages -[0..N]-> xsd:integer
+- ex:author -[1..N]-> ex:Agent
+""" .
+'''
+
+DATA = '''
+@prefix ex: <http://example.org/> .
+@prefix xsd: <http://www.w3.org/2001/XMLSchema#> .
+@prefix rdfs: <http://www.w3.org/2000/01/rdf-schema#> .
+
+ex:ok a ex:Work ; ex:title "Title" ; ex:code "A1" ; ex:amount "1.5"^^xsd:float ;
+    ex:pages 10, 12 ; ex:author ex:alice, [ a ex:Agent ] .
+ex:bad1 a ex:Work ; ex:title "One", "Two" ; ex:code "A1"@en ; ex:amount "abc"^^xsd:float ;
+    ex:pages "ten" ; ex:author "Alice" .
+ex:bad2 a ex:Work ; ex:title ex:notALiteral ; ex:code 7 ; ex:amount 1.5 .
+ex:Article rdfs:subClassOf ex:Work .
+ex:bad3 a ex:Article ; ex:author ex:bob .
+ex:untyped ex:title "One", "Two" .
+'''
+
+EX = Namespace("http://example.org/")
+
+def violation_keys(violations):
+    return {v.key() for v in violations}
+
+class TestCompiledShapes(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp(dir="."))
+        ontology = self.temp_dir / "onto.ttl"
+        with open(ontology, 'w', encoding='utf-8') as f:
+            f.write(ONTOLOGY)
+        self.shapes = create_shacl_shapes(ontology)
+        self.data = Graph().parse(data=DATA, format='turtle')
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def pyshacl_keys(self, shapes):
+        conforms, results, _ = validate(data_graph=self.data, shacl_graph=shapes, debug=False)
+        return conforms, violation_keys(violations_from_results(results))
+
+    def test_same_violations_as_pyshacl(self):
+        compiled = compile_shapes(self.shapes)
+        self.assertIsNone(compiled.fallback)
+
+        expected_conforms, expected = self.pyshacl_keys(self.shapes)
+        conforms, violations = compiled.validate(self.data)
+        self.assertEqual(conforms, expected_conforms)
+        self.assertEqual(violation_keys(violations), expected)
+
+        components = {(focus, component) for focus, _, component, _ in expected}
+        self.assertEqual(components, {
+            (EX.bad1, MAX_COUNT), (EX.bad1, DATATYPE), (EX.bad1, OR),
+            (EX.bad2, NODE_KIND), (EX.bad2, DATATYPE), (EX.bad2, MIN_COUNT),
+            (EX.bad3, MIN_COUNT),
+        })
+
+    def test_triple_stream(self):
+        compiled = compile_shapes(self.shapes)
+        conforms, violations = compiled.validate_triples(iter(self.data))
+        self.assertFalse(conforms)
+        self.assertEqual(violation_keys(violations), self.pyshacl_keys(self.shapes)[1])
+
+    def test_conforming_data(self):
+        data = Graph().parse(data=DATA.split("ex:bad1")[0], format='turtle')
+        self.assertEqual(compile_shapes(self.shapes).validate(data), (True, []))
+
+    def test_unsupported_shapes_fall_back_to_pyshacl(self):
+        SH = Namespace("http://www.w3.org/ns/shacl#")
+        shapes = Graph()
+        for triple in self.shapes:
+            shapes.add(triple)
+        for prop in shapes.objects(URIRef(EX.WorkShape), SH.property):
+            if shapes.value(prop, SH.path) == EX.code:
+                shapes.add((prop, SH.pattern, Literal("^[A-Z][0-9]$")))
+
+        compiled = compile_shapes(shapes)
+        self.assertIsNotNone(compiled.fallback)
+        self.assertEqual(compiled.checks, {})
+
+        data = Graph().parse(data=DATA + 'ex:bad4 a ex:Work ; ex:title "T" ; ex:code "zz" ; ex:author ex:x .',
+                             format='turtle')
+        self.data = data
+        conforms, violations = compiled.validate(data)
+        self.assertEqual((conforms, violation_keys(violations)), self.pyshacl_keys(shapes))
+        self.assertIn(EX.bad4, {v.focus for v in violations})
+
+    def test_untyped_shapes_are_not_dropped(self):
+        SH = Namespace("http://www.w3.org/ns/shacl#")
+        shapes = Graph()
+        for triple in self.shapes:
+            if triple != (EX.WorkShape, RDF.type, SH.NodeShape):
+                shapes.add(triple)
+        compiled = compile_shapes(shapes)
+        self.assertEqual(set(compiled.checks), {EX.Work})
+        self.assertEqual(violation_keys(compiled.validate(self.data)[1]), self.pyshacl_keys(self.shapes)[1])
+
+        # A property shape with a target, and a shape that is also a class
+        shapes.parse(data='''
+            @prefix sh: <http://www.w3.org/ns/shacl#> .
+            @prefix ex: <http://example.org/> .
+            @prefix rdfs: <http://www.w3.org/2000/01/rdf-schema#> .
+            ex:TitleShape sh:targetNode ex:untyped ; sh:path ex:title ; sh:maxCount 1 .
+            ex:Agent a sh:NodeShape, rdfs:Class ; sh:targetClass ex:Person ;
+                sh:property [ sh:path ex:name ; sh:minCount 1 ] .
+        ''', format='turtle')
+        self.data.add((EX.alice, RDF.type, EX.Agent))
+        compiled = compile_shapes(shapes)
+        self.assertIsNotNone(compiled.fallback)
+        conforms, violations = compiled.validate(self.data)
+        self.assertEqual((conforms, violation_keys(violations)), self.pyshacl_keys(shapes))
+        self.assertTrue({EX.untyped, EX.alice} <= {v.focus for v in violations})
+
+    def test_ontology_hierarchy(self):
+        hierarchy = Graph().parse(data='''
+            @prefix ex: <http://example.org/> .
+            @prefix rdfs: <http://www.w3.org/2000/01/rdf-schema#> .
+            ex:Preprint rdfs:subClassOf ex:Report .
+            ex:Report rdfs:subClassOf ex:Work .
+        ''', format='turtle')
+        data = Graph().parse(data=DATA + '''
+            ex:bad4 a ex:Preprint ; ex:title "T" .
+            ex:bad5 a ex:Work, ex:Report ; ex:author ex:x .
+        ''', format='turtle')
+        compiled = compile_shapes(self.shapes, hierarchy)
+        self.assertEqual(compiled.targets[EX.Preprint], {EX.Work})
+
+        conforms, results, _ = validate(data_graph=data, shacl_graph=self.shapes, ont_graph=hierarchy, debug=False)
+        expected = violation_keys(violations_from_results(results))
+        conforms, violations = compiled.validate(data)
+        self.assertEqual(violation_keys(violations), expected)
+        self.assertEqual(len(violations), len(expected))
+        self.assertEqual(violation_keys(compiled.validate_triples(iter(data))[1]), expected)
+        self.assertTrue({EX.bad4, EX.bad5} <= {v.focus for v in violations})
+        # Without the hierarchy, only the subclass statement of the data applies
+        self.assertNotIn(EX.bad4, {v.focus for v in compile_shapes(self.shapes).validate(data)[1]})
+
+    def test_untargeted_entities(self):
+        # Mostly entities no shape targets: their values are not scanned
+        data = Graph().parse(data=DATA, format='turtle')
+        for i in range(50):
+            data.add((EX[f"other{i}"], RDF.type, EX.Other))
+            data.add((EX[f"other{i}"], EX.title, Literal(i)))
+        conforms, violations = compile_shapes(self.shapes).validate(data)
+        self.data = data
+        self.assertEqual((conforms, violation_keys(violations)), self.pyshacl_keys(self.shapes))
+
+    def test_results_graph(self):
+        _, violations = compile_shapes(self.shapes).validate(self.data)
+        report = results_graph(violations)
+        self.assertEqual(violation_keys(violations_from_results(report)), violation_keys(violations))
+
+if __name__ == '__main__':
+    unittest.main()
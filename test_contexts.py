@@ -0,0 +1,95 @@
+import io
+import json
+import shutil
+import tempfile
+import unittest
+import unittest.mock
+from pathlib import Path
+
+from src.contexts import ContextResolver
+from src.main import create_shacl_shapes
+from src.validate import JSONLinesReport, validate_files
+
+ONTOLOGY = '''
+@prefix owl: <http://www.w3.org/2002/07/owl#> .
+@prefix dc: <http://purl.org/dc/elements/1.1/> .
+@prefix ex: <http://example.org/> .
+@prefix rdfs: <http://www.w3.org/2000/01/rdf-schema#> .
+
+ex:Work a owl:Class ;
+    dc:description """The properties that can be used with this class are:
+- ex:title -[1]-> rdfs:Literal
+""" .
+'''
+
+CONTEXT_URL = "https://w3id.org/skg-if/context/1.0.0/skg-if.json"
+
+class TestContextResolver(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp(dir="."))
+        self.base_path = self.temp_dir / "context" / "ver"
+        version = self.base_path / "1.0.0"
+        version.mkdir(parents=True)
+        # The main context imports a sibling by relative reference
+        with open(version / "skg-if.json", 'w', encoding='utf-8') as f:
+            json.dump({"@context": ["terms.json", {"title": "ex:title"}]}, f)
+        with open(version / "terms.json", 'w', encoding='utf-8') as f:
+            json.dump({"@context": {"ex": "http://example.org/",
+                                    "Work": {"@id": "ex:Work", "@context": {"@vocab": "http://example.org/"}}}}, f)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_local_contexts_are_inlined_once(self):
+        resolver = ContextResolver(self.base_path, offline=True)
+        with unittest.mock.patch('urllib.request.urlopen') as urlopen:
+            for _ in range(3):
+                context = resolver.resolve([CONTEXT_URL, {"@base": "https://example.org/"}])
+        urlopen.assert_not_called()
+        self.assertEqual(resolver.local, 2)
+        self.assertEqual(context[0]["ex"], "http://example.org/")
+        self.assertEqual(context[0]["Work"]["@context"], {"@vocab": "http://example.org/"})
+        self.assertEqual(context[1:], [{"title": "ex:title"}, {"@base": "https://example.org/"}])
+        # Inline contexts are returned as they are
+        self.assertEqual(resolver.resolve({"title": "ex:title"}), {"title": "ex:title"})
+
+    def test_offline_mode_fails_on_unknown_contexts(self):
+        resolver = ContextResolver(self.base_path, offline=True)
+        for url in ("https://example.org/context.json", "https://w3id.org/skg-if/context/9.9.9/skg-if.json"):
+            with self.subTest(url=url), self.assertRaises(ValueError):
+                resolver.resolve(url)
+
+    def test_remote_contexts_are_fetched_once(self):
+        resolver = ContextResolver(self.base_path)
+        response = lambda *args, **kwargs: io.BytesIO(b'{"@context": {"name": "http://example.org/name"}}')
+        with unittest.mock.patch('urllib.request.urlopen', side_effect=response) as urlopen:
+            for _ in range(2):
+                context = resolver.resolve("https://example.org/context.json")
+        self.assertEqual(urlopen.call_count, 1)
+        self.assertEqual(context, {"name": "http://example.org/name"})
+
+    def test_validation_resolves_contexts(self):
+        ontology = self.temp_dir / "onto.ttl"
+        ontology.write_text(ONTOLOGY, encoding='utf-8')
+        data = self.temp_dir / "data.json"
+        with open(data, 'w', encoding='utf-8') as f:
+            json.dump({"@context": CONTEXT_URL,
+                       "@graph": [{"@id": "ex:w1", "@type": "Work", "title": "A"}, {"@id": "ex:w2", "@type": "Work"}]}, f)
+
+        out = io.StringIO()
+        with unittest.mock.patch('urllib.request.urlopen') as urlopen:
+            summary = validate_files([str(data)], create_shacl_shapes(ontology), JSONLinesReport(out), workers=1,
+                                     contexts=ContextResolver(self.base_path, offline=True))
+        urlopen.assert_not_called()
+        self.assertEqual((summary["items"], summary["violations"]), (2, 1))
+        self.assertEqual(json.loads(out.getvalue().splitlines()[0])["focusNode"], "http://example.org/w2")
+
+        with unittest.mock.patch('sys.argv', ['validate', '--input', str(ontology), '--no-cache', '--workers', '1',
+                                              '--offline', '--context-dir', str(self.temp_dir), str(data)]), \
+                unittest.mock.patch('sys.stderr'), self.assertRaises(SystemExit) as cm:
+            from src.validate import main
+            main()
+        self.assertEqual(cm.exception.code, 2)
+
+if __name__ == '__main__':
+    unittest.main()
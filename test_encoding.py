@@ -0,0 +1,126 @@
+import codecs
+import os
+import shutil
+import tempfile
+import unittest
+import unittest.mock
+from pathlib import Path
+
+from src.encoding import (CLEAN, CONVERTED, ERROR, MISSING, SKIPPED, WOULD_CONVERT, detect_encoding, iter_paths,
+                          main, normalize_file, normalize_files)
+
+TEXT = "@prefix ex: <http://example.org/> .\nex:Café ex:label \"naïve — ünïcode\" .\r\n" * 50
+
+class TestEncoding(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp(dir="."))
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def write(self, name: str, data: bytes) -> Path:
+        path = self.temp_dir / name
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(data)
+        return path
+
+    def test_detect_encoding(self):
+        self.assertEqual(detect_encoding(codecs.BOM_UTF8 + b"abc"), ('utf-8', 3))
+        self.assertEqual(detect_encoding(codecs.BOM_UTF16_LE + "abc".encode('utf-16-le')), ('utf-16-le', 2))
+        self.assertEqual(detect_encoding(codecs.BOM_UTF32_LE + "abc".encode('utf-32-le')), ('utf-32-le', 4))
+        self.assertEqual(detect_encoding("abcd".encode('utf-16-be')), ('utf-16-be', 0))
+        self.assertEqual(detect_encoding("é".encode('utf-8')[:1]), ('utf-8', 0))
+        self.assertEqual(detect_encoding("é".encode('utf-8')[:1], complete=True), ('iso-8859-1', 0))
+        with self.assertRaises(ValueError):
+            detect_encoding(b"\x89PNG\r\n\x1a\n\0\0\0\rIHDR\x01\x02")
+
+    def test_normalize_file(self):
+        for encoding, data in (('utf-8', codecs.BOM_UTF8 + TEXT.encode('utf-8')),
+                               ('utf-16-le', codecs.BOM_UTF16_LE + TEXT.encode('utf-16-le')),
+                               ('utf-16-be', TEXT.encode('utf-16-be')),
+                               ('iso-8859-1', TEXT.replace("—", "-").encode('iso-8859-1'))):
+            with self.subTest(encoding=encoding):
+                path = self.write(f"{encoding}.ttl", data)
+                os.chmod(path, 0o640)
+                # Chunks smaller than a character
+                result = normalize_file(str(path), dry_run=True, chunk_size=3)
+                self.assertEqual((result.status, result.encoding), (WOULD_CONVERT, encoding))
+                self.assertEqual(path.read_bytes(), data)
+                result = normalize_file(str(path), chunk_size=3)
+                self.assertEqual((result.status, result.encoding), (CONVERTED, encoding))
+                expected = TEXT if encoding != 'iso-8859-1' else TEXT.replace("—", "-")
+                self.assertEqual(path.read_bytes(), expected.encode('utf-8'))
+                self.assertEqual(os.stat(path).st_mode & 0o777, 0o640)
+                self.assertEqual(normalize_file(str(path)).status, CLEAN)
+        self.assertEqual([p.name for p in self.temp_dir.iterdir() if p.name.startswith(".tmp-")], [])
+
+    def test_clean_files_are_not_rewritten(self):
+        path = self.write("clean.ttl", TEXT.encode('utf-8'))
+        os.utime(path, (0, 0))
+        self.assertEqual(normalize_file(str(path), chunk_size=7).status, CLEAN)
+        self.assertEqual(os.stat(path).st_mtime, 0)
+
+    @unittest.skipUnless(hasattr(os, 'symlink') and os.name == 'posix', "needs symbolic links")
+    def test_symbolic_links_are_written_through(self):
+        data = codecs.BOM_UTF8 + TEXT.encode('utf-8')
+        real = self.write("real.ttl", data)
+        link = self.temp_dir / "sub" / "link.ttl"
+        link.parent.mkdir()
+        os.symlink(os.path.join("..", "real.ttl"), link)
+        self.assertEqual(normalize_file(str(link)).status, CONVERTED)
+        self.assertTrue(link.is_symlink())
+        self.assertEqual(real.read_bytes(), TEXT.encode('utf-8'))
+        self.assertEqual([p.name for p in link.parent.iterdir()], ["link.ttl"])
+
+    def test_invalid_utf8_past_the_prefix(self):
+        data = b"a" * (100 * 1024) + "é".encode('iso-8859-1')
+        path = self.write("late.ttl", data)
+        result = normalize_file(str(path))
+        self.assertEqual((result.status, result.encoding), (CONVERTED, 'iso-8859-1'))
+        self.assertEqual(path.read_bytes(), data[:-1] + "é".encode('utf-8'))
+
+    def test_errors_leave_files_unchanged(self):
+        data = codecs.BOM_UTF16_LE + b"a\0b"
+        path = self.write("odd.ttl", data)
+        self.assertEqual(normalize_file(str(path)).status, ERROR)
+        self.assertEqual(path.read_bytes(), data)
+        self.assertEqual(normalize_file(str(self.temp_dir / "missing.ttl")).status, MISSING)
+        self.assertEqual(normalize_file(str(self.write("image.ttl", b"\x89PNG\0\x01\0\0\x02"))).status, SKIPPED)
+
+    def test_paths(self):
+        a = self.write("a.ttl", b"a")
+        b = self.write("sub/b.json", b"b")
+        self.write("sub/c.bin", b"c")
+        self.write(".git/d.ttl", b"d")
+        self.assertEqual(list(iter_paths([str(self.temp_dir)])), [str(a), str(b)])
+        self.assertEqual(list(iter_paths([str(self.temp_dir / "**" / "*.json"), str(b)])), [str(b)])
+        self.assertEqual(list(iter_paths([str(self.temp_dir)], patterns=['*.bin'])),
+                         [str(self.temp_dir / "sub" / "c.bin")])
+
+    def test_parallel(self):
+        for n in range(6):
+            self.write(f"{n}.ttl", codecs.BOM_UTF16_LE + f"{n} {TEXT}".encode('utf-16-le') if n % 2
+                       else f"{n} {TEXT}".encode('utf-8'))
+        results = list(normalize_files([str(self.temp_dir)], workers=2))
+        self.assertEqual([Path(r.path).name for r in results], [f"{n}.ttl" for n in range(6)])
+        self.assertEqual([r.status for r in results], [CLEAN, CONVERTED] * 3)
+        for n in range(6):
+            self.assertEqual((self.temp_dir / f"{n}.ttl").read_bytes(), f"{n} {TEXT}".encode('utf-8'))
+
+    def test_main(self):
+        data = codecs.BOM_UTF8 + TEXT.encode('utf-8')
+        path = self.write("a.ttl", data)
+        with unittest.mock.patch('sys.stdout'), unittest.mock.patch('sys.stderr'):
+            with self.assertRaises(SystemExit) as cm:
+                main(['--dry-run', '--workers', '1', str(self.temp_dir)])
+            self.assertEqual((cm.exception.code, path.read_bytes()), (0, data))
+            # Missing files are only reported
+            with self.assertRaises(SystemExit) as cm:
+                main([str(path), str(self.temp_dir / "missing.ttl")])
+            self.assertEqual((cm.exception.code, path.read_bytes()), (0, TEXT.encode('utf-8')))
+            with self.assertRaises(SystemExit) as cm:
+                main([str(self.write("odd.ttl", codecs.BOM_UTF16_LE + b"a\0b"))])
+        self.assertEqual(cm.exception.code, 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,124 @@
+import json
+import os
+import shutil
+import tempfile
+import time
+import unittest
+import unittest.mock
+from pathlib import Path
+
+from rdflib import Graph
+from rdflib.compare import isomorphic
+from src.incremental import ShapesDiff, state_path_for, update_shapes, watch, watch_shapes
+from src.main import create_shacl_shapes
+
+HEADER = '''
+@prefix owl: <http://www.w3.org/2002/07/owl#> .
+@prefix dc: <http://purl.org/dc/elements/1.1/> .
+@prefix ex: <http://example.org/> .
+@prefix xsd: <http://www.w3.org/2001/XMLSchema#> .
+'''
+
+CLASS = '''
+ex:%s a owl:Class ;
+    dc:description """The properties that can be used with this class are:
+- ex:%s -[1]-> xsd:string
+""" .
+'''
+
+class TestIncrementalExtraction(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp(dir=".")
+        self.input = str(Path(self.temp_dir) / "onto.ttl")
+        self.output = str(Path(self.temp_dir) / "shapes.ttl")
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def write_ontology(self, classes, header=HEADER):
+        with open(self.input, 'w', encoding='utf-8') as f:
+            f.write(header + ''.join(CLASS % c for c in classes))
+
+    def assert_output_matches_full_extraction(self):
+        output = Graph()
+        output.parse(self.output, format='turtle')
+        self.assertTrue(isomorphic(output, create_shacl_shapes(self.input)))
+
+    def test_only_changed_classes_are_reextracted(self):
+        self.write_ontology([("A", "a"), ("B", "b"), ("C", "c")])
+        diff = update_shapes(self.input, self.output)
+        self.assertTrue(diff.full)
+        self.assertEqual(len(diff.added), 3)
+        self.assertTrue(state_path_for(self.output).exists())
+        self.assert_output_matches_full_extraction()
+
+        mtime = os.stat(self.output).st_mtime_ns
+        diff = update_shapes(self.input, self.output)
+        self.assertFalse(diff)
+        self.assertFalse(diff.full)
+        self.assertEqual(os.stat(self.output).st_mtime_ns, mtime)
+
+        self.write_ontology([("A", "a"), ("B", "renamed"), ("D", "d")])
+        diff = update_shapes(self.input, self.output)
+        self.assertEqual(diff.added, ["http://example.org/D"])
+        self.assertEqual(diff.changed, ["http://example.org/B"])
+        self.assertEqual(diff.removed, ["http://example.org/C"])
+        self.assertFalse(diff.full)
+        self.assert_output_matches_full_extraction()
+
+    def test_state_is_invalidated(self):
+        self.write_ontology([("A", "a")])
+        update_shapes(self.input, self.output)
+
+        # Different bindings may change how every description resolves
+        self.write_ontology([("A", "a")], HEADER + "@prefix other: <http://example.org/other#> .\n")
+        self.assertTrue(update_shapes(self.input, self.output).full)
+        self.assertTrue(update_shapes(self.input, self.output, format='nt').full)
+
+        # Changes of the extracted shapes invalidate the stored ones
+        self.assertFalse(update_shapes(self.input, self.output, format='nt').full)
+        with unittest.mock.patch('src.incremental.SHAPES_VERSION', 999):
+            self.assertTrue(update_shapes(self.input, self.output, format='nt').full)
+            self.assertFalse(update_shapes(self.input, self.output, format='nt').full)
+
+        os.remove(self.output)
+        self.assertTrue(update_shapes(self.input, self.output, format='nt').full)
+        self.assertTrue(os.path.exists(self.output))
+
+        with open(state_path_for(self.output), 'w', encoding='utf-8') as f:
+            f.write("not json")
+        self.assertTrue(update_shapes(self.input, self.output, format='nt').full)
+
+    def test_watch_debounces_changes(self):
+        path = Path(self.temp_dir) / "watched.txt"
+        path.write_text("0")
+        calls = []
+        deadline = time.monotonic() + 5
+        writes = iter(range(1, 4))
+
+        def stop():
+            # A burst of three quick writes, then wait for the single callback
+            for i in writes:
+                path.write_text(str(i) * i)
+                return False
+            return bool(calls) or time.monotonic() > deadline
+
+        watch([path], lambda: calls.append(path.read_text()), interval=0.01, debounce=0.1, stop=stop)
+        self.assertEqual(calls, ["333"])
+
+    def test_watch_shapes_survives_errors(self):
+        with open(self.input, 'w', encoding='utf-8') as f:
+            f.write("this is not turtle")
+        reports = []
+        with self.assertLogs('src.incremental', level='ERROR'):
+            watch_shapes(self.input, self.output, report=reports.append, stop=lambda: True)
+        self.assertEqual(reports, [])
+
+        self.write_ontology([("A", "a")])
+        watch_shapes(self.input, self.output, report=reports.append, stop=lambda: True)
+        self.assertEqual(len(reports), 1)
+        self.assertIsInstance(reports[0], ShapesDiff)
+        self.assertEqual(json.loads(json.dumps(reports[0].as_dict()))["added"], ["http://example.org/A"])
+
+if __name__ == '__main__':
+    unittest.main()
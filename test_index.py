@@ -0,0 +1,124 @@
+import io
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+import unittest
+import unittest.mock
+from pathlib import Path
+
+from rdflib import Graph
+from rdflib.compare import isomorphic
+from src.index import build_index, load_index, lookup, write_entry
+from src.main import create_shacl_shapes, main
+
+ONTOLOGY = '''
+@prefix owl: <http://www.w3.org/2002/07/owl#> .
+@prefix dc: <http://purl.org/dc/elements/1.1/> .
+@prefix ex: <http://example.org/> .
+@prefix xsd: <http://www.w3.org/2001/XMLSchema#> .
+
+ex:%s a owl:Class ;
+    dc:description """The properties that can be used with this class are:
+- ex:stringProp -[1]-> xsd:string
+- ex:objectProp -[0..N]-> ex:Other
+""" .
+'''
+
+REPO = Path(__file__).resolve().parent
+
+class TestShapesIndex(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp(dir=".")).resolve()
+        self.base_path = self.temp_dir / "data-model" / "ontology"
+        for version in ["1.0.0", "current"]:
+            path = self.base_path / version / "skg-o.ttl"
+            path.parent.mkdir(parents=True)
+            path.write_text(ONTOLOGY % ("Class" + version.replace(".", "")), encoding='utf-8')
+        self.index_path = self.temp_dir / "shapes.index.json"
+        patcher = unittest.mock.patch('src.main.ONTOLOGY_BASE_PATH', self.base_path)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        patcher = unittest.mock.patch('src.batch.ONTOLOGY_BASE_PATH', self.base_path)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def run_main(self, *args):
+        with unittest.mock.patch('sys.argv', ['main.py', '--index', str(self.index_path)] + list(args)):
+            main()
+
+    def ontology(self, version):
+        return self.base_path / version / "skg-o.ttl"
+
+    def test_index_entries_match_extraction(self):
+        index = build_index({"1.0.0": str(self.ontology("1.0.0"))}, self.index_path)
+        self.assertEqual(load_index(self.index_path), index)
+        entry = lookup(index, "1.0.0", self.ontology("1.0.0"))
+        out = io.StringIO()
+        write_entry(entry, out)
+        served = Graph().parse(data=out.getvalue(), format='turtle')
+        self.assertTrue(isomorphic(served, create_shacl_shapes(self.ontology("1.0.0"))))
+
+        self.assertIsNone(lookup(index, "2.0.0", self.ontology("2.0.0")))
+        # Once the ontology changes, its entry is stale
+        self.ontology("1.0.0").write_text(ONTOLOGY % "Changed", encoding='utf-8')
+        self.assertIsNone(lookup(index, "1.0.0", self.ontology("1.0.0")))
+
+    def test_invalid_index_is_ignored(self):
+        self.assertIsNone(load_index(self.index_path))
+        self.index_path.write_text("{not json", encoding='utf-8')
+        self.assertIsNone(load_index(self.index_path))
+        build_index({}, self.index_path)
+        self.assertIsNotNone(load_index(self.index_path))
+        with unittest.mock.patch('src.index.__version__', '999.0.0'), self.assertLogs('src.index', 'WARNING'):
+            self.assertIsNone(load_index(self.index_path))
+        # Changes of the extracted shapes invalidate the index
+        with unittest.mock.patch('src.index.SHAPES_VERSION', 999), self.assertLogs('src.index', 'WARNING'):
+            self.assertIsNone(load_index(self.index_path))
+
+    def test_cli_serves_versions_from_the_index(self):
+        self.run_main('--build-index')
+        self.assertEqual(sorted(load_index(self.index_path)["versions"]), ["1.0.0", "current"])
+
+        output = self.temp_dir / "shapes.ttl"
+        with unittest.mock.patch('src.main.load_or_create_shapes') as extract:
+            self.run_main('--version', '1.0.0', str(output))
+            self.run_main(str(output))
+        extract.assert_not_called()
+        served = Graph().parse(output, format='turtle')
+        self.assertTrue(isomorphic(served, create_shacl_shapes(self.ontology("current"))))
+
+        # An edited ontology is extracted again
+        self.ontology("current").write_text(ONTOLOGY % "Edited", encoding='utf-8')
+        self.run_main('--no-cache', str(output))
+        served = Graph().parse(output, format='turtle')
+        self.assertTrue(isomorphic(served, create_shacl_shapes(self.ontology("current"))))
+
+        # Versions that are not checked out are still served
+        shutil.rmtree(self.base_path / "1.0.0")
+        self.run_main('--version', '1.0.0', '--format', 'nt', str(output))
+        self.assertEqual(len(Graph().parse(output, format='nt')), 17)
+
+        stdout = io.StringIO()
+        with unittest.mock.patch('sys.stdout', stdout):
+            self.run_main('--list-versions')
+        self.assertEqual(stdout.getvalue().splitlines(), ["current (indexed)", "1.0.0 (indexed)"])
+
+    def test_startup_does_not_import_rdflib(self):
+        self.run_main('--build-index')
+        script = ("import sys\nfrom src.main import main\ntry:\n    main()\nexcept SystemExit:\n    pass\n"
+                  "print('rdflib' in sys.modules)")
+        env = dict(os.environ, PYTHONPATH=str(REPO))
+        for args in (['--help'], ['--list-versions'], ['--index', str(self.index_path), 'out.ttl']):
+            with self.subTest(args=args):
+                result = subprocess.run([sys.executable, '-c', script] + args, cwd=self.temp_dir, env=env,
+                                        capture_output=True, text=True)
+                self.assertEqual(result.returncode, 0, result.stderr)
+                self.assertEqual(result.stdout.splitlines()[-1], "False")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+import io
+import unittest
+import unittest.mock
+
+from rdflib import Namespace, URIRef
+from rdflib.namespace import RDF, XSD
+from src.emit import emit_graph
+from src.ir import (CLASS, DATATYPE, LITERAL, NodeShape, PropertyShape, build_ir,
+                    parse_cardinality, parse_description)
+from src.writer import write_shapes
+
+EX = "http://example.org/"
+PREFIXES = {
+    'ex': EX,
+    'xsd': str(XSD),
+    'rdfs': "http://www.w3.org/2000/01/rdf-schema#",
+}
+
+DESCRIPTION = """The properties that can be used with this class are:
+- ex:stringProp -[1]-> xsd:string
+- ex:intProp -[0..1]-> xsd:integer
+* ex:objectProp -[1..*]-> ex:OtherClass
+- ex:literalProp -[0..N]-> rdfs:Literal
+"""
+
+class TestShapeIR(unittest.TestCase):
+    def test_parse_cardinality(self):
+        self.assertEqual(parse_cardinality('1', None, None), (1, 1))
+        self.assertEqual(parse_cardinality('0', '..', '1'), (0, 1))
+        self.assertEqual(parse_cardinality('1', '..', '*'), (1, None))
+        self.assertEqual(parse_cardinality('0', '..', 'N'), (0, None))
+        self.assertEqual(parse_cardinality('N', None, None), (None, None))
+
+    def test_parse_description(self):
+        unparsed = []
+        shape = parse_description(EX + "TestClass", DESCRIPTION, PREFIXES, unparsed)
+
+        self.assertEqual(shape.iri, EX + "TestClassShape")
+        self.assertEqual(shape.target_class, EX + "TestClass")
+        self.assertEqual(shape.properties, [
+            PropertyShape(EX + "stringProp", 1, 1, DATATYPE, str(XSD.string)),
+            PropertyShape(EX + "intProp", 0, 1, DATATYPE, str(XSD.integer)),
+            PropertyShape(EX + "objectProp", 1, None, CLASS, EX + "OtherClass"),
+            PropertyShape(EX + "literalProp", 0, None, LITERAL, None),
+        ])
+        self.assertEqual(unparsed, [])
+
+    def test_unparsed_lines_are_reported(self):
+        description = DESCRIPTION + """- ex:broken -[one]-> xsd:string
+- unknown:prop -[1]-> xsd:string
+- ex:toUnknown -[1]-> unknown:Class
+"""
+        unparsed = []
+        shape = parse_description(EX + "TestClass", description, PREFIXES, unparsed)
+
+        self.assertEqual(len(shape.properties), 4)
+        self.assertEqual([u.line for u in unparsed], [
+            "ex:broken -[one]-> xsd:string",
+            "unknown:prop -[1]-> xsd:string",
+            "ex:toUnknown -[1]-> unknown:Class",
+        ])
+        self.assertIn("unknown prefix 'unknown'", unparsed[1].reason)
+
+    def test_leading_bullet_is_reported(self):
+        unparsed = []
+        shape = parse_description(EX + "TestClass", "- ex:stringProp -[1]-> xsd:string",
+                                  PREFIXES, unparsed)
+        self.assertEqual(shape.properties, [])
+        self.assertEqual(len(unparsed), 1)
+
+    def test_build_ir_and_emit(self):
+        ir = build_ir([(EX + "TestClass", DESCRIPTION)], PREFIXES.items())
+        self.assertEqual(len(ir.shapes), 1)
+        self.assertIsInstance(ir.shapes[0], NodeShape)
+
+        shacl = emit_graph(ir)
+        SH = Namespace("http://www.w3.org/ns/shacl#")
+        shape_uri = URIRef(EX + "TestClassShape")
+        self.assertIn((shape_uri, RDF.type, SH.NodeShape), shacl)
+        self.assertEqual(len(list(shacl.objects(shape_uri, SH.property))), 4)
+        self.assertEqual(len(list(shacl.subjects(SH['class'], URIRef(EX + "OtherClass")))), 1)
+
+    def test_parallel_build_ir_matches_serial(self):
+        described = [(f"{EX}Class{i}", DESCRIPTION + ("- ex:broken entry\n" if i % 7 == 0 else ""))
+                     for i in range(50)]
+        serial = build_ir(described, PREFIXES.items())
+        with unittest.mock.patch('src.ir.PARALLEL_THRESHOLD', 10):
+            parallel = build_ir(iter(described), PREFIXES.items(), workers=3)
+        self.assertEqual(parallel.shapes, serial.shapes)
+        self.assertEqual([(u.cls, u.line) for u in parallel.unparsed], [(u.cls, u.line) for u in serial.unparsed])
+
+        outputs = []
+        for ir in (serial, parallel):
+            out = io.StringIO()
+            write_shapes(ir.shapes, ir.namespaces, out, 'nt', stable_ids=True)
+            outputs.append(out.getvalue())
+        self.assertEqual(outputs[0], outputs[1])
+
+    def test_small_inputs_stay_serial(self):
+        with unittest.mock.patch('concurrent.futures.ProcessPoolExecutor') as pool:
+            ir = build_ir([(EX + "TestClass", DESCRIPTION)], PREFIXES.items(), workers=4)
+        pool.assert_not_called()
+        self.assertEqual(len(ir.shapes), 1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,70 @@
+import io
+import json
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+
+from src.jsonstream import JSONStreamReader, _iter_document, iter_chunks, iter_jsonld_items
+
+CONTEXT = {"ex": "http://example.org/"}
+ITEMS = [{"@id": f"ex:item{i}", "ex:value": i * 1.5, "ex:nested": {"ex:deep": [i, "x" * i]}} for i in range(20)]
+
+class TestJSONStream(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp(dir="."))
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def read_document(self, document, read_size=7):
+        f = io.StringIO(json.dumps(document, indent=1))
+        return list(_iter_document(f, read_size))
+
+    def test_reader_with_tiny_buffer(self):
+        reader = JSONStreamReader(io.StringIO(' [1, 23456, {"a": "b"}, [] ] '), read_size=3)
+        self.assertEqual(list(reader.array_items()), [1, 23456, {"a": "b"}, []])
+
+    def test_graph_items_are_streamed(self):
+        items = self.read_document({"@context": CONTEXT, "@graph": ITEMS})
+        self.assertEqual(items, [(CONTEXT, item) for item in ITEMS])
+
+    def test_context_after_graph(self):
+        with self.assertLogs('src.jsonstream', 'WARNING'):
+            items = self.read_document({"@graph": ITEMS[:3], "@context": CONTEXT})
+        self.assertEqual(items, [(CONTEXT, item) for item in ITEMS[:3]])
+        with self.assertLogs('src.jsonstream', 'WARNING'):
+            items = self.read_document({"@graph": ITEMS[:3]})
+        self.assertEqual(items, [(None, item) for item in ITEMS[:3]])
+
+    def test_null_context_is_streamed(self):
+        # The first item is available before the rest of the document is read
+        f = io.StringIO(json.dumps({"@context": None, "@graph": ITEMS}))
+        items = _iter_document(f, read_size=64)
+        self.assertEqual(next(items), (None, ITEMS[0]))
+        self.assertLess(f.tell(), len(f.getvalue()) // 2)
+        self.assertEqual(list(items), [(None, item) for item in ITEMS[1:]])
+
+    def test_single_object_and_array(self):
+        single = self.read_document({"@context": CONTEXT, "@id": "ex:a", "ex:p": 1})
+        self.assertEqual(single, [(CONTEXT, {"@id": "ex:a", "ex:p": 1})])
+
+        array = self.read_document([{"@context": CONTEXT, "@id": "ex:a"}, {"@id": "ex:b"}])
+        self.assertEqual(array, [(CONTEXT, {"@id": "ex:a"}), (None, {"@id": "ex:b"})])
+
+    def test_json_lines(self):
+        path = self.temp_dir / "dump.jsonl"
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(json.dumps({"@context": CONTEXT, "@graph": ITEMS[:2]}) + "\n\n")
+            f.write(json.dumps({"@context": CONTEXT, **ITEMS[2]}) + "\n")
+        self.assertEqual(list(iter_jsonld_items(path)), [(CONTEXT, item) for item in ITEMS[:3]])
+
+    def test_chunks(self):
+        other = {"ex": "http://example.org/other/"}
+        items = [(CONTEXT, item) for item in ITEMS[:5]] + [(other, ITEMS[5])]
+        chunks = list(iter_chunks(iter(items), 2))
+        self.assertEqual([len(chunk) for _, chunk in chunks], [2, 2, 1, 1])
+        self.assertEqual(chunks[-1], (other, [ITEMS[5]]))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+import gzip
+import shutil
+import tempfile
+import unittest
+import unittest.mock
+from pathlib import Path
+
+from rdflib import Dataset, Graph, URIRef
+from rdflib.compare import isomorphic
+from rdflib.namespace import DC, OWL, RDF, RDFS
+from src.loader import guess_format, load_class_hierarchy, load_ontology, read_prefix_declarations
+from src.main import create_shacl_shapes
+
+ONTOLOGY = '''@prefix owl: <http://www.w3.org/2002/07/owl#> .
+@prefix dc: <http://purl.org/dc/elements/1.1/> .
+@prefix ex: <http://example.org/> .
+@prefix xsd: <http://www.w3.org/2001/XMLSchema#> .
+@prefix rdfs: <http://www.w3.org/2000/01/rdf-schema#> .
+
+ex:TestClass a owl:Class ;
+    rdfs:label "Test class" ;
+    rdfs:subClassOf ex:Base ;
+    dc:description """The properties that can be used with this class are:
+- ex:stringProp -[1]-> xsd:string
+- ex:objectProp -[0..N]-> ex:OtherClass
+""" .
+
+ex:OtherClass a owl:Class ;
+    rdfs:label "Other class" .
+
+ex:stringProp a owl:DatatypeProperty ;
+    rdfs:domain ex:TestClass .
+'''
+
+class TestSelectiveLoader(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp(dir="."))
+        self.ttl = self.temp_dir / "onto.ttl"
+        with open(self.ttl, 'w', encoding='utf-8') as f:
+            f.write(ONTOLOGY)
+        full = Graph().parse(self.ttl)
+        self.nt = self.temp_dir / "onto.nt"
+        full.serialize(self.nt, format='nt', encoding='utf-8')
+        ds = Dataset()
+        named = ds.graph(URIRef("http://example.org/graph"))
+        for triple in full:
+            named.add(triple)
+        self.nq = self.temp_dir / "onto.nq"
+        ds.serialize(self.nq, format='nquads', encoding='utf-8')
+        self.expected = create_shacl_shapes(self.ttl)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def gzip_copy(self, path):
+        target = Path(str(path) + ".gz")
+        with open(path, 'rb') as src, gzip.open(target, 'wb') as dst:
+            shutil.copyfileobj(src, dst)
+        return target
+
+    def test_guess_format(self):
+        self.assertEqual(guess_format("a.ttl"), 'turtle')
+        self.assertEqual(guess_format("a.nt.gz"), 'nt')
+        self.assertEqual(guess_format("a.NQ"), 'nquads')
+        self.assertEqual(guess_format("a.owl.gz"), 'turtle')
+
+    def test_only_used_triples_are_kept(self):
+        g = load_ontology(self.ttl)
+        self.assertEqual(len(g), 3)
+        self.assertEqual(set(g.predicates()), {RDF.type, DC.description})
+        self.assertNotIn((None, RDFS.label, None), g)
+        self.assertIn(("ex", URIRef("http://example.org/")),
+                      [(p, URIRef(n)) for p, n in g.namespaces()])
+
+    def test_line_formats_and_gzip(self):
+        prefixes = read_prefix_declarations(self.ttl)
+        self.assertIn(('ex', "http://example.org/"), prefixes)
+
+        for path in [self.nt, self.nq, self.gzip_copy(self.nt), self.gzip_copy(self.nq)]:
+            with self.subTest(path=path.name):
+                g = load_ontology(path, prefixes=prefixes)
+                self.assertEqual(len(g), 3)
+                self.assertTrue(isomorphic(create_shacl_shapes(path, prefixes), self.expected))
+
+    def test_class_hierarchy(self):
+        expected = {(URIRef("http://example.org/TestClass"), RDFS.subClassOf, URIRef("http://example.org/Base"))}
+        for source in [self.ttl, self.nt, self.gzip_copy(self.nq), Graph().parse(self.ttl)]:
+            with self.subTest(source=getattr(source, 'name', 'graph')):
+                self.assertEqual(set(load_class_hierarchy(source)), expected)
+
+    def test_gzipped_turtle(self):
+        self.assertTrue(isomorphic(create_shacl_shapes(self.gzip_copy(self.ttl)), self.expected))
+
+    def test_main_prefixes_option(self):
+        output_file = self.temp_dir / "out.ttl"
+        test_args = ['prog_name', '--no-cache', '--input', str(self.nt), '--prefixes', str(self.ttl), str(output_file)]
+        with unittest.mock.patch('sys.argv', test_args):
+            from src.main import main
+            main()
+
+        g = Graph()
+        g.parse(output_file, format='turtle')
+        self.assertTrue(isomorphic(g, self.expected))
+
+if __name__ == '__main__':
+    unittest.main()
@@ -14,6 +14,10 @@ from src.main import create_shacl_shapes, get_ontology_path
 class TestTTLToSHACL(unittest.TestCase):
     def setUp(self):
         self.temp_dir = tempfile.mkdtemp(dir=".")
+        # Caching is on by default: keep the CLI away from the user's cache
+        patcher = unittest.mock.patch.dict('os.environ', {'XDG_CACHE_HOME': str(Path(self.temp_dir) / "cache")})
+        patcher.start()
+        self.addCleanup(patcher.stop)
         self.test_data = '''
 @prefix owl: <http://www.w3.org/2002/07/owl#> .
 @prefix rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#> .
@@ -110,6 +114,19 @@ ex:NoDescClass a owl:Class .
         
         self.assertEqual(len(list(shacl_graph.subjects(RDF.type, URIRef("http://www.w3.org/ns/shacl#NodeShape")))), 0)
 
+    def test_unparsed_entries_are_logged(self):
+        bad_file = Path(self.temp_dir) / "bad.ttl"
+        with open(bad_file, 'w', encoding='utf-8') as f:
+            f.write(self.test_data.replace("- ex:intProp -[0..1]-> xsd:integer", "- ex:intProp -[zero]-> xsd:integer"))
+        
+        with self.assertLogs('src.main', level='WARNING') as logs:
+            shacl_graph = create_shacl_shapes(bad_file)
+        
+        self.assertIn("ex:intProp -[zero]-> xsd:integer", logs.output[0])
+        SH = Namespace("http://www.w3.org/ns/shacl#")
+        shape_uri = URIRef("http://example.org/TestClassShape")
+        self.assertEqual(len(list(shacl_graph.objects(shape_uri, SH.property))), 3)
+
     def test_main_function(self):
         input_file = self.input_file
         output_file = Path(self.temp_dir) / "test_main_output.ttl"
@@ -0,0 +1,105 @@
+import io
+import shutil
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+
+from rdflib import Graph
+from rdflib.compare import isomorphic
+from src.main import create_shacl_shapes
+from src.memo import ShapesMemo, graph_digest
+
+ONTOLOGY = '''@prefix owl: <http://www.w3.org/2002/07/owl#> .
+@prefix dc: <http://purl.org/dc/elements/1.1/> .
+@prefix ex: <http://example.org/> .
+@prefix xsd: <http://www.w3.org/2001/XMLSchema#> .
+@prefix rdfs: <http://www.w3.org/2000/01/rdf-schema#> .
+
+ex:TestClass a owl:Class ;
+    rdfs:label "Test class" ;
+    dc:description """The properties that can be used with this class are:
+- ex:stringProp -[1]-> xsd:string
+- ex:objectProp -[0..N]-> ex:OtherClass
+""" .
+'''
+
+class TestInMemorySources(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp(dir="."))
+        self.path = self.temp_dir / "onto.ttl"
+        self.path.write_text(ONTOLOGY, encoding='utf-8')
+        self.expected = create_shacl_shapes(self.path)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_every_kind_of_source(self):
+        graph = Graph().parse(data=ONTOLOGY, format='turtle')
+        size = len(graph)
+        nt = graph.serialize(format='nt', encoding='utf-8')
+        sources = {
+            "graph": lambda: create_shacl_shapes(graph),
+            "string": lambda: create_shacl_shapes(data=ONTOLOGY),
+            "bytes": lambda: create_shacl_shapes(ONTOLOGY.encode('utf-8')),
+            "binary file": lambda: create_shacl_shapes(io.BytesIO(ONTOLOGY.encode('utf-8'))),
+            "text file": lambda: create_shacl_shapes(io.StringIO(ONTOLOGY)),
+            "n-triples": lambda: create_shacl_shapes(data=nt, format='nt', prefixes=[('ex', "http://example.org/")]),
+        }
+        for name, extract in sources.items():
+            with self.subTest(source=name):
+                self.assertTrue(isomorphic(extract(), self.expected))
+        # The graph given as input is not modified
+        self.assertEqual(len(graph), size)
+
+    def test_exactly_one_source(self):
+        with self.assertRaises(ValueError):
+            create_shacl_shapes()
+        with self.assertRaises(ValueError):
+            create_shacl_shapes(self.path, data=ONTOLOGY)
+
+    def test_memo(self):
+        memo = ShapesMemo(maxsize=2)
+        first = memo.shapes(data=ONTOLOGY)
+        self.assertTrue(isomorphic(first, self.expected))
+        self.assertIs(memo.shapes(ONTOLOGY.encode('utf-8')), first)
+        self.assertIs(memo.shapes(io.StringIO(ONTOLOGY)), first)
+        self.assertEqual((memo.hits, memo.misses), (2, 1))
+
+        # Paths are keyed by content, whatever the kind of source
+        self.assertIs(memo.shapes(self.path), first)
+        self.path.write_text(ONTOLOGY.replace("[1]", "[0..1]"), encoding='utf-8')
+        changed = memo.shapes(self.path)
+        self.assertIsNot(changed, first)
+        self.assertEqual((memo.hits, memo.misses), (3, 2))
+
+        # A third ontology evicts the least recently used one
+        memo.shapes(data=ONTOLOGY.replace("[1]", "[2]"))
+        self.assertEqual(len(memo), 2)
+        self.assertIs(memo.shapes(self.path), changed)
+        self.assertIsNot(memo.shapes(data=ONTOLOGY), first)
+
+    def test_graph_digest(self):
+        a = Graph().parse(data=ONTOLOGY, format='turtle')
+        b = Graph().parse(data=ONTOLOGY, format='turtle')
+        self.assertEqual(graph_digest(a), graph_digest(b))
+        memo = ShapesMemo()
+        self.assertIs(memo.shapes(a), memo.shapes(b))
+        b.parse(data=ONTOLOGY.replace("Test class", "Renamed"), format='turtle')
+        self.assertEqual(graph_digest(a), graph_digest(b))
+
+    def test_memo_is_thread_safe(self):
+        memo = ShapesMemo()
+        results = []
+        threads = [threading.Thread(target=lambda: results.append(memo.shapes(data=ONTOLOGY)))
+                   for _ in range(8)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len(results), 8)
+        self.assertEqual(len(memo), 1)
+        self.assertEqual(memo.hits + memo.misses, 8)
+
+if __name__ == '__main__':
+    unittest.main()
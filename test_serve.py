@@ -0,0 +1,149 @@
+import asyncio
+import http.client
+import json
+import shutil
+import tempfile
+import threading
+import unittest
+from pathlib import Path
+
+from rdflib import Graph
+from rdflib.compare import isomorphic
+from src.main import create_shacl_shapes
+from src.serve import ShapesService, start_server
+
+ONTOLOGY = '''
+@prefix owl: <http://www.w3.org/2002/07/owl#> .
+@prefix dc: <http://purl.org/dc/elements/1.1/> .
+@prefix ex: <http://example.org/> .
+@prefix xsd: <http://www.w3.org/2001/XMLSchema#> .
+@prefix rdfs: <http://www.w3.org/2000/01/rdf-schema#> .
+
+ex:Work a owl:Class ;
+    dc:description """The properties that can be used with this class are:
+- ex:title -[1]-> rdfs:Literal
+""" .
+
+ex:Article rdfs:subClassOf ex:Work .
+'''
+
+CONTEXT = {"ex": "http://example.org/", "title": "ex:title", "year": "ex:year"}
+
+DOCUMENT = {"@context": CONTEXT, "@graph": [
+    {"@id": "ex:w1", "@type": "ex:Work", "title": "T"},
+    {"@id": "ex:a1", "@type": "ex:Article"},
+    {"@id": "ex:n1", "title": ["untyped", "twice"]},
+]}
+
+class TestShapesService(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp(dir="."))
+        self.base_path = self.temp_dir / "ontology"
+        for version in ("1.0.0", "current"):
+            (self.base_path / version).mkdir(parents=True)
+            (self.base_path / version / "skg-o.ttl").write_text(ONTOLOGY, encoding='utf-8')
+        self.service = ShapesService(self.base_path, str(self.temp_dir / "cache"), workers=1,
+                                     max_body=64 * 1024)
+        self.loop = asyncio.new_event_loop()
+        self.server = self.loop.run_until_complete(start_server(self.service, '127.0.0.1', 0))
+        self.port = self.server.sockets[0].getsockname()[1]
+        self.thread = threading.Thread(target=self.loop.run_forever, daemon=True)
+        self.thread.start()
+        self.connection = http.client.HTTPConnection('127.0.0.1', self.port, timeout=30)
+
+    def tearDown(self):
+        self.connection.close()
+        asyncio.run_coroutine_threadsafe(self.shutdown(), self.loop).result()
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join()
+        self.loop.close()
+        self.service.close()
+        shutil.rmtree(self.temp_dir)
+
+    async def shutdown(self):
+        self.server.close()
+        await self.server.wait_closed()
+        # The connection handlers end once they read the end of the stream
+        tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+        if tasks:
+            await asyncio.wait(tasks, timeout=10)
+
+    def request(self, method, url, body=None, headers=None):
+        self.connection.request(method, url, body=body, headers=headers or {})
+        response = self.connection.getresponse()
+        return response, response.read()
+
+    def validate(self, body, query="version=1.0.0", headers=None):
+        response, data = self.request('POST', f"/validate?{query}", body, headers)
+        return response.status, json.loads(data)
+
+    def test_shapes(self):
+        response, data = self.request('GET', "/versions")
+        self.assertEqual(json.loads(data), {"versions": ["1.0.0", "current"], "loaded": []})
+
+        response, data = self.request('GET', "/shapes/1.0.0")
+        self.assertEqual(response.status, 200)
+        self.assertEqual(response.getheader('Content-Type'), 'text/turtle; charset=utf-8')
+        expected = create_shacl_shapes(self.base_path / "1.0.0" / "skg-o.ttl")
+        self.assertTrue(isomorphic(Graph().parse(data=data, format='turtle'), expected))
+
+        etag = response.getheader('ETag')
+        response, data = self.request('GET', "/shapes/1.0.0", headers={'If-None-Match': etag})
+        self.assertEqual((response.status, data), (304, b''))
+
+        for url, headers in [("/shapes/1.0.0?format=nt", {}), ("/shapes/1.0.0", {'Accept': 'application/n-triples'})]:
+            response, data = self.request('GET', url, headers=headers)
+            self.assertEqual(response.getheader('Content-Type'), 'application/n-triples; charset=utf-8')
+            self.assertTrue(isomorphic(Graph().parse(data=data, format='nt'), expected))
+
+        self.assertEqual(self.request('GET', "/shapes/9.9.9")[0].status, 404)
+        self.assertEqual(self.request('GET', "/shapes/..")[0].status, 404)
+        self.assertEqual(self.request('GET', "/shapes/1.0.0?format=xml")[0].status, 400)
+        self.assertEqual(json.loads(self.request('GET', "/versions")[1])["loaded"], ["1.0.0"])
+
+    def test_validate(self):
+        status, summary = self.validate(json.dumps(DOCUMENT))
+        self.assertEqual(status, 200)
+        self.assertEqual((summary["conforms"], summary["items"], summary["violations"]), (False, 3, 1))
+        self.assertEqual(summary["results"][0]["focusNode"], "http://example.org/a1")
+
+        lines = "\n".join(json.dumps({"@context": CONTEXT, **item}) for item in DOCUMENT["@graph"])
+        for query, headers in [("version=1.0.0&json_lines=1&chunk_size=1", {}),
+                               ("version=current&engine=pyshacl", {'Content-Type': 'application/x-ndjson'})]:
+            status, result = self.validate(lines, query, headers)
+            self.assertEqual((status, result["violations"]), (200, 1))
+            self.assertEqual(result["results"][0]["focusNode"], "http://example.org/a1")
+
+        self.assertEqual(self.validate("{not json")[0], 400)
+        self.assertEqual(self.validate("{}", "version=1.0.0&engine=other")[0], 400)
+        self.assertEqual(self.validate("{}", "version=9.9.9")[0], 404)
+        self.assertEqual(self.request('GET', "/validate")[0].status, 405)
+
+    def test_ontology_changes_are_picked_up(self):
+        self.assertEqual(self.validate(json.dumps(DOCUMENT))[1]["violations"], 1)
+        with open(self.base_path / "1.0.0" / "skg-o.ttl", 'w', encoding='utf-8') as f:
+            f.write(ONTOLOGY.replace("- ex:title -[1]-> rdfs:Literal",
+                                     "- ex:title -[1]-> rdfs:Literal\n- ex:year -[1]-> rdfs:Literal"))
+        self.assertEqual(self.validate(json.dumps(DOCUMENT))[1]["violations"], 3)
+        self.assertEqual(self.validate(json.dumps(DOCUMENT), "version=current")[1]["violations"], 1)
+
+    def test_limits_and_metrics(self):
+        self.assertEqual(self.validate("[" + "{}," * 30000 + "{}]")[0], 413)
+        # The connection is closed after a rejected body
+        self.connection.close()
+
+        self.service._pending = self.service.max_concurrent + self.service.max_queue
+        self.assertEqual(self.validate(json.dumps(DOCUMENT))[0], 503)
+        self.service._pending = 0
+        for _ in range(3):
+            self.assertEqual(self.validate(json.dumps(DOCUMENT))[0], 200)
+
+        metrics = json.loads(self.request('GET', "/metrics")[1])
+        validate = metrics["endpoints"]["validate"]
+        self.assertEqual((validate["requests"], validate["errors"]), (5, 2))
+        self.assertEqual((metrics["rejected"], metrics["validated_items"]), (1, 9))
+        self.assertGreater(validate["latency_ms"]["p50"], 0)
+        self.assertLessEqual(validate["latency_ms"]["p50"], validate["latency_ms"]["max"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,92 @@
+import io
+import json
+import shutil
+import tempfile
+import unittest
+import unittest.mock
+from pathlib import Path
+
+from src.cache import ShapesCache
+from src.main import create_shacl_shapes, load_or_create_shapes, main, stream_shacl_shapes
+from src.stats import ExtractionStats
+
+ONTOLOGY = '''
+@prefix owl: <http://www.w3.org/2002/07/owl#> .
+@prefix dc: <http://purl.org/dc/elements/1.1/> .
+@prefix ex: <http://example.org/> .
+@prefix xsd: <http://www.w3.org/2001/XMLSchema#> .
+@prefix rdfs: <http://www.w3.org/2000/01/rdf-schema#> .
+
+ex:Work a owl:Class ;
+    dc:description """The properties that can be used with this class are:
+- ex:title -[1]-> rdfs:Literal
+- ex:year -[0..1]-> xsd:integer
+- ex:author -[0..N]-> ex:Agent
+- ex:broken entry
+""" .
+
+ex:Agent a owl:Class ;
+    dc:description """The properties that can be used with this class are:
+- ex:name -[1]-> xsd:string
+""" .
+
+ex:Undocumented a owl:Class .
+'''
+
+class TestExtractionStats(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp(dir="."))
+        self.ontology = str(self.temp_dir / "onto.ttl")
+        with open(self.ontology, 'w', encoding='utf-8') as f:
+            f.write(ONTOLOGY)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_phases_and_counters(self):
+        seen = []
+        stats = ExtractionStats(on_phase=lambda name, seconds: seen.append(name))
+        with self.assertLogs('src.main', level='WARNING'):
+            shacl = create_shacl_shapes(self.ontology, stats=stats)
+        self.assertEqual(seen, ["parse", "namespaces", "extract", "emit"])
+        self.assertEqual(stats.counters, {
+            "classes": 3, "described_classes": 2, "properties": 4,
+            "unparsed_lines": 1, "triples": len(shacl),
+        })
+        data = stats.as_dict()
+        self.assertAlmostEqual(data["total"], sum(stats.phases.values()))
+        self.assertTrue(data["peak_rss"] is None or data["peak_rss"] > 0)
+        self.assertEqual(json.loads(stats.format('json'))["counters"], stats.counters)
+        self.assertIn("described_classes", stats.format())
+
+    def test_streaming_counts_the_same_triples(self):
+        with self.assertLogs('src.main', level='WARNING'):
+            full = ExtractionStats()
+            create_shacl_shapes(self.ontology, stats=full)
+            streamed = ExtractionStats()
+            stream_shacl_shapes(self.ontology, str(self.temp_dir / "out.ttl"), stats=streamed)
+        self.assertEqual(streamed.counters, full.counters)
+        self.assertIn("stream", streamed.phases)
+
+    def test_cache_hits_are_counted(self):
+        cache = ShapesCache(self.temp_dir / "cache")
+        with self.assertLogs('src.main', level='WARNING'):
+            load_or_create_shapes(self.ontology, cache)
+        stats = ExtractionStats()
+        load_or_create_shapes(self.ontology, cache, stats=stats)
+        self.assertEqual(stats.counters["cache_hits"], 1)
+        self.assertEqual(list(stats.phases), ["cache"])
+
+    def test_stats_flag(self):
+        output = str(self.temp_dir / "shapes.ttl")
+        stderr = io.StringIO()
+        with unittest.mock.patch('sys.argv', ['main.py', '--input', self.ontology, '--no-cache',
+                                              '--stats', 'json', output]), \
+                unittest.mock.patch('sys.stderr', stderr), self.assertLogs('src.main', level='WARNING'):
+            main()
+        data = json.loads(stderr.getvalue().strip().splitlines()[-1])
+        self.assertIn("serialize", data["phases"])
+        self.assertEqual(data["counters"]["described_classes"], 2)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,197 @@
+import io
+import json
+import shutil
+import tempfile
+import unittest
+import unittest.mock
+from pathlib import Path
+
+from rdflib import Graph, Literal, Namespace
+from rdflib.namespace import RDF
+from src.main import create_shacl_shapes
+from src.cache import ValidationCache
+from src.loader import load_class_hierarchy
+from src.validate import JSONLinesReport, ValidationReportWriter, shapes_fingerprint, validate_files
+
+ONTOLOGY = '''
+@prefix owl: <http://www.w3.org/2002/07/owl#> .
+@prefix dc: <http://purl.org/dc/elements/1.1/> .
+@prefix ex: <http://example.org/> .
+@prefix xsd: <http://www.w3.org/2001/XMLSchema#> .
+@prefix rdfs: <http://www.w3.org/2000/01/rdf-schema#> .
+
+ex:Work a owl:Class ;
+    dc:description """The properties that can be used with this class are:
+- ex:title -[1]-> rdfs:Literal
+- ex:author -[0..N]-> ex:Agent
+""" .
+
+ex:Agent a owl:Class ;
+    dc:description """The properties that can be used with this class are:
+- ex:name -[1]-> xsd:string
+""" .
+'''
+
+CONTEXT = {
+    "ex": "http://example.org/",
+    "title": "ex:title",
+    "name": {"@id": "ex:name", "@type": "http://www.w3.org/2001/XMLSchema#string"},
+    "author": {"@id": "ex:author", "@type": "@id"},
+}
+
+def work(i, titles=1):
+    return {"@id": f"ex:work{i}", "@type": "ex:Work", "title": [f"Title {n}" for n in range(titles)],
+            "author": [{"@id": f"ex:agent{i}", "@type": "ex:Agent", "name": f"Agent {i}"}]}
+
+class TestStreamingValidation(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = Path(tempfile.mkdtemp(dir="."))
+        ontology = self.temp_dir / "onto.ttl"
+        with open(ontology, 'w', encoding='utf-8') as f:
+            f.write(ONTOLOGY)
+        self.ontology = ontology
+        self.shapes = create_shacl_shapes(ontology)
+
+        self.valid = self.temp_dir / "valid.json"
+        with open(self.valid, 'w', encoding='utf-8') as f:
+            json.dump({"@context": CONTEXT, "@graph": [work(i) for i in range(7)]}, f)
+
+        self.invalid = self.temp_dir / "invalid.jsonl"
+        with open(self.invalid, 'w', encoding='utf-8') as f:
+            for i in range(5):
+                f.write(json.dumps({"@context": CONTEXT, **work(i, titles=2 if i == 3 else 1)}) + "\n")
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def test_valid_dump(self):
+        out = io.StringIO()
+        summary = validate_files([str(self.valid)], self.shapes, JSONLinesReport(out), chunk_size=3, workers=1)
+        self.assertEqual(summary, {"conforms": True, "files": 1, "chunks": 3, "items": 7, "violations": 0})
+        self.assertEqual(json.loads(out.getvalue()), {"summary": summary})
+
+    def test_violations_in_parallel(self):
+        out = io.StringIO()
+        summary = validate_files([str(self.valid), str(self.invalid)], self.shapes,
+                                 JSONLinesReport(out), chunk_size=2, workers=2)
+        self.assertFalse(summary["conforms"])
+        self.assertEqual(summary["items"], 12)
+        self.assertEqual(summary["violations"], 1)
+
+        records = [json.loads(line) for line in out.getvalue().splitlines()]
+        self.assertEqual(records[0]["focusNode"], "http://example.org/work3")
+        self.assertEqual(records[0]["source"], str(self.invalid))
+        self.assertEqual(records[0]["chunk"], 1)
+
+    def test_engines_agree(self):
+        reports = {}
+        for engine in ('native', 'pyshacl'):
+            out = io.StringIO()
+            validate_files([str(self.invalid)], self.shapes, JSONLinesReport(out), workers=1, engine=engine)
+            reports[engine] = [
+                {k: v for k, v in json.loads(line).items() if k not in ('sourceShape', 'resultMessage')}
+                for line in out.getvalue().splitlines()
+            ]
+        self.assertEqual(reports['native'], reports['pyshacl'])
+
+    def test_validation_report(self):
+        out = io.StringIO()
+        validate_files([str(self.invalid)], self.shapes, ValidationReportWriter(out), chunk_size=1, workers=1)
+
+        SH = Namespace("http://www.w3.org/ns/shacl#")
+        report = Graph()
+        report.parse(data=out.getvalue(), format='nt')
+        report_node = report.value(predicate=RDF.type, object=SH.ValidationReport)
+        self.assertEqual(report.value(report_node, SH.conforms), Literal(False))
+        results = list(report.objects(report_node, SH.result))
+        self.assertEqual(len(results), 1)
+        self.assertEqual(report.value(results[0], SH.resultPath), Namespace("http://example.org/").title)
+
+    def test_result_cache(self):
+        cache = ValidationCache(self.temp_dir / "cache")
+        inputs = [str(self.valid), str(self.invalid)]
+
+        def run(shapes, workers=1):
+            out = io.StringIO()
+            summary = validate_files(inputs, shapes, JSONLinesReport(out), chunk_size=2, workers=workers,
+                                     result_cache=cache)
+            return summary.pop("cache"), summary, out.getvalue()
+
+        stats, summary, output = run(self.shapes)
+        self.assertEqual(stats, {"hits": 0, "misses": 2})
+        with unittest.mock.patch('src.validate.validate_chunk') as validate_chunk:
+            stats, cached_summary, cached_output = run(self.shapes, workers=2)
+        validate_chunk.assert_not_called()
+        self.assertEqual(stats, {"hits": 2, "misses": 2})
+        self.assertEqual(cached_summary, summary)
+        # Everything but the summary line, which holds the cache counters
+        self.assertEqual(cached_output.splitlines()[:-1], output.splitlines()[:-1])
+
+        # Only the file that changed is validated again
+        with open(self.valid, 'a', encoding='utf-8') as f:
+            f.write("\n")
+        self.assertEqual(run(self.shapes)[0], {"hits": 3, "misses": 3})
+        # Other shapes invalidate every file
+        self.ontology.write_text(ONTOLOGY.replace("ex:title -[1]->", "ex:title -[1..2]->"), encoding='utf-8')
+        stats, summary, _ = run(create_shacl_shapes(self.ontology))
+        self.assertEqual(stats, {"hits": 3, "misses": 5})
+        self.assertTrue(summary["conforms"])
+
+    def test_shapes_fingerprint(self):
+        fingerprint = shapes_fingerprint(self.shapes)
+        self.assertEqual(shapes_fingerprint(Graph().parse(data=self.shapes.serialize(format='nt'), format='nt')),
+                         fingerprint)
+        self.assertEqual(shapes_fingerprint(create_shacl_shapes(self.ontology)), fingerprint)
+        # The same constraints, whatever their blank nodes
+        self.assertEqual(shapes_fingerprint(create_shacl_shapes(self.ontology, stable_ids=True)), fingerprint)
+
+    def test_class_hierarchy(self):
+        ontology = self.temp_dir / "hierarchy.ttl"
+        ontology.write_text(ONTOLOGY + "ex:Article rdfs:subClassOf ex:Work .\n", encoding='utf-8')
+        articles = self.temp_dir / "articles.jsonl"
+        with open(articles, 'w', encoding='utf-8') as f:
+            for i in range(4):
+                item = {"@context": CONTEXT, "@id": f"ex:article{i}", "@type": "ex:Article", "title": []}
+                if i % 2:
+                    item = {"@context": CONTEXT, "@id": f"ex:note{i}", "title": []}
+                f.write(json.dumps(item) + "\n")
+
+        hierarchy = load_class_hierarchy(ontology)
+        for engine in ('native', 'pyshacl'):
+            with self.subTest(engine=engine):
+                out = io.StringIO()
+                summary = validate_files([str(articles)], self.shapes, JSONLinesReport(out), chunk_size=1,
+                                         workers=2, engine=engine, hierarchy=hierarchy)
+                self.assertEqual(summary["violations"], 2)
+                self.assertEqual({json.loads(line)["focusNode"] for line in out.getvalue().splitlines()[:-1]},
+                                 {"http://example.org/article0", "http://example.org/article2"})
+        summary = validate_files([str(articles)], self.shapes, JSONLinesReport(io.StringIO()), workers=1)
+        self.assertTrue(summary["conforms"])
+
+        # The hierarchy is part of the result cache key
+        cache = ValidationCache(self.temp_dir / "cache")
+        for expected, graph in [(True, None), (False, hierarchy)]:
+            summary = validate_files([str(articles)], self.shapes, JSONLinesReport(io.StringIO()), workers=1,
+                                     result_cache=cache, shapes_key="shapes", hierarchy=graph)
+            self.assertEqual(summary["conforms"], expected)
+
+        test_args = ['validate', '--input', str(ontology), '--no-cache', '--workers', '1', str(articles)]
+        with unittest.mock.patch('sys.argv', test_args), unittest.mock.patch('sys.stdout'), \
+                unittest.mock.patch('sys.stderr'), self.assertRaises(SystemExit) as cm:
+            from src.validate import main
+            main()
+        self.assertEqual(cm.exception.code, 1)
+
+    def test_main_exit_code(self):
+        report = self.temp_dir / "report.jsonl"
+        for path, code in [(self.valid, 0), (self.invalid, 1)]:
+            test_args = ['validate', '--input', str(self.ontology), '--no-cache', '--workers', '1',
+                         '--report', str(report), str(path)]
+            with unittest.mock.patch('sys.argv', test_args), unittest.mock.patch('sys.stderr'):
+                from src.validate import main
+                with self.assertRaises(SystemExit) as cm:
+                    main()
+            self.assertEqual(cm.exception.code, code)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,133 @@
+import io
+import shutil
+import tempfile
+import unittest
+import unittest.mock
+from pathlib import Path
+
+from rdflib import Graph
+from rdflib.compare import isomorphic
+from src.emit import emit_graph
+from src.ir import build_ir
+from src.main import create_shacl_shapes
+from src.writer import iri_ref, write_shapes
+
+NAMESPACES = [
+    ('ex', "http://example.org/"),
+    ('other', "http://example.org/other#"),
+    ('xsd', "http://www.w3.org/2001/XMLSchema#"),
+    ('rdfs', "http://www.w3.org/2000/01/rdf-schema#"),
+]
+
+DESCRIPTIONS = [
+    ("http://example.org/TestClass", """The properties that can be used with this class are:
+- ex:stringProp -[1]-> xsd:string
+- ex:intProp -[0..1]-> xsd:integer
+- other:objectProp -[1..*]-> ex:OtherClass
+- ex:literalProp -[0..N]-> rdfs:Literal
+- ex:1prop -[1]-> other:Target
+"""),
+    ("http://example.org/OtherClass", """The properties that can be used with this class are:
+- ex:stringProp -[N]-> xsd:string
+"""),
+    ("http://example.org/Empty", "No properties."),
+]
+
+class TestStreamingWriter(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp(dir=".")
+        # Caching is on by default: keep the CLI away from the user's cache
+        patcher = unittest.mock.patch.dict('os.environ', {'XDG_CACHE_HOME': str(Path(self.temp_dir) / "cache")})
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.ir = build_ir(DESCRIPTIONS, NAMESPACES)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def assert_isomorphic_output(self, format):
+        out = io.StringIO()
+        count = write_shapes(self.ir.shapes, self.ir.namespaces, out, format)
+        self.assertEqual(count, 3)
+
+        g = Graph()
+        g.parse(data=out.getvalue(), format=format)
+        self.assertTrue(isomorphic(g, emit_graph(self.ir)))
+        return out.getvalue()
+
+    def test_turtle_is_isomorphic_to_graph_output(self):
+        text = self.assert_isomorphic_output('turtle')
+        self.assertIn("sh:or ( [ sh:class ex:OtherClass ] [ sh:nodeKind sh:BlankNodeOrIRI ] )", text)
+        self.assertIn("<http://example.org/1prop>", text)
+        self.assertNotIn("@prefix rdfs:", text)
+
+    def test_ntriples_is_isomorphic_to_graph_output(self):
+        self.assert_isomorphic_output('nt')
+
+    def test_stable_ids(self):
+        shared = emit_graph(self.ir, stable_ids=True)
+        self.assertEqual(len(emit_graph(self.ir)) - len(shared), 3)
+        for format in ('turtle', 'nt'):
+            outputs = []
+            for _ in range(2):
+                out = io.StringIO()
+                write_shapes(self.ir.shapes, self.ir.namespaces, out, format, stable_ids=True)
+                outputs.append(out.getvalue())
+            self.assertEqual(outputs[0], outputs[1])
+            self.assertTrue(isomorphic(Graph().parse(data=outputs[0], format=format), shared))
+        # N-Triples keeps the labels of the graph
+        self.assertEqual(set(outputs[0].splitlines()),
+                         set(line for line in shared.serialize(format='nt').splitlines() if line))
+
+    def test_main_stable_ids_option(self):
+        input_file = Path(self.temp_dir) / "test.ttl"
+        with open(input_file, 'w', encoding='utf-8') as f:
+            f.write('@prefix owl: <http://www.w3.org/2002/07/owl#> .\n'
+                    '@prefix dc: <http://purl.org/dc/elements/1.1/> .\n')
+            for cls, desc in DESCRIPTIONS:
+                f.write(f'<{cls}> a owl:Class ; dc:description """{desc}""" .\n')
+
+        outputs = []
+        for args in (['--no-cache'], ['--cache-dir', str(Path(self.temp_dir) / "cache")], ['--stream']):
+            output_file = Path(self.temp_dir) / "out.nt"
+            test_args = ['prog_name', '--stable-ids', '--format', 'nt', '--input', str(input_file)]
+            with unittest.mock.patch('sys.argv', test_args + args + [str(output_file)]):
+                from src.main import main
+                main()
+            outputs.append(output_file.read_text(encoding='utf-8').splitlines())
+        # rdflib's N-Triples order depends on the hash seed: the statements are sorted
+        self.assertEqual(outputs[0], sorted(outputs[0]))
+        self.assertEqual(outputs[0], outputs[1])
+        outputs = [set(lines) for lines in outputs]
+        self.assertEqual(outputs[0], outputs[2])
+
+    def test_unsupported_format(self):
+        with self.assertRaises(ValueError):
+            write_shapes(self.ir.shapes, self.ir.namespaces, io.StringIO(), 'xml')
+
+    def test_iri_escaping(self):
+        self.assertEqual(iri_ref("http://example.org/a b"), "<http://example.org/a\\u0020b>")
+
+    def test_main_stream_option(self):
+        input_file = Path(self.temp_dir) / "test.ttl"
+        with open(input_file, 'w', encoding='utf-8') as f:
+            f.write('@prefix owl: <http://www.w3.org/2002/07/owl#> .\n'
+                    '@prefix dc: <http://purl.org/dc/elements/1.1/> .\n'
+                    '@prefix ex: <http://example.org/> .\n'
+                    '@prefix other: <http://example.org/other#> .\n')
+            for cls, desc in DESCRIPTIONS:
+                f.write(f'<{cls}> a owl:Class ; dc:description """{desc}""" .\n')
+
+        for format in ('turtle', 'nt'):
+            output_file = Path(self.temp_dir) / f"out.{format}"
+            test_args = ['prog_name', '--stream', '--format', format, '--input', str(input_file), str(output_file)]
+            with unittest.mock.patch('sys.argv', test_args):
+                from src.main import main
+                main()
+
+            g = Graph()
+            g.parse(output_file, format=format)
+            self.assertTrue(isomorphic(g, create_shacl_shapes(input_file)))
+
+if __name__ == '__main__':
+    unittest.main()